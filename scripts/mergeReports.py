@@ -0,0 +1,27 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import sys
+
+from syntribos.formatters.aggregate import IssueAggregate
+
+# Usage: mergeReports.py <issues.db> [<issues.db> ...]
+# Prints the issues and errors of several runs (issues.db in each run's log
+# directory) as one report
+aggregate = IssueAggregate()
+for path in sys.argv[1:]:
+    aggregate.merge(path)
+print(json.dumps({"failures": aggregate.failures(),
+                  "errors": aggregate.errors()},
+                 sort_keys=True, indent=2, separators=(',', ': ')))
@@ -0,0 +1,31 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sys
+
+from syntribos.tests.fuzz import corpus
+
+syntribos_data_path = "{data_dir}".format(data_dir=sys.argv[1])
+reduced_data_path = "{data_dir}".format(data_dir=sys.argv[2])
+
+for file_name in sorted(os.listdir(syntribos_data_path)):
+    if not file_name.endswith(".txt"):
+        continue
+    strings = corpus.Corpus(os.path.join(syntribos_data_path, file_name))
+    representatives = strings.representatives()
+    with open(os.path.join(reduced_data_path, file_name), "wb") as fp:
+        for payload in representatives:
+            fp.write(payload + b"\n")
+    print("{0}: {1} -> {2}".format(
+        file_name, len(strings), len(representatives)))
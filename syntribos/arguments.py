@@ -89,11 +89,121 @@ class SyntribosCLI(argparse.ArgumentParser):
             action="store_true",
             help="Dry Run gets all test cases but does not run them")
 
+        self.add_argument(
+            "-w", "--workers", metavar="N", type=int, default=1,
+            help="Number of test cases to run concurrently (default: 1)")
+
+        self.add_argument(
+            "--transport", dest="transport", action="store",
+            default="threads", choices=["threads", "gevent"],
+            help="How concurrent requests are sent: one blocking socket per "
+            "worker thread, or non-blocking sockets on a gevent event loop, "
+            "which scales to thousands of workers (requires gevent)")
+
+        self.add_argument(
+            "--scan-level", dest="scan_level", action="store",
+            default="full", choices=["full", "representatives", "adaptive"],
+            help="Send every fuzz string (full), only one fuzz string per "
+            "class of equivalent strings (representatives) for a quicker "
+            "scan that still covers every kind of attack, or every fuzz "
+            "string only to the parameters whose responses change when sent "
+            "a few probes (adaptive)")
+
+        self.add_argument(
+            "--resume", dest="resume", metavar="RUN_ID", action="store",
+            default=None,
+            help="Resume an interrupted run, skipping the test cases it "
+            "completed; RUN_ID is the name of its log directory")
+
+        self.add_argument(
+            "--capture", dest="capture", action="store_true",
+            help="Record every request and response of this run in a "
+            "capture file in its log directory, to re-run the tests against "
+            "later without sending anything (see syntribos-replay)")
+
+        self.add_argument(
+            "--coordinate", dest="coordinate", metavar="[HOST:]PORT",
+            action="store", default=None,
+            help="Do not run the tests, but hand them out to worker nodes "
+            "(see syntribos-worker) connecting to this address, and report "
+            "their results")
+
+        self.add_argument(
+            '-o', '--output', dest='output_file', action='store',
+            default=None, help='write report to filename')
+
+        self.add_argument(
+            '-f', '--format', dest='output_format', action='store',
+            default='json', help='specify output format: a JSON report, or '
+            'issues as newline-delimited JSON while tests run (ndjson)',
+            choices=["json", "ndjson"])
+
+
+class SyntribosWorkerCLI(argparse.ArgumentParser):
+    """Class for parsing Syntribos worker node command-line arguments."""
+
+    def __init__(self, *args, **kwargs):
+        super(SyntribosWorkerCLI, self).__init__(*args, **kwargs)
+        self._add_args()
+
+    def _add_args(self):
+        self.add_argument(
+            "config", metavar="<config>",
+            action=cafe.drivers.unittest.arguments.ConfigAction,
+            help="test config.  Looks in the ~/.opencafe/configs directory"
+            "Example: compute/dev.environ")
+
+        self.add_argument(
+            "coordinator", metavar="<[host:]port>",
+            help="Address of the coordinator (syntribos --coordinate)")
+
+        self.add_argument(
+            "-w", "--workers", metavar="N", type=int, default=1,
+            help="Number of test cases to run concurrently (default: 1)")
+
+        self.add_argument(
+            "--transport", dest="transport", action="store",
+            default="threads", choices=["threads", "gevent"],
+            help="How concurrent requests are sent (see syntribos --help)")
+
+
+class SyntribosReplayCLI(argparse.ArgumentParser):
+    """Class for parsing Syntribos replay command-line arguments."""
+
+    def __init__(self, *args, **kwargs):
+        super(SyntribosReplayCLI, self).__init__(*args, **kwargs)
+        self._add_args()
+
+    def _add_args(self):
+        self.add_argument(
+            "config", metavar="<config>",
+            action=cafe.drivers.unittest.arguments.ConfigAction,
+            help="test config.  Looks in the ~/.opencafe/configs directory"
+            "Example: compute/dev.environ")
+
+        self.add_argument(
+            "capture", metavar="<capture_file>",
+            help="Capture file of the run to replay (syntribos --capture)")
+
+        self.add_argument(
+            "-t", "--test-types", metavar="TEST_TYPES", nargs="*",
+            default=None, help="Test types to run against the captured "
+            "responses (default: those of the captured run)")
+
+        self.add_argument(
+            "-v", "--verbose",
+            action="store_true",
+            help="unittest verbose pass through")
+
+        self.add_argument(
+            "-w", "--workers", metavar="N", type=int, default=1,
+            help="Number of test cases to run concurrently (default: 1)")
+
         self.add_argument(
             '-o', '--output', dest='output_file', action='store',
             default=None, help='write report to filename')
 
         self.add_argument(
             '-f', '--format', dest='output_format', action='store',
-            default='json', help='specify output format',
-            choices=["json"])
+            default='json', help='specify output format (see syntribos '
+            '--help)', choices=["json", "ndjson"])
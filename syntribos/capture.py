@@ -0,0 +1,295 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Capture of the requests and responses of a run, for offline replay
+
+A capture file is a sequence of length-prefixed records, appended to as the
+run goes. Each record is a header (:data:`_HEADER`: record kind and the
+length of the three parts that follow), JSON metadata, and two
+zlib-compressed blobs:
+
+* a :data:`RUN` record holds the settings of the run;
+* a :data:`TEMPLATE` record holds a request template (first blob);
+* a :data:`TRANSACTION` record holds a request and its response, with
+  timing, and the request and response bodies.
+
+Each transaction is recorded under the label of what sent it: the id of a
+test case, the template and variant of a baseline (see
+:meth:`syntribos.tests.baseline.BaselineCache.capture_label`), or the
+template and test type whose test cases were being generated, with its
+position among the requests sent under that label. :class:`CapturePlayer`
+serves the same responses to the same requests when the tests are run again
+(see ``syntribos-replay``), so detections can be re-run without sending
+anything.
+"""
+import collections
+import contextlib
+import datetime
+import json
+import struct
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+import six
+from six.moves import _thread
+
+RUN = 0
+TEMPLATE = 1
+TRANSACTION = 2
+
+_HEADER = struct.Struct(">BIII")
+
+# Labels by thread (or greenlet, as gevent patches get_ident)
+_labels = {}
+
+
+def current_label():
+    """Returns the label requests sent from this thread are recorded under.
+
+    :rtype: str
+    """
+    return _labels.get(_thread.get_ident(), "")
+
+
+@contextlib.contextmanager
+def labelled(label):
+    """Records the requests sent from this thread under `label`
+
+    :param str label: Label of the requests, e.g. a test case id
+    """
+    ident = _thread.get_ident()
+    previous = _labels.get(ident)
+    _labels[ident] = label
+    try:
+        yield
+    finally:
+        if previous is None:
+            _labels.pop(ident, None)
+        else:
+            _labels[ident] = previous
+
+
+class CaptureMiss(Exception):
+    """Raised when replaying a request that was not captured."""
+
+
+def _text(string):
+    """Converts a byte string to text, keeping every byte as it was sent."""
+    if isinstance(string, six.text_type):
+        return string
+    return string.decode("latin-1")
+
+
+def _encode_headers(headers):
+    return [[_text(k), _text(v)] for k, v in (headers or {}).items()]
+
+
+def _decode_headers(headers):
+    return CaseInsensitiveDict(
+        (k.encode("latin-1", "replace"), v.encode("latin-1", "replace"))
+        for k, v in headers)
+
+
+def _bytes(body):
+    if body is None:
+        return b""
+    if isinstance(body, six.text_type):
+        return body.encode("utf-8")
+    if not isinstance(body, six.binary_type):
+        return six.binary_type(body)
+    return body
+
+
+class CaptureWriter(object):
+
+    """Appends the transactions of a run to a capture file
+
+    :param str path: Path of the capture file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fp = open(path, "ab")
+        self._counts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def _write(self, kind, meta, first=b"", second=b""):
+        meta = json.dumps(meta)
+        first = zlib.compress(first)
+        second = zlib.compress(second)
+        record = b"".join([
+            _HEADER.pack(kind, len(meta), len(first), len(second)),
+            meta, first, second])
+        with self._lock:
+            self._fp.write(record)
+
+    def write_run(self, **settings):
+        """Records the settings of the run (test types, scan level, etc.)"""
+        settings["time"] = time.time()
+        self._write(RUN, settings)
+
+    def write_template(self, file_path, content):
+        """Records a request template the tests are generated from."""
+        self._write(TEMPLATE, {"file": file_path}, _bytes(content))
+
+    def write_transaction(self, response):
+        """Records `response`, and the request it answers
+
+        :type response: :class:`requests.Response`
+        """
+        label = current_label()
+        with self._lock:
+            index = self._counts[label]
+            self._counts[label] += 1
+        request = response.request
+        meta = {
+            "label": label, "index": index, "time": time.time(),
+            "elapsed": response.elapsed.total_seconds(),
+            "request": {"method": request.method, "url": request.url,
+                        "headers": _encode_headers(request.headers)},
+            "response": {"status_code": response.status_code,
+                         "reason": response.reason, "url": response.url,
+                         "encoding": response.encoding,
+                         "headers": _encode_headers(response.headers),
+                         "body": {
+                             name: getattr(response, "body_" + name, None)
+                             for name in ("length", "sha256", "truncated")}}}
+        self._write(TRANSACTION, meta, _bytes(request.body),
+                    response.content or b"")
+
+    def record_templates(self, inputs):
+        """Records each template of `inputs` as it is read
+
+        :param inputs: (file name, file contents) tuples
+        :rtype: generator
+        """
+        for file_path, content in inputs:
+            self.write_template(file_path, content)
+            yield file_path, content
+
+    def close(self):
+        with self._lock:
+            self._fp.close()
+
+
+class CapturePlayer(object):
+
+    """Serves the responses recorded in a capture file
+
+    Responses are looked up by the label of the thread sending the request
+    (see :func:`labelled`) and the number of requests it sent under that
+    label so far. A test case sending more requests than were captured
+    (e.g. re-sending a slow request more times) gets the last response
+    captured for it; a request sent under a label that was never captured
+    raises :class:`CaptureMiss`.
+
+    :param str path: Path of the capture file
+    :ivar dict settings: Settings of the captured run
+    :ivar list templates: (file name, file contents) of each template
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.settings = {}
+        self.templates = []
+        self._offsets = {}
+        self._last = {}
+        self._counts = collections.Counter()
+        self._lock = threading.Lock()
+        self._fp = open(path, "rb")
+        self._index()
+
+    def _index(self):
+        """Reads the settings and templates, and where each response is"""
+        seen = set()
+        while True:
+            offset = self._fp.tell()
+            header = self._fp.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                break
+            kind, meta_size, first_size, second_size = _HEADER.unpack(header)
+            meta = json.loads(self._fp.read(meta_size))
+            if kind == TRANSACTION:
+                # Resumed runs append to the capture: the latest wins
+                key = (meta["label"], meta["index"])
+                self._offsets[key] = offset
+                self._last[meta["label"]] = max(
+                    self._last.get(meta["label"], 0), meta["index"])
+                self._fp.seek(first_size + second_size, 1)
+            elif kind == TEMPLATE:
+                content = zlib.decompress(self._fp.read(first_size))
+                self._fp.seek(second_size, 1)
+                if meta["file"] not in seen:
+                    seen.add(meta["file"])
+                    self.templates.append((meta["file"], content))
+            else:
+                self.settings = self.settings or meta
+                self._fp.seek(first_size + second_size, 1)
+
+    def _read(self, offset):
+        with self._lock:
+            self._fp.seek(offset)
+            header = self._fp.read(_HEADER.size)
+            kind, meta_size, first_size, second_size = _HEADER.unpack(header)
+            meta = json.loads(self._fp.read(meta_size))
+            first = zlib.decompress(self._fp.read(first_size))
+            second = zlib.decompress(self._fp.read(second_size))
+        return meta, first, second
+
+    def next_response(self):
+        """Returns the response to the next request sent under this label
+
+        :rtype: :class:`requests.Response`
+        :raises: :class:`CaptureMiss` if nothing was captured for the label
+        """
+        label = current_label()
+        with self._lock:
+            index = self._counts[label]
+            self._counts[label] += 1
+        if label not in self._last:
+            raise CaptureMiss(
+                "No response captured for '{0}' in {1}".format(
+                    label, self.path))
+        offset = self._offsets.get(
+            (label, min(index, self._last[label])))
+        if offset is None:
+            raise CaptureMiss("Response {0} of '{1}' missing from {2}".format(
+                index, label, self.path))
+        meta, request_body, content = self._read(offset)
+
+        request = requests.PreparedRequest()
+        request.method = meta["request"]["method"]
+        request.url = meta["request"]["url"]
+        request.headers = _decode_headers(meta["request"]["headers"])
+        request.body = request_body or None
+
+        response = requests.Response()
+        response.status_code = meta["response"]["status_code"]
+        response.reason = meta["response"]["reason"]
+        response.url = meta["response"]["url"]
+        response.encoding = meta["response"]["encoding"]
+        response.headers = _decode_headers(meta["response"]["headers"])
+        response._content = content
+        response._content_consumed = True
+        for name, value in meta["response"].get("body", {}).items():
+            if value is not None:
+                setattr(response, "body_" + name, value)
+        response.elapsed = datetime.timedelta(seconds=meta["elapsed"])
+        response.request = request
+        return response
+
+    def close(self):
+        self._fp.close()
@@ -15,36 +15,98 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import hashlib
 import logging
+import threading
 from time import time
 
 import requests
 from requests.packages import urllib3
+from requests.packages.urllib3.util.retry import Retry
 import six
+from six.moves import http_cookiejar
+from six.moves.urllib.parse import urlparse
+
+from syntribos.clients.http import throttle
+
 urllib3.disable_warnings()
 
 
-def _log_transaction(log, level=logging.DEBUG):
-    """Decorator used for logging requests/response in clients.
+def _safe_decode(text, incoming='utf-8', errors='replace'):
+    """Decodes incoming text/bytes using `incoming` if not already unicode.
+
+    :param incoming: Text's current encoding
+    :param errors: Errors handling policy. See here for valid
+    values http://docs.python.org/2/library/codecs.html
 
-    Takes a python Logger object and an optional logging level.
+    :returns: text or a unicode `incoming` encoded
+    representation of it.
     """
 
-    def _safe_decode(text, incoming='utf-8', errors='replace'):
-        """Decodes incoming text/bytes using `incoming` if not already unicode.
+    if isinstance(text, six.text_type):
+        return text
 
-        :param incoming: Text's current encoding
-        :param errors: Errors handling policy. See here for valid
-        values http://docs.python.org/2/library/codecs.html
+    return text.decode(incoming, errors)
 
-        :returns: text or a unicode `incoming` encoded
-        representation of it.
-        """
 
-        if isinstance(text, six.text_type):
-            return text
+def _cap(body, limit):
+    """Keeps the first `limit` characters of each string to be logged
+
+    :param body: Request or response body, or headers, params, etc.; the
+        strings in dicts, lists and tuples are capped
+    :param int limit: Maximum length logged, or 0 to log whole strings
+    """
+    if not limit:
+        return body
+    if isinstance(body, dict):
+        return dict((k, _cap(v, limit)) for k, v in body.items())
+    if isinstance(body, (list, tuple)):
+        return type(body)(_cap(v, limit) for v in body)
+    if not isinstance(body, six.string_types) or len(body) <= limit:
+        return body
+    return body[:limit] + "... ({0} more characters)".format(
+        len(body) - limit)
+
+
+class _LogLine(object):
+
+    """Log message joined from its fields only if a handler writes the record
 
-        return text.decode(incoming, errors)
+    The (capped) fields are copied when the message is logged, so a queued
+    record doesn't keep the request or response alive until it is written.
+
+    :param snapshot: Callable returning the fields of the message
+    :param build: Callable joining the fields into the message
+    :param str fallback: Message logged if `snapshot` or `build` fails
+    """
+
+    def __init__(self, snapshot, build, fallback):
+        self.build = build
+        self.fallback = fallback
+        try:
+            self.fields = snapshot()
+        except Exception:
+            # Ignore all exceptions that happen in logging
+            self.fields = None
+
+    def __str__(self):
+        if self.fields is None:
+            return self.fallback
+        try:
+            return _safe_decode(self.build(*self.fields))
+        except Exception:
+            # Ignore all exceptions that happen in logging
+            return self.fallback
+
+
+def _log_transaction(log, level=logging.DEBUG):
+    """Decorator used for logging requests/response in clients.
+
+    Takes a python Logger object and an optional logging level. Nothing is
+    logged, or formatted, unless `log` is enabled for the level; bodies are
+    capped to :attr:`HTTPClient.max_log_body` characters when logged, and
+    log lines are only joined when written.
+    """
 
     def _decorator(func):
         """Accepts a function and returns wrapped version of that function."""
@@ -55,17 +117,13 @@ def _log_transaction(log, level=logging.DEBUG):
             sent to the request() method, to the provided log at the provided
             log level.
             """
-
-            logline = '{0} {1}'.format(args, kwargs)
-
-            try:
-                log.debug(_safe_decode(logline))
-            except Exception as exception:
-                # Ignore all exceptions that happen in logging, then log them
-                log.info(
-                    'Exception occured while logging signature of calling'
-                    'method in http client')
-                log.exception(exception)
+            limit = HTTPClient.max_log_body
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("%s", _LogLine(
+                    lambda: (_cap(args, limit), _cap(kwargs, limit)),
+                    '{0} {1}'.format,
+                    'Exception occured while logging signature of calling '
+                    'method in http client'))
 
             # Make the request and time it's execution
             response = None
@@ -79,57 +137,70 @@ def _log_transaction(log, level=logging.DEBUG):
                 log.exception(exception)
                 raise exception
 
-            # requests lib 1.0.0 renamed body to data in the request object
-            request_body = ''
-            if 'body' in dir(response.request):
-                request_body = response.request.body
-            elif 'data' in dir(response.request):
-                request_body = response.request.data
-            else:
-                log.info(
-                    "Unable to log request body, neither a 'data' nor a "
-                    "'body' object could be found")
-
-            # requests lib 1.0.4 removed params from response.request
-            request_params = ''
-            request_url = response.request.url
-            if 'params' in dir(response.request):
-                request_params = response.request.params
-            elif '?' in request_url:
-                request_url, request_params = request_url.split('?')
-
-            logline = ''.join([
-                '\n{0}\nREQUEST SENT\n{0}\n'.format('-' * 12),
-                'request method..: {0}\n'.format(response.request.method),
-                'request url.....: {0}\n'.format(request_url),
-                'request params..: {0}\n'.format(request_params),
-                'request headers.: {0}\n'.format(response.request.headers),
-                'request body....: {0}\n'.format(request_body)])
-            try:
-                log.log(level, _safe_decode(logline))
-            except Exception as exception:
-                # Ignore all exceptions that happen in logging, then log them
-                log.log(level, '\n{0}\nREQUEST INFO\n{0}\n'.format('-' * 12))
-                log.exception(exception)
-
-            logline = ''.join([
-                '\n{0}\nRESPONSE RECEIVED\n{0}\n'.format('-' * 17),
-                'response status..: {0}\n'.format(response),
-                'response time....: {0}\n'.format(elapsed),
-                'response headers.: {0}\n'.format(response.headers),
-                'response body....: {0}\n'.format(response.content),
-                '-' * 79])
-            try:
-                log.log(level, _safe_decode(logline))
-            except Exception as exception:
-                # Ignore all exceptions that happen in logging, then log them
-                log.log(level, '\n{0}\nRESPONSE INFO\n{0}\n'.format('-' * 13))
-                log.exception(exception)
+            if log.isEnabledFor(level):
+                log.log(level, "%s", _LogLine(
+                    lambda: _request_fields(response, limit), _request_line,
+                    '\n{0}\nREQUEST INFO\n{0}\n'.format('-' * 12)))
+                log.log(level, "%s", _LogLine(
+                    lambda: _response_fields(response, elapsed, limit),
+                    _response_line,
+                    '\n{0}\nRESPONSE INFO\n{0}\n'.format('-' * 13)))
             return response
         return _wrapper
     return _decorator
 
 
+def _request_fields(response, limit):
+    """Returns the capped fields logged for the request `response` answers."""
+    request = response.request
+    # requests lib 1.0.0 renamed body to data in the request object
+    request_body = ''
+    if hasattr(request, 'body'):
+        request_body = request.body
+    elif hasattr(request, 'data'):
+        request_body = request.data
+
+    # requests lib 1.0.4 removed params from response.request
+    request_params = ''
+    request_url = request.url
+    if hasattr(request, 'params'):
+        request_params = request.params
+    elif '?' in request_url:
+        request_url, request_params = request_url.split('?', 1)
+
+    return (request.method, _cap(request_url, limit),
+            _cap(request_params, limit), _cap(dict(request.headers), limit),
+            _cap(request_body, limit))
+
+
+def _request_line(method, url, params, headers, body):
+    """Builds the log line of a request from its fields."""
+    return ''.join([
+        '\n{0}\nREQUEST SENT\n{0}\n'.format('-' * 12),
+        'request method..: {0}\n'.format(method),
+        'request url.....: {0}\n'.format(url),
+        'request params..: {0}\n'.format(params),
+        'request headers.: {0}\n'.format(headers),
+        'request body....: {0}\n'.format(body)])
+
+
+def _response_fields(response, elapsed, limit):
+    """Returns the capped fields logged for `response`."""
+    return (str(response), elapsed, _cap(dict(response.headers), limit),
+            _cap(response.content, limit))
+
+
+def _response_line(status, elapsed, headers, body):
+    """Builds the log line of a response from its fields."""
+    return ''.join([
+        '\n{0}\nRESPONSE RECEIVED\n{0}\n'.format('-' * 17),
+        'response status..: {0}\n'.format(status),
+        'response time....: {0}\n'.format(elapsed),
+        'response headers.: {0}\n'.format(headers),
+        'response body....: {0}\n'.format(body),
+        '-' * 79])
+
+
 class HTTPClient(object):
 
     """Allows clients to inherit requests.request.
@@ -146,9 +217,154 @@ class HTTPClient(object):
 
     _log = logging.getLogger(__name__)
 
+    # Connection pools are shared process-wide, one session per target host
+    _sessions = {}
+    _sessions_lock = threading.Lock()
+    pool_size = 10
+    keep_alive = True
+    max_retries = 0
+    retry_backoff = 0.0
+    max_log_body = 4096
+    # Bytes of each response body kept from its start (0 = whole bodies) and
+    # end, and read at most (0 = no limit)
+    response_head = 1048576
+    response_tail = 65536
+    response_read_limit = 67108864
+    chunk_size = 65536
+    # Set to record (CaptureWriter) or replay (CapturePlayer) transactions
+    capture = None
+    replay = None
+
     def __init__(self):
         self.default_headers = {}
 
+    @classmethod
+    def configure(cls, pool_size=None, keep_alive=None, max_retries=None,
+                  retry_backoff=None, max_log_body=None, response_head=None,
+                  response_tail=None, response_read_limit=None):
+        """Sets the connection pool policy used by all clients
+
+        Sessions that were already opened are closed, so the new policy
+        applies to every request sent afterwards.
+
+        :param int pool_size: Maximum number of connections kept per host
+        :param bool keep_alive: Whether connections are reused at all
+        :param int max_retries: Retries on connection errors
+        :param float retry_backoff: Backoff factor between retries
+        :param int max_log_body: Characters of each body written to the
+            transaction log, or 0 to log whole bodies
+        :param int response_head: Bytes kept from the start of each response
+            body, or 0 to keep whole bodies
+        :param int response_tail: Bytes kept from the end of each response
+            body, past its head
+        :param int response_read_limit: Bytes of a response body read before
+            giving up on the rest, or 0 to read whole bodies
+        """
+        if pool_size is not None:
+            cls.pool_size = pool_size
+        if keep_alive is not None:
+            cls.keep_alive = keep_alive
+        if max_retries is not None:
+            cls.max_retries = max_retries
+        if retry_backoff is not None:
+            cls.retry_backoff = retry_backoff
+        if max_log_body is not None:
+            cls.max_log_body = max_log_body
+        if response_head is not None:
+            cls.response_head = response_head
+        if response_tail is not None:
+            cls.response_tail = response_tail
+        if response_read_limit is not None:
+            cls.response_read_limit = response_read_limit
+        cls.close_sessions()
+
+    @classmethod
+    def close_sessions(cls):
+        """Closes every pooled session and its connections."""
+        with cls._sessions_lock:
+            for session in cls._sessions.values():
+                session.close()
+            cls._sessions.clear()
+
+    @classmethod
+    def get_session(cls, url):
+        """Returns the pooled session for the host `url` points to
+
+        :param str url: URL of the request about to be sent
+        :rtype: :class:`requests.Session`
+        """
+        key = urlparse(url)[:2]
+        with cls._sessions_lock:
+            session = cls._sessions.get(key)
+            if session is None:
+                session = cls._sessions[key] = cls._create_session()
+        return session
+
+    @classmethod
+    def _create_session(cls):
+        session = requests.Session()
+        # Responses to one fuzz request must not leak cookies into the next
+        session.cookies.set_policy(
+            http_cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        if not cls.keep_alive:
+            session.headers["Connection"] = "close"
+        retries = Retry(total=cls.max_retries, read=False,
+                        backoff_factor=cls.retry_backoff)
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=cls.pool_size,
+            max_retries=retries)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @classmethod
+    def read_body(cls, response):
+        """Reads a streamed response body, keeping a bounded view of it
+
+        Only the first :attr:`response_head` bytes and the last
+        :attr:`response_tail` bytes of the body are kept as the response's
+        content, so the memory used per response is fixed whatever the size
+        of the body. At most :attr:`response_read_limit` bytes are read; the
+        connection is closed if the rest of the body is left unread. The
+        response gets these attributes:
+
+        * ``body_length``: Length of the body (as far as it was read)
+        * ``body_sha256``: SHA-256 digest of the body (as far as it was read)
+        * ``body_truncated``: Whether the content is not the whole body
+
+        :type response: :class:`requests.Response`
+        """
+        head = []
+        head_size = 0
+        tail = b""
+        length = 0
+        digest = hashlib.sha256()
+        truncated = False
+        for chunk in response.iter_content(cls.chunk_size):
+            length += len(chunk)
+            digest.update(chunk)
+            if not cls.response_head or head_size < cls.response_head:
+                room = len(chunk)
+                if cls.response_head:
+                    room = min(room, cls.response_head - head_size)
+                head.append(chunk[:room])
+                head_size += room
+                chunk = chunk[room:]
+            if chunk:
+                if cls.response_tail:
+                    tail = (tail + chunk)[-cls.response_tail:]
+                truncated = truncated or (
+                    length - head_size > cls.response_tail)
+            if cls.response_read_limit and length >= cls.response_read_limit:
+                truncated = True
+                response.close()
+                break
+        response._content = b"".join(head) + tail
+        response._content_consumed = True
+        response.body_length = length
+        response.body_sha256 = digest.hexdigest()
+        response.body_truncated = truncated
+
     @_log_transaction(log=_log)
     def request(
             self, method, url, headers=None, params=None, data=None,
@@ -188,6 +404,36 @@ class HTTPClient(object):
             {'headers': headers, 'params': params, 'verify': verify,
              'data': data}, **requestslib_kwargs)
 
-        # Make the request
-        return requests.request(
-            method, url, **requestslib_kwargs)
+        if self.replay is not None:
+            return self.replay.next_response()
+
+        # Bodies are streamed, and only a bounded view of them is read (see
+        # read_body), unless the caller streams the body itself
+        streamed = requestslib_kwargs.get('stream', False)
+        requestslib_kwargs['stream'] = True
+
+        # Make the request over the pooled session for this host, waiting
+        # for the target's throttle first if one is configured
+        session = self.get_session(url)
+        limiter = throttle.get_limiter(url)
+        if limiter is None:
+            response = session.request(method, url, **requestslib_kwargs)
+            if not streamed:
+                self.read_body(response)
+        else:
+            limiter.acquire()
+            response = None
+            try:
+                response = session.request(
+                    method, url, **requestslib_kwargs)
+                if not streamed:
+                    self.read_body(response)
+            finally:
+                if response is None:
+                    limiter.release()
+                else:
+                    limiter.release(response.status_code,
+                                    response.elapsed.total_seconds())
+        if self.capture is not None:
+            self.capture.write_transaction(response)
+        return response
@@ -0,0 +1,81 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Event loop (gevent) transport for the HTTP clients
+
+Once :func:`enable` has been called, every socket opened by
+:class:`syntribos.clients.http.base_http_client.HTTPClient` is non-blocking
+and driven by gevent's event loop, so a single process can keep thousands of
+requests in flight. The client interface itself does not change: each call to
+``send_request`` still returns a complete response, it just yields to other
+requests while it waits on the network.
+"""
+try:
+    import gevent.monkey
+    import gevent.pool
+except ImportError:
+    gevent = None
+
+_enabled = False
+
+
+def is_available():
+    """Returns whether gevent is installed."""
+    return gevent is not None
+
+
+def is_enabled():
+    """Returns whether the gevent transport is in use."""
+    return _enabled
+
+
+def enable():
+    """Switches the standard library over to gevent's cooperative versions
+
+    This should be called as early as possible, before any connection has
+    been opened. Modules imported earlier keep the blocking versions (e.g.
+    locks created at import time), so the console scripts patch the standard
+    library before importing anything else (see :mod:`syntribos.console`),
+    and this only records that the transport is in use.
+
+    :raises: Exception if gevent is not installed
+    """
+    global _enabled
+    if _enabled:
+        return
+    if not is_available():
+        raise Exception(
+            "The gevent transport requires gevent "
+            "(pip install syntribos[gevent])")
+    if not gevent.monkey.is_module_patched("socket"):
+        gevent.monkey.patch_all()
+    _enabled = True
+
+
+def imap(func, iterable, size):
+    """Applies `func` to each item in `iterable` on a pool of greenlets
+
+    Results are yielded in the order of `iterable`, and no more than `size`
+    items are being processed at any time.
+
+    :param func: Callable run on each item
+    :param iterable: Items to process, consumed lazily
+    :param int size: Maximum number of concurrent greenlets
+    :rtype: generator
+    """
+    pool = gevent.pool.Pool(size)
+    try:
+        for value in pool.imap(func, iterable):
+            yield value
+    finally:
+        pool.kill()
@@ -26,59 +26,82 @@ class RequestHelperMixin(object):
     """Class that helps with fuzzing requests."""
 
     @classmethod
-    def _run_iters(cls, data, action_field):
+    def _run_iters(cls, data, action_field, iterators=None):
         """Recursively fuzz variables in `data` and its children
 
+        `data` is never modified: when any of its values change, a new
+        container is returned which shares every unchanged child with `data`,
+        so only the path from the root to the changed values is copied.
+
         :param data: The request data to be modified
         :param action_field: The name of the field to be replaced
+        :param dict iterators: Iterators to substitute, by placeholder;
+            defaults to the iterators of every parsed template
         :returns: object or string with action_field fuzzed
         :rtype: `dict` OR `str` OR :class:`ElementTree.Element`
         """
         if isinstance(data, dict):
-            return cls._run_iters_dict(data, action_field)
+            return cls._run_iters_dict(data, action_field, iterators)
         elif isinstance(data, ElementTree.Element):
-            return cls._run_iters_xml(data, action_field)
+            return cls._run_iters_xml(data, action_field, iterators)
         elif isinstance(data, basestring):
-            return cls._replace_iter(data)
+            return cls._replace_iter(data, iterators)
         else:
             return data
 
     @classmethod
-    def _run_iters_dict(cls, dic, action_field=""):
+    def _run_iters_dict(cls, dic, action_field="", iterators=None):
         """Run fuzz iterators for a dict type."""
+        items = []
+        changed = False
         for key, val in dic.iteritems():
-            dic[key] = val = cls._replace_iter(val)
+            new_val = cls._replace_iter(val, iterators)
+            if isinstance(new_val, dict):
+                new_val = cls._run_iters_dict(new_val, action_field, iterators)
+            elif isinstance(new_val, list):
+                new_val = cls._run_iters_list(new_val, action_field, iterators)
+            new_key = key
             if isinstance(key, basestring):
-                new_key = cls._replace_iter(key).replace(action_field, "")
-                if new_key != key:
-                    del dic[key]
-                    dic[new_key] = val
-            if isinstance(val, dict):
-                cls._run_iters_dict(val, action_field)
-            elif isinstance(val, list):
-                cls._run_iters_list(val, action_field)
-        return dic
+                new_key = cls._replace_iter(key, iterators)
+                new_key = new_key.replace(action_field, "")
+            changed = changed or new_key is not key or new_val is not val
+            items.append((new_key, new_val))
+        return dict(items) if changed else dic
 
     @classmethod
-    def _run_iters_list(cls, val, action_field=""):
+    def _run_iters_list(cls, val, action_field="", iterators=None):
         """Run fuzz iterators for a list type."""
-        for i, v in enumerate(val):
+        list_ = []
+        for v in val:
             if isinstance(v, basestring):
-                val[i] = v = cls._replace_iter(v).replace(action_field, "")
+                v = cls._replace_iter(v, iterators).replace(action_field, "")
             elif isinstance(v, dict):
-                val[i] = cls._run_iters_dict(v, action_field)
+                v = cls._run_iters_dict(v, action_field, iterators)
             elif isinstance(v, list):
-                cls._run_iters_list(v, action_field)
+                v = cls._run_iters_list(v, action_field, iterators)
+            list_.append(v)
+        if all(new is old for new, old in zip(list_, val)):
+            return val
+        return list_
 
     @classmethod
-    def _run_iters_xml(cls, ele, action_field=""):
+    def _run_iters_xml(cls, ele, action_field="", iterators=None):
         """Run fuzz iterators for an XML element type."""
-        if isinstance(ele.text, basestring):
-            ele.text = cls._replace_iter(ele.text).replace(action_field, "")
-        cls._run_iters_dict(ele.attrib, action_field)
-        for i, v in enumerate(list(ele)):
-            ele[i] = cls._run_iters_xml(v, action_field)
-        return ele
+        text = ele.text
+        if isinstance(text, basestring):
+            text = cls._replace_iter(text, iterators)
+            text = text.replace(action_field, "")
+        attrib = cls._run_iters_dict(ele.attrib, action_field, iterators)
+        children = [
+            cls._run_iters_xml(v, action_field, iterators) for v in ele]
+        if (text is ele.text and attrib is ele.attrib and
+                all(new is old for new, old in zip(children, ele))):
+            return ele
+        ret = ele.copy()
+        ret.text = text
+        ret.attrib = attrib
+        ret[:] = children
+        return ret
 
     @staticmethod
     def _string_data(data):
@@ -94,11 +117,13 @@ class RequestHelperMixin(object):
             return data
 
     @staticmethod
-    def _replace_iter(string):
+    def _replace_iter(string, iterators=None):
         """Fuzz a string."""
         if not isinstance(string, basestring):
             return string
-        for k, v in _iterators.items():
+        if iterators is None:
+            iterators = _iterators
+        for k, v in iterators.items():
             if k in string:
                 string = string.replace(k, v.next())
         return string
@@ -121,17 +146,33 @@ class RequestHelperMixin(object):
         :returns: Copy of request object that has been prepared for sending
         :rtype: :class:`RequestHelperMixin`
         """
-        local_copy = copy.deepcopy(self)
+        local_copy = self.get_copy()
         local_copy.prepare_request()
         return local_copy
 
     def get_copy(self):
-        return copy.deepcopy(self)
+        """Create a copy of `self` whose headers and params can be modified
+
+        The request data is shared with `self` rather than copied, as it is
+        never modified in place (see :meth:`_run_iters`).
+
+        :returns: Copy of request object
+        :rtype: :class:`RequestHelperMixin`
+        """
+        local_copy = copy.copy(self)
+        local_copy.headers = copy.copy(self.headers)
+        local_copy.params = copy.copy(self.params)
+        return local_copy
 
 
 class RequestObject(object):
 
-    """An object that holds information about an HTTP request."""
+    """An object that holds information about an HTTP request.
+
+    :ivar template: Compiled template the request was created from, if any
+    :type template: :class:`syntribos.clients.http.parser.CompiledTemplate`
+    """
+    template = None
 
     def __init__(
         self, method, url, action_field={}, headers={}, params={},
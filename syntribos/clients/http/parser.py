@@ -11,27 +11,79 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import collections
 import importlib
 import json
 import re
+import threading
 import types
 import urlparse
 import uuid
 import xml.etree.ElementTree as ElementTree
 
+from syntribos import capture
 from syntribos.clients.http.models import _iterators
 from syntribos.clients.http.models import RequestObject
 
 
+class CompiledTemplate(object):
+
+    """A request template parsed once, shared by every test type
+
+    Holds the parsed components of a template, with its external function
+    calls already evaluated. It must not be modified: requests are built
+    from it by :meth:`RequestCreator.create_request`, with their own copy of
+    the headers and params. The body is shared, as requests never modify it
+    in place.
+
+    :ivar tuple external_calls: ``(module, function, arguments)`` of each
+        ``CALL_EXTERNAL`` site in the template, in order
+    """
+
+    def __init__(self, method, url, params, version, headers, data,
+                 action_field, external_calls=()):
+        self.method = method
+        self.url = url
+        self.params = params
+        self.version = version
+        self.headers = headers
+        self.data = data
+        self.action_field = action_field
+        self.external_calls = tuple(external_calls)
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derive(self, name, build):
+        """Returns a value computed from this template, building it once
+
+        Used by test types to share what they would otherwise each rebuild
+        from the template, such as the fuzzable slots of its body.
+
+        :param str name: Name of the derived value
+        :param build: Callable returning the value
+        """
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = build()
+            return self._derived[name]
+
+
 class RequestCreator(object):
     ACTION_FIELD = "ACTION_FIELD:"
     EXTERNAL = r"CALL_EXTERNAL\|([^:]+?):([^:]+?):([^|]+?)\|"
     request_model_type = RequestObject
+    max_compiled = 16
+    _compiled = collections.OrderedDict()
+    _compiled_lock = threading.Lock()
+    _functions = {}
 
     @classmethod
     def create_request(cls, string, endpoint):
         """Parse the HTTP request template into its components
 
+        The template is only parsed the first time it is seen (see
+        :meth:`compile`).
+
         :param str string: HTTP request template
         :param str endpoint: URL of the target to be tested
 
@@ -39,7 +91,52 @@ class RequestCreator(object):
         :returns: RequestObject with method, url, params, etc. for use by
                   runner
         """
-        string = cls.call_external_functions(string)
+        template = cls.compile(string, endpoint)
+        request = cls.request_model_type(
+            method=template.method, url=template.url,
+            headers=dict(template.headers), params=dict(template.params),
+            data=template.data, action_field=template.action_field)
+        request.template = template
+        return request
+
+    @classmethod
+    def compile(cls, string, endpoint):
+        """Returns the compiled template for `string`, parsing it on a miss
+
+        The most recently used :attr:`max_compiled` templates are kept, so
+        every test type run against a template shares one parse (and one
+        evaluation of its external function calls).
+
+        :param str string: HTTP request template
+        :param str endpoint: URL of the target to be tested
+        :rtype: :class:`CompiledTemplate`
+        """
+        key = (string, endpoint)
+        with cls._compiled_lock:
+            template = cls._compiled.pop(key, None)
+            if template is None:
+                template = cls._compile(string, endpoint)
+            cls._compiled[key] = template
+            while len(cls._compiled) > cls.max_compiled:
+                cls._compiled.popitem(last=False)
+            return template
+
+    @classmethod
+    def invalidate(cls):
+        """Drops every compiled template."""
+        with cls._compiled_lock:
+            cls._compiled.clear()
+
+    @classmethod
+    def _compile(cls, string, endpoint):
+        """Parses a request template into a :class:`CompiledTemplate`."""
+        external_calls = []
+        if isinstance(string, basestring):
+            external_calls = re.findall(cls.EXTERNAL, string)
+        # Requests sent by extensions (e.g. for tokens) are captured apart,
+        # whichever test type compiles the template first
+        with capture.labelled("CALL_EXTERNAL"):
+            string = cls.call_external_functions(string)
         action_field = str(uuid.uuid4()).replace("-", "")
         string = string.replace(cls.ACTION_FIELD, action_field)
         lines = string.splitlines()
@@ -51,9 +148,10 @@ class RequestCreator(object):
         method, url, params, version = cls._parse_url_line(lines[0], endpoint)
         headers = cls._parse_headers(lines[1:index])
         data = cls._parse_data(lines[index + 1:])
-        return cls.request_model_type(
-            method=method, url=url, headers=headers, params=params, data=data,
-            action_field=action_field)
+        return CompiledTemplate(
+            method=method, url=url, params=params, version=version,
+            headers=headers, data=data, action_field=action_field,
+            external_calls=external_calls)
 
     @classmethod
     def _parse_url_line(cls, line, endpoint):
@@ -118,6 +216,13 @@ class RequestCreator(object):
     def call_external_functions(cls, string):
         """Parse external function calls in the body of request templates
 
+        The template is scanned once, and the output assembled in a single
+        join. Functions are imported once per process. A function returning
+        a single value is only called once per template for the same
+        arguments, and that value used at each of the call sites; functions
+        returning generators are called for every site, so each one gets its
+        own iterator.
+
         :param str string: full HTTP request template as a string
 
         :rtype: str
@@ -127,21 +232,35 @@ class RequestCreator(object):
         if not isinstance(string, basestring):
             return string
 
-        while True:
-            match = re.search(cls.EXTERNAL, string)
-            if not match:
-                break
-            dot_path = match.group(1)
-            func_name = match.group(2)
-            arg_list = match.group(3)
-            mod = importlib.import_module(dot_path)
-            func = getattr(mod, func_name)
-            args = json.loads(arg_list)
-            val = func(*args)
+        parts = []
+        values = {}
+        position = 0
+        for match in re.finditer(cls.EXTERNAL, string):
+            parts.append(string[position:match.start()])
+            position = match.end()
+            call = match.groups()
+            if call in values:
+                parts.append(values[call])
+                continue
+            dot_path, func_name, arg_list = call
+            func = cls._get_function(dot_path, func_name)
+            val = func(*json.loads(arg_list))
             if isinstance(val, types.GeneratorType):
                 local_uuid = str(uuid.uuid4()).replace("-", "")
-                string = re.sub(cls.EXTERNAL, local_uuid, string, count=1)
                 _iterators[local_uuid] = val
+                parts.append(local_uuid)
             else:
-                string = re.sub(cls.EXTERNAL, str(val), string, count=1)
-        return string
+                values[call] = str(val)
+                parts.append(values[call])
+        parts.append(string[position:])
+        return "".join(parts)
+
+    @classmethod
+    def _get_function(cls, dot_path, func_name):
+        """Returns an extension function, importing its module on a miss."""
+        key = (dot_path, func_name)
+        func = cls._functions.get(key)
+        if func is None:
+            mod = importlib.import_module(dot_path)
+            func = cls._functions[key] = getattr(mod, func_name)
+        return func
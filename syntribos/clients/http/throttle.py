@@ -0,0 +1,194 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+
+from six.moves.urllib.parse import urlparse
+
+"""Status codes with which a target tells us to slow down"""
+BACKOFF_STATUS_CODES = (429, 503)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+_settings = {"rate_limit": 0.0, "rate_burst": 0.0, "max_concurrency": 0,
+             "latency_factor": 2.0}
+
+
+class TokenBucket(object):
+
+    """Token bucket allowing `rate` requests per second, in bursts of `burst`
+
+    :ivar rate: Current refill rate, in tokens per second
+    :ivar burst: Maximum number of tokens the bucket holds
+    """
+
+    def __init__(self, rate, burst=None, clock=time.time):
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self._clock = clock
+        self._tokens = self.burst
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token from the bucket
+
+        If the bucket is empty the token is borrowed against the future
+        refill, so concurrent callers queue up behind each other.
+
+        :rtype: float
+        :returns: Seconds the caller must wait before sending its request
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """Blocks until a token is available."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class AdaptiveLimiter(object):
+
+    """Throttles the requests sent to a single target
+
+    Requests are spaced out by a :class:`TokenBucket`, and the number of
+    requests in flight is capped by a concurrency limit. Both are adjusted
+    with AIMD: they are halved (at most once per `cooldown` seconds) when the
+    target answers with 429/503, fails to answer, or when its short-term
+    latency rises above `latency_factor` times its long-term latency, and
+    they grow back additively while the target is healthy.
+
+    :ivar limit: Current concurrency limit, between 1 and `max_concurrency`
+    """
+
+    cooldown = 1.0
+
+    def __init__(self, rate_limit=0, rate_burst=0, max_concurrency=0,
+                 latency_factor=2.0, clock=time.time):
+        self.max_rate = float(rate_limit)
+        self.bucket = None
+        if self.max_rate:
+            self.bucket = TokenBucket(self.max_rate, rate_burst, clock=clock)
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.latency_factor = latency_factor
+        self.fast_latency = None
+        self.slow_latency = None
+        self._in_flight = 0
+        self._last_backoff = None
+        self._clock = clock
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Blocks until a request may be sent to the target."""
+        if self.max_concurrency:
+            with self._cond:
+                while self._in_flight >= int(self.limit):
+                    self._cond.wait()
+                self._in_flight += 1
+        if self.bucket:
+            self.bucket.acquire()
+
+    def release(self, status_code=None, elapsed=None):
+        """Records the outcome of a request and adapts the limits
+
+        :param int status_code: Status of the response, None if it failed
+        :param float elapsed: Seconds the response took
+        """
+        with self._cond:
+            if self.max_concurrency:
+                self._in_flight -= 1
+            if self._is_congested(status_code, elapsed):
+                self._backoff()
+            else:
+                self._ramp_up()
+            self._cond.notify_all()
+
+    def _is_congested(self, status_code, elapsed):
+        if status_code is None or status_code in BACKOFF_STATUS_CODES:
+            return True
+        if elapsed is None:
+            return False
+        if self.slow_latency is None:
+            self.fast_latency = self.slow_latency = elapsed
+            return False
+        self.fast_latency += 0.3 * (elapsed - self.fast_latency)
+        self.slow_latency += 0.05 * (elapsed - self.slow_latency)
+        return self.fast_latency > self.latency_factor * self.slow_latency
+
+    def _backoff(self):
+        now = self._clock()
+        if (self._last_backoff is not None and
+                now - self._last_backoff < self.cooldown):
+            return
+        self._last_backoff = now
+        if self.max_concurrency:
+            self.limit = max(1.0, self.limit / 2)
+        if self.bucket:
+            self.bucket.rate = max(self.max_rate / 100, self.bucket.rate / 2)
+
+    def _ramp_up(self):
+        if self.max_concurrency:
+            self.limit = min(float(self.max_concurrency),
+                             self.limit + 1 / self.limit)
+        if self.bucket:
+            self.bucket.rate = min(
+                self.max_rate, self.bucket.rate + self.max_rate / 100)
+
+
+def configure(rate_limit=0, rate_burst=0, max_concurrency=0,
+              latency_factor=2.0):
+    """Sets the throttling policy applied to every target
+
+    With both `rate_limit` and `max_concurrency` at 0 (the default), requests
+    are not throttled at all.
+
+    :param float rate_limit: Maximum requests per second, per target
+    :param float rate_burst: Requests that may be sent at once before the
+        rate limit applies (defaults to `rate_limit`)
+    :param int max_concurrency: Maximum requests in flight, per target
+    :param float latency_factor: Back off when latency rises above this
+        multiple of the target's usual latency
+    """
+    with _limiters_lock:
+        _settings.update(rate_limit=rate_limit, rate_burst=rate_burst,
+                         max_concurrency=max_concurrency,
+                         latency_factor=latency_factor)
+        _limiters.clear()
+
+
+def get_limiter(url):
+    """Returns the limiter for the target `url` points to
+
+    :param str url: URL of the request about to be sent
+    :rtype: :class:`AdaptiveLimiter`
+    :returns: The limiter for the URL's netloc, or None if throttling is off
+    """
+    if not (_settings["rate_limit"] or _settings["max_concurrency"]):
+        return None
+    netloc = urlparse(url).netloc
+    with _limiters_lock:
+        limiter = _limiters.get(netloc)
+        if limiter is None:
+            limiter = _limiters[netloc] = AdaptiveLimiter(**_settings)
+    return limiter
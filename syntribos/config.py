@@ -29,3 +29,97 @@ class MainConfig(data_interfaces.ConfigSectionInterface):
     def version(self):
         """Used for base_auth test."""
         return self.get("version")
+
+    @property
+    def pool_size(self):
+        """Maximum number of pooled connections kept open per host."""
+        return int(self.get("pool_size", 10))
+
+    @property
+    def keep_alive(self):
+        """Whether connections to the target are reused between requests."""
+        return self.get_boolean("keep_alive", True)
+
+    @property
+    def max_retries(self):
+        """How many times to retry a request that failed to connect."""
+        return int(self.get("max_retries", 0))
+
+    @property
+    def retry_backoff(self):
+        """Backoff factor (in seconds) applied between connection retries."""
+        return float(self.get("retry_backoff", 0.0))
+
+    @property
+    def max_log_body(self):
+        """Characters of each body in the transaction log (0 = no limit)."""
+        return int(self.get("max_log_body", 4096))
+
+    @property
+    def response_head(self):
+        """Bytes kept from the start of each response body (0 = no limit)."""
+        return int(self.get("response_head", 1048576))
+
+    @property
+    def response_tail(self):
+        """Bytes kept from the end of each response body, past its head."""
+        return int(self.get("response_tail", 65536))
+
+    @property
+    def response_read_limit(self):
+        """Bytes of each response body read at most (0 = no limit)."""
+        return int(self.get("response_read_limit", 67108864))
+
+    @property
+    def rate_limit(self):
+        """Maximum requests per second sent to each target (0 = no limit)."""
+        return float(self.get("rate_limit", 0))
+
+    @property
+    def rate_burst(self):
+        """Requests that may be sent at once before `rate_limit` applies."""
+        return float(self.get("rate_burst", 0))
+
+    @property
+    def max_concurrency(self):
+        """Maximum requests in flight to each target (0 = no limit).
+
+        The actual limit is lowered automatically when the target answers
+        with 429/503 or slows down, and raised again once it recovers.
+        """
+        return int(self.get("max_concurrency", 0))
+
+    @property
+    def latency_factor(self):
+        """Back off when a target's latency rises above this multiple."""
+        return float(self.get("latency_factor", 2.0))
+
+    @property
+    def baseline_ttl(self):
+        """Seconds a cached baseline response stays valid (0 = whole run)."""
+        return float(self.get("baseline_ttl", 0))
+
+    @property
+    def cluster_key(self):
+        """Shared secret authenticating workers to a coordinator."""
+        return self.get("cluster_key")
+
+    @property
+    def shard_size(self):
+        """Test cases per work unit handed to a worker node."""
+        return int(self.get("shard_size", 500))
+
+    @property
+    def lease_timeout(self):
+        """Seconds without news before a worker's unit is reassigned."""
+        return float(self.get("lease_timeout", 60))
+
+    @property
+    def evidence_full(self):
+        """Issues per defect whose full request and response are kept."""
+        return int(self.get("evidence_full", 10))
+
+    @property
+    def evidence_truncate(self):
+        """Characters of each body kept as evidence of the other issues."""
+        return int(self.get("evidence_truncate", 1024))
@@ -0,0 +1,65 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Console scripts of syntribos
+
+The gevent transport must patch the standard library before requests, ssl,
+threading or any module creating a lock at import time is imported, so the
+console scripts look at ``--transport`` before importing
+:mod:`syntribos.runner`. Nothing else should be imported by this module.
+"""
+import argparse
+import sys
+
+
+def _get_transport(argv):
+    """Returns the transport requested on the command line `argv`."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--transport", default="threads")
+    args, _ = parser.parse_known_args(argv)
+    return args.transport
+
+
+def _patch(argv):
+    """Patches the standard library for gevent, if it is the transport
+
+    If gevent is not installed, nothing is patched, and the runner reports
+    the missing dependency.
+    """
+    if _get_transport(argv) != "gevent":
+        return
+    try:
+        from gevent import monkey
+    except ImportError:
+        return
+    monkey.patch_all()
+
+
+def entry_point():
+    """Start runner, see :meth:`syntribos.runner.Runner.run`."""
+    _patch(sys.argv[1:])
+    from syntribos import runner
+    return runner.entry_point()
+
+
+def worker_entry_point():
+    """Start a worker node, see :meth:`syntribos.runner.Runner.run_worker`."""
+    _patch(sys.argv[1:])
+    from syntribos import runner
+    return runner.worker_entry_point()
+
+
+def replay_entry_point():
+    """Replay a captured run, see :meth:`syntribos.runner.Runner.replay`."""
+    from syntribos import runner
+    return runner.replay_entry_point()
@@ -0,0 +1,523 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Distributes a scan over worker nodes
+
+A coordinator splits the scan into work units: the test cases of one test
+type against one template, or a range of them for test types whose test
+cases can be generated independently on each node (see
+:attr:`syntribos.tests.base.BaseTestCase.shardable`). Workers, on the same or
+other hosts, lease units from the coordinator, run them and send the outcomes
+back. The coordinator merges outcomes into its result in the order of a
+single-host run, so the report is the same.
+
+Nodes talk over a :class:`multiprocessing.managers.BaseManager` connection,
+authenticated with the ``cluster_key`` of the ``[syntribos]`` config section.
+A worker renews the lease on its unit while running it; the unit of a worker
+that stops doing so (e.g. because it died) is handed to another worker.
+
+The worker running the first unit of a sharded job counts its test cases
+(without generating them) and sends back the baselines of the template, which
+the later units of the template's jobs carry, so other workers do not send
+them again.
+"""
+import collections
+import itertools
+import logging
+from multiprocessing.managers import BaseManager
+import os
+import socket
+import threading
+import time
+import unittest
+
+import syntribos.journal
+from syntribos.journal import TestRecord
+from syntribos.tests import baseline
+from syntribos.tests import registry
+
+LOG = logging.getLogger(__name__)
+
+"""Returned by :meth:`Coordinator.lease` when no unit is ready yet"""
+WAIT = "wait"
+
+
+class WorkUnit(collections.namedtuple(
+        "WorkUnit",
+        "key file_path file_content test_name start stop count baselines")):
+
+    """Test cases of a test type against a template, handed to a worker
+
+    :ivar tuple key: Identifies the unit: (job index, start)
+    :ivar int start: Index of the first test case to run
+    :ivar int stop: Index after the last test case to run, or None for all
+    :ivar bool count: Whether the worker must report the number of test
+        cases of the job (see :meth:`Coordinator.set_size`)
+    :ivar list baselines: Baselines of the template, for the worker to
+        cache (see :meth:`syntribos.tests.baseline.BaselineCache.load`)
+    """
+
+
+class Job(object):
+
+    """The test cases of one test type against one template
+
+    :ivar int shard_size: Test cases per work unit, or None if the test cases
+        are all run by a single worker
+    :ivar int size: Number of test cases, once known
+    :ivar dict baselines: Baselines of the template known so far, by key
+    """
+
+    def __init__(self, file_path, file_content, test_name, shard_size=None):
+        self.file_path = file_path
+        self.file_content = file_content
+        self.test_name = test_name
+        self.shard_size = shard_size
+        self.size = None
+        self.next = 0
+        self.baselines = {}
+
+    def next_unit(self, index):
+        """Returns the next unit of this job to hand out, if any is ready
+
+        The first unit of a sharded job counts its test cases; the other
+        units are only known once it has.
+
+        :param int index: Index of this job in the scan
+        :rtype: :class:`WorkUnit`
+        """
+        if self.shard_size is None:
+            if self.next:
+                return None
+            self.next = 1
+            return WorkUnit((index, 0), self.file_path, self.file_content,
+                            self.test_name, 0, None, False,
+                            list(self.baselines.values()))
+        if self.next and (self.size is None or self.next >= self.size):
+            return None
+        start = self.next
+        self.next += self.shard_size
+        return WorkUnit((index, start), self.file_path, self.file_content,
+                        self.test_name, start, start + self.shard_size,
+                        start == 0, list(self.baselines.values()))
+
+    def starts(self):
+        """Returns the start of each unit of this job, in order
+
+        :rtype: list
+        """
+        if self.shard_size is None:
+            return [0]
+        return list(range(0, max(self.size, 1), self.shard_size))
+
+
+class Coordinator(object):
+
+    """Hands out work units to workers and merges their outcomes
+
+    Units are leased: a worker must renew its lease (see :meth:`heartbeat`)
+    at least every `lease_timeout` seconds, or the unit is handed to another
+    worker. A unit whose lease expired, or that failed, `max_attempts` times
+    is given up and reported as an error.
+
+    Every public method can be called by workers through
+    :meth:`serve`, from concurrent threads.
+
+    :param list jobs: The :class:`Job` objects of the scan, in report order
+    :param result: The result outcomes are merged into
+    :type result: :class:`syntribos.result.IssueTestResult`
+    :param dict settings: Settings of the scan sent to workers
+    :param float lease_timeout: Seconds a lease is valid for
+    """
+
+    max_attempts = 3
+
+    def __init__(self, jobs, result, settings, lease_timeout=60,
+                 clock=time.time):
+        self.jobs = list(jobs)
+        self.result = result
+        self.settings = dict(settings, lease_timeout=lease_timeout)
+        self.lease_timeout = lease_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._leases = {}
+        self._requeued = collections.deque()
+        self._attempts = collections.Counter()
+        self._outcomes = {}
+        self._cursor = (0, 0)
+        self._workers = set()
+        self._dismissed = set()
+        self._server = None
+
+    def get_settings(self):
+        """Returns the settings workers run units with
+
+        :rtype: dict
+        """
+        return self.settings
+
+    def lease(self, worker):
+        """Hands out the next unit to `worker`
+
+        :param str worker: Name of the worker
+        :rtype: :class:`WorkUnit`
+        :returns: The unit to run, :data:`WAIT` if no unit is ready yet, or
+            None once every unit has been run
+        """
+        with self._lock:
+            self._workers.add(worker)
+            self._expire()
+            unit = self._next_unit()
+            if unit is not None:
+                self._leases[unit.key] = (worker, unit,
+                                          self._clock() + self.lease_timeout)
+                return unit
+            if self._cursor is None:
+                self._dismissed.add(worker)
+                return None
+            return WAIT
+
+    def _next_unit(self):
+        while self._requeued:
+            unit = self._requeued.popleft()
+            if unit.key not in self._outcomes:
+                return unit
+        for index, job in enumerate(self.jobs):
+            unit = job.next_unit(index)
+            if unit is not None:
+                return unit
+        return None
+
+    def heartbeat(self, worker, key):
+        """Renews the lease of `worker` on unit `key`
+
+        :rtype: bool
+        :returns: False if the unit has been handed to another worker
+        """
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is None or lease[0] != worker:
+                return False
+            self._leases[key] = (worker, lease[1],
+                                 self._clock() + self.lease_timeout)
+            return True
+
+    def set_size(self, worker, key, size, baselines=()):
+        """Records the number of test cases of the job of unit `key`
+
+        :param int size: Number of test cases, counted by `worker`
+        :param list baselines: Baselines of the job's template, exported by
+            `worker`, that the later units of every job run against the
+            template carry
+        """
+        with self._lock:
+            job = self.jobs[key[0]]
+            if job.size is None:
+                job.size = size
+            for other in self.jobs:
+                if (other.file_path, other.file_content) != (
+                        job.file_path, job.file_content):
+                    continue
+                for entry in baselines:
+                    other.baselines.setdefault(entry[0], entry)
+
+    def complete(self, worker, key, outcome):
+        """Records the outcome of unit `key`
+
+        Outcomes are merged into the result as soon as every unit before
+        them has been merged. Only the first outcome of a unit is kept, if
+        it was run by more than one worker.
+
+        :param str worker: Name of the worker
+        :param dict outcome: ``tests_run``, ``records`` (see
+            :class:`UnitResult`) and ``escalations``
+        """
+        with self._lock:
+            self._leases.pop(key, None)
+            if key in self._outcomes:
+                return
+            self._outcomes[key] = outcome
+            LOG.info("%s completed unit %s", worker, key)
+            self._merge()
+
+    def fail(self, worker, key, error):
+        """Records that `worker` failed to run unit `key`
+
+        The unit is handed to another worker, up to `max_attempts` times.
+
+        :param str error: Traceback of the failure
+        """
+        with self._lock:
+            lease = self._leases.pop(key, None)
+            if lease is not None:
+                LOG.warning("%s failed unit %s: %s", worker, key, error)
+                self._retry(lease[1], error)
+
+    def _expire(self):
+        now = self._clock()
+        for key, (worker, unit, deadline) in list(self._leases.items()):
+            if deadline < now:
+                del self._leases[key]
+                LOG.warning("Lease of %s on unit %s expired", worker, key)
+                self._retry(unit, "Lease of {0} expired".format(worker))
+
+    def _retry(self, unit, error):
+        self._attempts[unit.key] += 1
+        if self._attempts[unit.key] < self.max_attempts:
+            self._requeued.append(unit)
+            return
+        job = self.jobs[unit.key[0]]
+        if unit.count and job.size is None:
+            job.size = unit.stop
+        test_id = "{0}.{1}_{2}_{3}".format(
+            __name__, unit.file_path, unit.test_name, unit.start)
+        self._outcomes[unit.key] = {
+            "tests_run": 0, "escalations": [],
+            "records": [(test_id, test_id, syntribos.journal.ERROR, [],
+                         "Work unit given up: {0}".format(error))]}
+        self._merge()
+
+    def _merge(self):
+        """Merges outcomes into the result, in report order"""
+        while self._cursor is not None:
+            index, position = self._cursor
+            if index == len(self.jobs):
+                self._cursor = None
+                break
+            job = self.jobs[index]
+            if job.shard_size is not None and job.size is None:
+                break
+            starts = job.starts()
+            key = (index, starts[position])
+            if key not in self._outcomes:
+                break
+            outcome = self._outcomes[key]
+            self.result.testsRun += outcome["tests_run"]
+            for test_id, description, state, issues, error in outcome[
+                    "records"]:
+                self.result.add_record(
+                    TestRecord(test_id, description), state,
+                    [syntribos.journal.issue_from_dict(i) for i in issues],
+                    error)
+            self.result.escalations.extend(outcome["escalations"])
+            del outcome["records"][:]
+            if position + 1 < len(starts):
+                self._cursor = (index, position + 1)
+            else:
+                self._cursor = (index + 1, 0)
+
+    def is_done(self):
+        """Returns whether every unit has been merged
+
+        :rtype: bool
+        """
+        with self._lock:
+            return self._cursor is None
+
+    def serve(self, address, authkey):
+        """Serves this coordinator to workers, from a background thread
+
+        :param tuple address: (host, port) to listen on
+        :param str authkey: Shared secret of the nodes
+        :rtype: tuple
+        :returns: The address listened on
+        """
+        class _Manager(BaseManager):
+            pass
+        _Manager.register("coordinator", callable=lambda: self)
+        self._server = _Manager(address=address, authkey=authkey).get_server()
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self._server.address
+
+    def wait(self, interval=1, grace=5):
+        """Waits until every unit has been run and merged
+
+        Leases are checked for expiry every `interval` seconds, even if no
+        worker is connected. Once done, workers still connected are given
+        `grace` seconds to be told that the scan is over.
+        """
+        while not self.is_done():
+            with self._lock:
+                self._expire()
+            time.sleep(interval)
+        deadline = time.time() + grace
+        while time.time() < deadline:
+            with self._lock:
+                if self._dismissed >= self._workers:
+                    break
+            time.sleep(0.1)
+
+
+class CoordinatorClient(BaseManager):
+
+    """Connection of a worker to a :class:`Coordinator`"""
+
+CoordinatorClient.register("coordinator")
+
+
+class UnitResult(unittest.TestResult):
+
+    """Records the outcome of each test case of a unit, to send them back
+
+    Each record is a ``(test id, description, outcome, issues, error)``
+    tuple, issues being serialized with
+    :func:`syntribos.journal.issue_to_dict`. The escalations held by the test
+    cases are kept apart, in :attr:`escalations`.
+    """
+
+    def __init__(self):
+        super(UnitResult, self).__init__()
+        self.records = []
+        self.escalations = []
+
+    def stopTest(self, test):
+        super(UnitResult, self).stopTest(test)
+        escalation = getattr(test, "escalation", None)
+        if escalation is not None:
+            self.escalations.append(escalation)
+
+    def addSuccess(self, test):
+        self.records.append(
+            (test.id(), str(test), syntribos.journal.SUCCESS, [], None))
+
+    def addFailure(self, test, err):
+        issues = [syntribos.journal.issue_to_dict(i) for i in test.failures]
+        self.records.append(
+            (test.id(), str(test), syntribos.journal.FAILURE, issues, None))
+
+    def addError(self, test, err):
+        self.records.append(
+            (test.id(), str(test), syntribos.journal.ERROR, [],
+             self._exc_info_to_string(err, test)))
+
+
+class Worker(object):
+
+    """Runs work units leased from a coordinator until the scan is over
+
+    :param tuple address: (host, port) of the coordinator
+    :param str authkey: Shared secret of the nodes
+    :param runner: Runs the test cases of each unit
+    :type runner: :class:`syntribos.runner.Runner`
+    :param int workers: Number of test cases to run concurrently
+    """
+
+    poll_interval = 1
+
+    def __init__(self, address, authkey, runner, workers=1):
+        self.address = address
+        self.authkey = authkey
+        self.runner = runner
+        self.workers = workers
+        self.name = "{0}-{1}".format(socket.gethostname(), os.getpid())
+        self.coordinator = None
+        self.settings = None
+
+    def connect(self, timeout=30):
+        """Connects to the coordinator, retrying for up to `timeout` seconds
+
+        :rtype: dict
+        :returns: The settings of the scan
+        """
+        deadline = time.time() + timeout
+        while True:
+            client = CoordinatorClient(address=self.address,
+                                       authkey=self.authkey)
+            try:
+                client.connect()
+                break
+            except socket.error:
+                if time.time() > deadline:
+                    raise
+                time.sleep(self.poll_interval)
+        self.coordinator = client.coordinator()
+        self.settings = self.coordinator.get_settings()
+        return self.settings
+
+    def run(self):
+        """Leases and runs units until the coordinator has none left
+
+        :rtype: int
+        :returns: The number of units run
+        """
+        units = 0
+        while True:
+            unit = self.coordinator.lease(self.name)
+            if unit is None:
+                return units
+            if unit == WAIT:
+                time.sleep(self.poll_interval)
+                continue
+            stop = threading.Event()
+            heartbeat = threading.Thread(
+                target=self._heartbeat, args=(unit.key, stop))
+            heartbeat.daemon = True
+            heartbeat.start()
+            try:
+                outcome = self.run_unit(unit)
+            except Exception as e:
+                LOG.exception("Unit %s failed", unit.key)
+                self.coordinator.fail(self.name, unit.key, repr(e))
+                continue
+            finally:
+                stop.set()
+                heartbeat.join()
+            self.coordinator.complete(self.name, unit.key, outcome)
+            units += 1
+
+    def _heartbeat(self, key, stop):
+        interval = self.settings["lease_timeout"] / 4.0
+        while not stop.wait(interval):
+            self.coordinator.heartbeat(self.name, key)
+
+    def run_unit(self, unit):
+        """Generates and runs the test cases of `unit`
+
+        :type unit: :class:`WorkUnit`
+        :rtype: dict
+        :returns: The outcome to send to :meth:`Coordinator.complete`
+        """
+        test_class = registry.get_test_class(unit.test_name)
+        baseline.cache.load(unit.baselines)
+        if unit.stop is None:
+            tests = test_class.get_test_cases(
+                unit.file_path, unit.file_content)
+        else:
+            tests = test_class.get_test_case_range(
+                unit.file_path, unit.file_content, unit.start, unit.stop)
+        tests = (test for test in tests if test)
+        if unit.count:
+            size = test_class.count_test_cases(
+                unit.file_path, unit.file_content)
+            # Generating the first test case fetches the baselines
+            first = list(itertools.islice(tests, 1))
+            self.coordinator.set_size(
+                self.name, unit.key, size,
+                baseline.cache.export(unit.file_path, unit.file_content))
+            tests = itertools.chain(first, tests)
+        result = UnitResult()
+        self.runner.run_tests(tests, result, workers=self.workers)
+        return {"tests_run": result.testsRun, "records": result.records,
+                "escalations": result.escalations}
+
+
+def parse_address(address, default_host="127.0.0.1"):
+    """Splits a ``[HOST:]PORT`` string
+
+    :rtype: tuple
+    :returns: (host, port)
+    """
+    host, _, port = address.rpartition(":")
+    return host or default_host, int(port)
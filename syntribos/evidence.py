@@ -0,0 +1,102 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import collections
+import hashlib
+import json
+import os
+import threading
+
+import six
+
+
+class EvidenceRetention(object):
+
+    """Bounds the evidence (request and response) kept with each issue
+
+    Issues are registered with the request and response that revealed them,
+    including the whole response body. Once an issue is added to the
+    results, its evidence is replaced with a plain dict (see
+    :attr:`syntribos.issue.Issue.evidence`):
+
+    * the first `full` issues of each defect (per URL, test type and defect
+      type) keep the full request and response. If `directory` is given,
+      they are written to a file there, and the evidence only holds its path;
+    * the other issues keep the first `truncate` characters of each body,
+      with the length and SHA-256 digest of the whole body.
+
+    :param int full: Issues per defect to keep full evidence for
+    :param int truncate: Characters of each body kept for the other issues
+    :param str directory: (OPTIONAL) Directory to write full evidence to
+    """
+
+    def __init__(self, full=10, truncate=1024, directory=None):
+        self.full = full
+        self.truncate = truncate
+        self.directory = directory
+        self._counts = collections.Counter()
+        self._files = 0
+        self._lock = threading.Lock()
+
+    def retain(self, issue):
+        """Replaces the request and response of `issue` with its evidence
+
+        :type issue: :class:`syntribos.issue.Issue`
+        """
+        if (getattr(issue, "request", None) is None and
+                getattr(issue, "response", None) is None):
+            return
+        evidence = {}
+        if issue.request is not None:
+            evidence["request"] = issue.request_as_dict(issue.request)
+            evidence["request"]["body"] = _text(issue.request.body)
+        if issue.response is not None:
+            evidence["response"] = issue.response_as_dict(issue.response)
+        issue.request = issue.response = None
+
+        key = (issue.target, issue.path, issue.test_type, issue.defect_type)
+        with self._lock:
+            self._counts[key] += 1
+            full = self._counts[key] <= self.full
+            if full and self.directory:
+                self._files += 1
+                file_name = "{0:06d}_{1}.json".format(
+                    self._files, issue.defect_type)
+        if not full:
+            for part, field in (("request", "body"), ("response", "text")):
+                if part in evidence:
+                    _truncate(evidence[part], field, self.truncate)
+        elif self.directory:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            path = os.path.join(self.directory, file_name)
+            with open(path, "w") as fp:
+                json.dump(evidence, fp, sort_keys=True, indent=2)
+            evidence = {"file": path}
+        issue.evidence = evidence
+
+
+def _text(body):
+    """Returns a request or response body as text for JSON output."""
+    if isinstance(body, six.binary_type):
+        return body.decode("utf-8", "replace")
+    return body
+
+
+def _truncate(evidence, field, size):
+    """Keeps the first `size` characters of a body, and its digest."""
+    body = evidence[field] or u""
+    evidence["{0}_length".format(field)] = len(body)
+    evidence["{0}_sha256".format(field)] = hashlib.sha256(
+        body.encode("utf-8")).hexdigest()
+    evidence[field] = body[:size]
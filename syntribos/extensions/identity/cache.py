@@ -0,0 +1,208 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import calendar
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
+
+_expiry_re = re.compile(
+    r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.\d+)?"
+    r"(Z|[+-]\d{2}:?\d{2})?$")
+
+
+def parse_expiry(value):
+    """Converts a Keystone ``expires``/``expires_at`` timestamp to epoch time
+
+    :param str value: ISO 8601 timestamp, e.g. ``2016-07-21T16:47:03.000000Z``
+    :rtype: float
+    :returns: Seconds since the epoch, or None if `value` can't be parsed
+    """
+    match = _expiry_re.match(value or "")
+    if match is None:
+        return None
+    seconds = calendar.timegm(time.strptime(match.group(1),
+                                            "%Y-%m-%dT%H:%M:%S"))
+    offset = match.group(2)
+    if offset and offset != "Z":
+        offset = offset.replace(":", "")
+        sign = -1 if offset[0] == "-" else 1
+        seconds -= sign * (int(offset[1:3]) * 3600 + int(offset[3:5]) * 60)
+    return float(seconds)
+
+
+class TokenCache(object):
+
+    """Caches the tokens obtained for each user and identity endpoint
+
+    A token is reused until `refresh_margin` seconds before it expires.
+    Within the margin, a single thread authenticates again while the others
+    keep using the current token; once a token has expired, threads wait for
+    the new one. Tokens without an expiry are kept for the whole run.
+
+    If `path` is given, tokens are persisted to that file (readable by the
+    owner only), so later runs reuse them.
+
+    :param float refresh_margin: Seconds before expiry to refresh a token
+    :param str path: (OPTIONAL) File to persist tokens to
+    """
+
+    def __init__(self, refresh_margin=300, path=None, clock=time.time):
+        self.refresh_margin = refresh_margin
+        self.path = path
+        self._clock = clock
+        self._entries = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        if path:
+            self._load()
+
+    @staticmethod
+    def make_key(version, endpoint, user_section_name, *credentials):
+        """Builds the cache key of a user's tokens
+
+        Credentials are only part of the key as a digest, so that tokens
+        persisted for a user are not reused once their credentials change.
+
+        :param str version: Identity API version
+        :param str endpoint: Identity endpoint
+        :param str user_section_name: Config section of the user
+        :rtype: str
+        """
+        digest = hashlib.sha1(json.dumps(credentials)).hexdigest()
+        return "|".join(
+            [version, endpoint or "", user_section_name or "", digest])
+
+    def _get_entry(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def fetch(self, key, authenticate):
+        """Returns the token for `key`, authenticating when needed
+
+        :param str key: Key built by :meth:`make_key`
+        :param authenticate: Callable returning a new ``(token, expires)``
+            tuple, `expires` being a Keystone timestamp or None
+        :rtype: str
+        """
+        entry = self._get_entry(key)
+        if entry is not None:
+            token, expires = entry
+            now = self._clock()
+            if expires is None or now < expires - self.refresh_margin:
+                return token
+            if now < expires:
+                # Refresh early, unless another thread already is
+                lock = self._key_lock(key)
+                if not lock.acquire(False):
+                    return token
+                try:
+                    return self._refresh(key, authenticate, entry)
+                finally:
+                    lock.release()
+        with self._key_lock(key):
+            return self._refresh(key, authenticate, entry)
+
+    def _refresh(self, key, authenticate, stale):
+        entry = self._get_entry(key)
+        if entry is not stale and entry is not None and (
+                entry[1] is None or
+                self._clock() < entry[1] - self.refresh_margin):
+            # Another thread refreshed the token meanwhile
+            return entry[0]
+        token, expires = authenticate()
+        entry = (token, parse_expiry(expires) if expires else None)
+        with self._lock:
+            self._entries[key] = entry
+        if self.path:
+            self._save()
+        return token
+
+    def invalidate(self, key=None):
+        """Drops the token for `key`, or every token if `key` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _load(self):
+        try:
+            with open(self.path) as fp:
+                entries = json.load(fp)
+        except (IOError, ValueError) as e:
+            LOG.debug("Not loading tokens from %s: %s", self.path, e)
+            return
+        now = self._clock()
+        for key, (token, expires) in entries.items():
+            if expires is None or now < expires:
+                self._entries[key] = (token, expires)
+
+    def _save(self):
+        """Writes the tokens to :attr:`path`, replacing it atomically
+
+        Saves are serialized, each writing the tokens as they are when it
+        starts, so the last save writes the latest tokens. A token that can't
+        be saved is still used for this run.
+        """
+        with self._save_lock:
+            with self._lock:
+                entries = dict(self._entries)
+            tmp_path = None
+            try:
+                # Created readable by the owner only
+                fd, tmp_path = tempfile.mkstemp(
+                    dir=os.path.dirname(os.path.abspath(self.path)),
+                    prefix=os.path.basename(self.path) + ".",
+                    suffix=".tmp")
+                with os.fdopen(fd, "w") as fp:
+                    json.dump(entries, fp)
+                os.rename(tmp_path, self.path)
+            except (IOError, OSError) as e:
+                LOG.warning("Unable to save tokens to %s: %s", self.path, e)
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+
+"""tokens is the token cache shared by every template of a run, configured
+from the [auth] section on first use"""
+tokens = None
+_tokens_lock = threading.Lock()
+
+
+def get_cache():
+    """Returns the process-wide :class:`TokenCache`
+
+    :rtype: :class:`TokenCache`
+    """
+    global tokens
+    with _tokens_lock:
+        if tokens is None:
+            # Imported here so this module can be used without a config
+            import syntribos.extensions.identity.config as config
+            endpoint_config = config.EndpointConfig()
+            tokens = TokenCache(endpoint_config.token_refresh_margin,
+                                endpoint_config.token_cache_file)
+        return tokens
@@ -16,6 +16,7 @@ import logging
 from requests import RequestException as RequestException
 
 from syntribos.clients.http.base_http_client import HTTPClient
+from syntribos.extensions.identity import cache
 import syntribos.extensions.identity.config
 import syntribos.extensions.identity.models.v2 as v2
 import syntribos.extensions.identity.models.v3 as v3
@@ -78,13 +79,20 @@ def authenticate_v2_config(user_config, userauth_config):
 
 
 def get_token_v2(user_section_name=None, endpoint_section_name=None):
-    access_data = authenticate_v2_config(
-        syntribos.extensions.identity.config.UserConfig(
-            section_name=user_section_name),
-        syntribos.extensions.identity.config.EndpointConfig(
-            section_name=endpoint_section_name
-        ))
-    return access_data['token']['id']
+    user_config = syntribos.extensions.identity.config.UserConfig(
+        section_name=user_section_name)
+    endpoint_config = syntribos.extensions.identity.config.EndpointConfig(
+        section_name=endpoint_section_name)
+
+    def _authenticate():
+        token = authenticate_v2_config(user_config, endpoint_config)['token']
+        return token['id'], token.get('expires')
+
+    key = cache.TokenCache.make_key(
+        "v2", user_config.endpoint or endpoint_config.endpoint,
+        user_section_name, user_config.username, user_config.password,
+        user_config.tenant_name, user_config.tenant_id)
+    return cache.get_cache().fetch(key, _authenticate)
 
 
 def authenticate_v3(
@@ -138,9 +146,22 @@ def authenticate_v3_config(user_config, endpoint_config):
 
 
 def get_token_v3(user_section_name=None, endpoint_section_name=None):
-    r = authenticate_v3_config(
-        syntribos.extensions.identity.config.UserConfig(
-            section_name=user_section_name),
-        syntribos.extensions.identity.config.EndpointConfig(
-            section_name=endpoint_section_name))
-    return r.headers["X-Subject-Token"]
+    user_config = syntribos.extensions.identity.config.UserConfig(
+        section_name=user_section_name)
+    endpoint_config = syntribos.extensions.identity.config.EndpointConfig(
+        section_name=endpoint_section_name)
+
+    def _authenticate():
+        r = authenticate_v3_config(user_config, endpoint_config)
+        try:
+            expires = r.json()["token"].get("expires_at")
+        except (ValueError, KeyError, TypeError):
+            expires = None
+        return r.headers["X-Subject-Token"], expires
+
+    key = cache.TokenCache.make_key(
+        "v3", user_config.endpoint or endpoint_config.endpoint,
+        user_section_name, user_config.username, user_config.password,
+        user_config.user_id, user_config.domain_id, user_config.domain_name,
+        user_config.token)
+    return cache.get_cache().fetch(key, _authenticate)
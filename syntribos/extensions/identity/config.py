@@ -11,6 +11,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import os
+
 import cafe.engine.models.data_interfaces as data_interfaces
 
 
@@ -29,6 +31,17 @@ class EndpointConfig(data_interfaces.ConfigSectionInterface):
     def deserialize_format(self):
         return self.get("deserialize_format", "json")
 
+    @property
+    def token_refresh_margin(self):
+        """Seconds before a cached token expires to obtain a new one."""
+        return float(self.get("token_refresh_margin", 300))
+
+    @property
+    def token_cache_file(self):
+        """File tokens are kept in between runs, if any."""
+        path = self.get("token_cache_file")
+        return os.path.expanduser(path) if path else None
+
 
 class UserConfig(data_interfaces.ConfigSectionInterface):
     SECTION_NAME = 'user'
@@ -0,0 +1,180 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import sqlite3
+import time
+
+
+def param_label(method, loc, content_type, name):
+    """Returns the label of a fuzzed parameter in reports
+
+    :rtype: str
+    """
+    if loc == "data":
+        return "{0} - {1}:{2}|{3}".format(method, loc, content_type, name)
+    return "{0} - {1}|{2}".format(method, loc, name)
+
+
+class IssueAggregate(object):
+
+    """Issues and errors of a run, aggregated on disk as they are found
+
+    Issues are stored in a SQLite database the way they are reported (see
+    :meth:`failures`): once per URL, test type, parameter and defect type,
+    with the set of payloads that caused them, so the memory used does not
+    grow with the number of issues. Aggregates of several runs or nodes can
+    be merged (see :meth:`merge`).
+
+    If `stream` is given, each issue and error is also written to it as a
+    line of JSON as soon as it is added, issues with their evidence.
+
+    :param str path: Path of the database (default: in memory)
+    :param stream: (OPTIONAL) File-like object to write JSON lines to
+    """
+
+    commit_interval = 1.0
+
+    def __init__(self, path=":memory:", stream=None, clock=time.time):
+        self.path = path
+        self.stream = stream
+        self._clock = clock
+        # Outcomes are merged from the coordinator's server threads, one at
+        # a time (see syntribos.distributed)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # Payloads are byte strings, not necessarily valid UTF-8
+        self._conn.text_factory = str
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS defects (
+                url TEXT, test_type TEXT, param TEXT, defect_type TEXT,
+                details TEXT,
+                PRIMARY KEY (url, test_type, param, defect_type));
+            CREATE TABLE IF NOT EXISTS payloads (
+                url TEXT, test_type TEXT, param TEXT, defect_type TEXT,
+                payload TEXT,
+                PRIMARY KEY (url, test_type, param, defect_type, payload));
+            CREATE TABLE IF NOT EXISTS errors (test TEXT, error TEXT);
+            """)
+        self._last_commit = clock()
+
+    def add_issue(self, issue):
+        """Adds an issue
+
+        :type issue: :class:`syntribos.issue.Issue`
+        """
+        record = {"url": "{0}{1}".format(issue.target, issue.path),
+                  "test_type": issue.test_type, "parameter": "",
+                  "defect_type": issue.defect_type,
+                  "details": issue.get_details(), "payload": None}
+        param = issue.impacted_parameter
+        if param:
+            # Only fuzz tests have an ImpactedParameter
+            record["parameter"] = param_label(
+                param.method, param.location, issue.content_type, param.name)
+            record["payload"] = param.trunc_fuzz_string
+        key = (record["url"], record["test_type"], record["parameter"],
+               record["defect_type"])
+        self._conn.execute(
+            "INSERT OR IGNORE INTO defects VALUES (?, ?, ?, ?, ?)",
+            key + (json.dumps(record["details"]), ))
+        if param:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO payloads VALUES (?, ?, ?, ?, ?)",
+                key + (record["payload"], ))
+        evidence = getattr(issue, "evidence", None)
+        if evidence:
+            record["evidence"] = evidence
+        self._write({"issue": record})
+        self._maybe_commit()
+
+    def add_error(self, test, error):
+        """Adds an errored test case
+
+        :param str test: Description of the test case
+        :param str error: Traceback of the error
+        """
+        self._conn.execute("INSERT INTO errors VALUES (?, ?)", (test, error))
+        self._write({"error": {"test": test, "error": error}})
+        self._maybe_commit()
+
+    def _write(self, line):
+        if self.stream is not None:
+            self.stream.write(json.dumps(line, sort_keys=True))
+            self.stream.write("\n")
+            self.stream.flush()
+
+    def _maybe_commit(self):
+        if self._clock() - self._last_commit >= self.commit_interval:
+            self.commit()
+
+    def commit(self):
+        self._conn.commit()
+        self._last_commit = self._clock()
+
+    def merge(self, path):
+        """Adds the issues and errors of the aggregate stored at `path`
+
+        :param str path: Path of the database of another aggregate
+        """
+        self.commit()
+        self._conn.execute("ATTACH DATABASE ? AS other", (path, ))
+        try:
+            with self._conn:
+                for table in ("defects", "payloads"):
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO {0} SELECT * FROM other.{0} "
+                        "ORDER BY rowid".format(table))
+                self._conn.execute(
+                    "INSERT INTO errors SELECT * FROM other.errors "
+                    "ORDER BY rowid")
+        finally:
+            self._conn.execute("DETACH DATABASE other")
+
+    def failures(self):
+        """Returns the issues, nested as reported
+
+        Issues are nested by URL, test type, parameter (for fuzz tests) and
+        defect type. The details of the first issue of each defect type are
+        reported, with the list of payloads that caused it for fuzz tests.
+
+        :rtype: dict
+        """
+        failures = {}
+        defects = {}
+        for url, test_type, param, defect_type, details in self._conn.execute(
+                "SELECT * FROM defects ORDER BY rowid"):
+            by_test = failures.setdefault(url, {}).setdefault(test_type, {})
+            details = json.loads(details)
+            if param:
+                details["payloads"] = []
+                by_test.setdefault(param, {})[defect_type] = details
+            else:
+                by_test[defect_type] = details
+            defects[(url, test_type, param, defect_type)] = details
+        for row in self._conn.execute("SELECT * FROM payloads ORDER BY rowid"):
+            defects[row[:4]]["payloads"].append(row[4])
+        return failures
+
+    def errors(self):
+        """Returns the errored test cases, as reported
+
+        :rtype: list
+        """
+        return [{"test": test, "error": error} for test, error in
+                self._conn.execute("SELECT * FROM errors ORDER BY rowid")]
+
+    def close(self):
+        self.commit()
+        self._conn.close()
@@ -13,82 +13,63 @@
 # limitations under the License.
 import json
 
+from syntribos.formatters.aggregate import IssueAggregate
+from syntribos.formatters.aggregate import param_label
+
 
 class JSONFormatter(object):
 
     def __init__(self, results):
         self.results = results
 
-    def report(self):
-        machine_output = dict({'failures': {}, 'errors': [], 'stats': []})
-
-        # reports errors
+    def get_aggregate(self, stream=None):
+        """Returns the aggregate of the results' issues and errors
+
+        Results of a run add their issues and errors to an aggregate as they
+        are found (see :class:`syntribos.result.IssueTestResult`); otherwise
+        they are aggregated now, in memory.
+
+        :param stream: (OPTIONAL) Stream to write the issues and errors to,
+            if they are aggregated now
+        :rtype: :class:`syntribos.formatters.aggregate.IssueAggregate`
+        """
+        aggregate = getattr(self.results, 'aggregate', None)
+        if aggregate is not None:
+            return aggregate
+        aggregate = IssueAggregate(stream=stream)
         for test, error in self.results.errors:
-            machine_output['errors'].append(
-                {
-                    'test': self.results.getDescription(test),
-                    'error': error
-                })
-
-        # reports failures
-        # Gets list of [issues] by flattening list of [(test, [issues])]
-        issues = [issue for test, failures in self.results.failures
-                  for issue in failures]
-        for issue in issues:
-            target = issue.target
-            path = issue.path
-            url = "{0}{1}".format(target, path)
-            test_type = issue.test_type
-
-            if issue.impacted_parameter:
-                # Only fuzz tests have an ImpactedParameter
-                method = issue.impacted_parameter.method
-                loc = issue.impacted_parameter.location
-                name = issue.impacted_parameter.name
-                content_type = issue.content_type
-                if loc == "data":
-                    param = "{0} - {1}:{2}|{3}".format(method, loc,
-                                                       content_type, name)
-                else:
-                    param = "{0} - {1}|{2}".format(method, loc, name)
-            defect_type = issue.defect_type
-
-            if url not in machine_output['failures']:
-                machine_output['failures'][url] = {}
-
-            issues_by_url = machine_output['failures'][url]
-            if test_type not in issues_by_url:
-                issues_by_url[test_type] = {}
+            aggregate.add_error(self.results.getDescription(test), error)
+        for test, failures in self.results.failures:
+            for issue in failures:
+                aggregate.add_issue(issue)
+        return aggregate
+
+    def get_escalations(self):
+        """Returns parameters escalated to every fuzz string (adaptive scans)
+
+        :rtype: dict
+        """
+        escalations = {}
+        for escalation in getattr(self.results, 'escalations', None) or []:
+            url = "{0}{1}".format(escalation['target'], escalation['path'])
+            param = param_label(
+                escalation['method'], escalation['location'],
+                escalation['content_type'], escalation['name'])
+            by_test = escalations.setdefault(url, {}).setdefault(
+                escalation['test_type'], {})
+            by_test[param] = escalation['reasons']
+        return escalations
 
-            issues_by_test = issues_by_url[test_type]
-            if issue.impacted_parameter:
-                if param not in issues_by_test:
-                    issues_by_test[param] = {}
-
-                issues_by_param = issues_by_test[param]
-                if defect_type not in issues_by_param:
-                    issues_by_param[defect_type] = issue.get_details()
-                    issues_by_param[defect_type]['payloads'] = set(
-                        [issue.impacted_parameter.trunc_fuzz_string])
-
-                issues_by_defect = issues_by_param[defect_type]
-                issues_by_defect['payloads'].add(
-                    issue.impacted_parameter.trunc_fuzz_string)
-            else:
-                if defect_type not in issues_by_test:
-                    issues_by_test[defect_type] = issue.get_details()
-
-        # reports stats
-        machine_output['stats'] = self.results.stats
+    def report(self):
+        aggregate = self.get_aggregate()
+        machine_output = {'failures': aggregate.failures(),
+                          'errors': aggregate.errors(),
+                          'stats': self.results.stats}
+        escalations = self.get_escalations()
+        if escalations:
+            machine_output['escalations'] = escalations
 
         output = json.dumps(machine_output, sort_keys=True,
-                            indent=2, separators=(',', ': '), cls=SetEncoder)
+                            indent=2, separators=(',', ': '))
 
         self.results.stream.write(output)
-
-
-class SetEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, set):
-            return list(obj)
-        return json.JSONEncoder.default(self, obj)
@@ -0,0 +1,38 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+
+from syntribos.formatters.json_formatter import JSONFormatter
+
+
+class NDJSONFormatter(JSONFormatter):
+
+    """Reports issues as newline-delimited JSON, while tests run
+
+    Each issue and error is written on its own line as soon as it is found,
+    as ``{"issue": {...}}`` or ``{"error": {...}}``, by the results'
+    aggregate (see :class:`syntribos.formatters.aggregate.IssueAggregate`).
+    The report adds a last line with the stats of the run and, in adaptive
+    scans, the escalated parameters.
+    """
+
+    def report(self):
+        # Issues and errors are only written here if they were not streamed
+        self.get_aggregate(stream=self.results.stream)
+        summary = {'stats': self.results.stats}
+        escalations = self.get_escalations()
+        if escalations:
+            summary['escalations'] = escalations
+        self.results.stream.write(json.dumps(summary, sort_keys=True))
+        self.results.stream.write("\n")
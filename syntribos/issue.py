@@ -38,6 +38,9 @@ class Issue(object):
     :ivar impacted_parameter: For fuzz tests only, a
         :class:`syntribos.tests.fuzz.base_fuzz.ImpactedParameter` that holds
         data about what part of the request was affected by the fuzz test.
+    :ivar evidence: The request and response, as a dict, once the issue has
+        been added to the results (see
+        :class:`syntribos.evidence.EvidenceRetention`)
     """
 
     def __init__(self, test, severity, text, confidence,
@@ -49,6 +52,7 @@ class Issue(object):
         self.request = request
         self.response = response
         self.impacted_parameter = None
+        self.evidence = None
 
     def as_dict(self):
         """Convert the issue to a dict of values for outputting.
@@ -0,0 +1,211 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import sqlite3
+import time
+
+from syntribos.issue import Issue
+
+SUCCESS = "success"
+FAILURE = "failure"
+ERROR = "error"
+
+
+class _ParameterRecord(object):
+
+    """Impacted parameter of an issue read back from a journal
+
+    Holds the same attributes as
+    :class:`syntribos.tests.fuzz.base_fuzz.ImpactedParameter`.
+    """
+
+    def __init__(self, method, location, name, value):
+        self.method = method
+        self.location = location
+        self.name = name
+        self.trunc_fuzz_string = value
+
+    def as_dict(self):
+        return {"method": self.method, "location": self.location,
+                "name": self.name, "value": self.trunc_fuzz_string}
+
+
+class TestRecord(object):
+
+    """Test case run elsewhere, as reported by the results
+
+    Stands for a test case read back from a journal, or run by a worker node.
+    """
+
+    def __init__(self, test_id, description):
+        self._id = test_id
+        self._description = description
+
+    def id(self):
+        return self._id
+
+    def shortDescription(self):
+        return None
+
+    def __str__(self):
+        return self._description
+
+
+def issue_to_dict(issue):
+    """Serializes an :class:`syntribos.issue.Issue` for the journal
+
+    :rtype: dict
+    """
+    if isinstance(issue, dict):
+        return issue
+    param = getattr(issue, "impacted_parameter", None)
+    return {
+        "defect_type": issue.defect_type,
+        "severity": issue.severity,
+        "text": issue.text,
+        "confidence": issue.confidence,
+        "target": getattr(issue, "target", None),
+        "path": getattr(issue, "path", None),
+        "test_type": getattr(issue, "test_type", None),
+        "content_type": getattr(issue, "content_type", None),
+        "impacted_parameter": param.as_dict() if param else None}
+
+
+def issue_from_dict(data):
+    """Rebuilds an issue serialized by :func:`issue_to_dict`
+
+    The request and response of the issue are not kept in the journal.
+
+    :rtype: :class:`syntribos.issue.Issue`
+    """
+    if "defect_type" not in data:
+        # Not serialized from an Issue object
+        return data
+    issue = Issue(test=data["defect_type"], severity=data["severity"],
+                  text=data["text"], confidence=data["confidence"])
+    for attr in ("target", "path", "test_type", "content_type"):
+        setattr(issue, attr, data[attr])
+    if data["impacted_parameter"]:
+        issue.impacted_parameter = _ParameterRecord(
+            **data["impacted_parameter"])
+    return issue
+
+
+class RunJournal(object):
+
+    """Durable, append-only record of the test cases completed in a run
+
+    Each test case is recorded, with its outcome and issues, in a SQLite
+    database, so an interrupted run can be resumed: test cases that already
+    passed or failed are skipped, and their results are read back into the
+    final report (see :meth:`replay`), with the escalations of adaptive scans
+    they held. Test cases that errored are run again.
+
+    Records are committed at most every `commit_interval` seconds, so a
+    crash loses at most the test cases completed since.
+    """
+
+    commit_interval = 1.0
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._conn = sqlite3.connect(path)
+        self._conn.text_factory = str
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cases ("
+            "test_id TEXT PRIMARY KEY, outcome TEXT NOT NULL, "
+            "description TEXT, error TEXT, issues TEXT)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS escalations ("
+            "test_id TEXT PRIMARY KEY, escalation TEXT NOT NULL)")
+        self._conn.commit()
+        self._last_commit = clock()
+
+    @staticmethod
+    def get_path(run_id):
+        """Returns the path of the journal of run `run_id`
+
+        Journals are kept in the log directory of their run, whose name is
+        the run ID.
+
+        :param str run_id: ID of the run
+        :rtype: str
+        """
+        return os.path.join(
+            os.environ.get("CAFE_ROOT_LOG_PATH", ""), run_id, "journal.db")
+
+    def record(self, test, outcome, issues=(), error=None):
+        """Records the outcome of a test case
+
+        The escalation held by the test case, if any, is recorded with it.
+
+        :param test: The test case
+        :param str outcome: One of `SUCCESS`, `FAILURE` or `ERROR`
+        :param list issues: Issues found by a failed test case
+        :param str error: Traceback of an errored test case
+        """
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cases VALUES (?, ?, ?, ?, ?)",
+            (test.id(), outcome, str(test), error,
+             json.dumps([issue_to_dict(i) for i in issues])))
+        escalation = getattr(test, "escalation", None)
+        if escalation is not None:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO escalations VALUES (?, ?)",
+                (test.id(), json.dumps(escalation)))
+        if self._clock() - self._last_commit >= self.commit_interval:
+            self.commit()
+
+    def commit(self):
+        """Makes every recorded test case durable."""
+        self._conn.commit()
+        self._last_commit = self._clock()
+
+    def finished(self):
+        """Returns the IDs of the test cases that passed or failed
+
+        :rtype: set
+        """
+        return set(row[0] for row in self._conn.execute(
+            "SELECT test_id FROM cases WHERE outcome != ?", (ERROR, )))
+
+    def replay(self, result):
+        """Adds the recorded passed and failed test cases to `result`
+
+        :param result: Result of the resumed run
+        :type result: :class:`syntribos.result.IssueTestResult`
+        :rtype: int
+        :returns: The number of test cases read back
+        """
+        rows = self._conn.execute(
+            "SELECT test_id, outcome, description, issues, escalation "
+            "FROM cases LEFT JOIN escalations USING (test_id) "
+            "WHERE outcome != ? ORDER BY cases.rowid", (ERROR, ))
+        count = 0
+        for test_id, outcome, description, issues, escalation in rows:
+            count += 1
+            result.testsRun += 1
+            result.add_record(
+                TestRecord(test_id, description), outcome,
+                [issue_from_dict(i) for i in json.loads(issues)],
+                escalation=escalation and json.loads(escalation))
+        return count
+
+    def close(self):
+        self.commit()
+        self._conn.close()
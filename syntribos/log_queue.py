@@ -0,0 +1,122 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import threading
+
+from six.moves import queue
+
+_formatter = logging.Formatter()
+
+
+class QueueHandler(logging.Handler):
+
+    """Hands log records over to a :class:`QueueListener`
+
+    Records are neither formatted nor written by the thread that logs them:
+    their message is only built when the listener's handlers emit them. A
+    traceback is formatted right away, as it can't be kept around. The
+    arguments of a record are kept until it is written, so they should be
+    small snapshots (see ``_LogLine`` in
+    :mod:`syntribos.clients.http.base_http_client`), not live objects such
+    as responses.
+    """
+
+    def __init__(self, records):
+        logging.Handler.__init__(self)
+        self.records = records
+
+    def emit(self, record):
+        try:
+            if record.exc_info:
+                record.exc_text = _formatter.formatException(record.exc_info)
+                record.exc_info = None
+            self.records.put(record)
+        except Exception:
+            self.handleError(record)
+
+
+class QueueListener(object):
+
+    """Writes the records put in a queue with `handlers`, on its own thread
+
+    :param records: Queue filled by a :class:`QueueHandler`
+    :param list handlers: Handlers the records are passed to
+    """
+
+    _stop = object()
+
+    def __init__(self, records, handlers):
+        self.records = records
+        self.handlers = handlers
+        self._thread = None
+
+    def start(self):
+        """Starts writing the queued records."""
+        self._thread = threading.Thread(target=self._monitor)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _monitor(self):
+        while True:
+            record = self.records.get()
+            if record is self._stop:
+                return
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+    def stop(self):
+        """Writes the records left in the queue, then stops the thread."""
+        self.records.put(self._stop)
+        self._thread.join()
+        self._thread = None
+
+
+_listener = None
+
+
+def enable(maxsize=10000):
+    """Moves the handlers of the root logger behind a queue
+
+    Loggers then only queue their records, which are written by a
+    :class:`QueueListener`. At most `maxsize` records wait in the queue;
+    once it is full, logging blocks until the listener catches up.
+
+    :param int maxsize: Maximum number of records waiting to be written
+    """
+    global _listener
+    if _listener is not None:
+        return
+    root = logging.getLogger()
+    records = queue.Queue(maxsize)
+    _listener = QueueListener(records, list(root.handlers))
+    for handler in _listener.handlers:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(records))
+    _listener.start()
+
+
+def disable():
+    """Writes the queued records and gives the handlers back to the root."""
+    global _listener
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    for handler in _listener.handlers:
+        root.addHandler(handler)
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    _listener.stop()
+    _listener = None
@@ -15,6 +15,8 @@ import sys
 import unittest
 
 from syntribos.formatters.json_formatter import JSONFormatter
+from syntribos.formatters.ndjson_formatter import NDJSONFormatter
+import syntribos.journal
 
 
 class IssueTestResult(unittest.TextTestResult):
@@ -23,8 +25,34 @@ class IssueTestResult(unittest.TextTestResult):
 
     This class aggregates :class:`syntribos.issue.Issue` objects from all the
     tests as they run
+
+    :ivar list escalations: Parameters fuzzed with every string in adaptive
+        scans, and the reasons why, as held by the test cases that escalated
+        them (see :meth:`syntribos.tests.fuzz.base_fuzz.BaseFuzzTestCase.
+        _get_adaptive_cases`)
+    :ivar journal: (OPTIONAL) Journal the outcome of each test is recorded in
+    :type journal: :class:`syntribos.journal.RunJournal`
+    :ivar aggregate: (OPTIONAL) Aggregate issues and errors are added to as
+        they are found, instead of being kept in memory until the report
+    :type aggregate: :class:`syntribos.formatters.aggregate.IssueAggregate`
+    :ivar evidence: (OPTIONAL) Policy bounding the evidence kept with issues
+    :type evidence: :class:`syntribos.evidence.EvidenceRetention`
     """
     stats = {"errors": 0, "failures": 0, "successes": 0}
+    journal = None
+    aggregate = None
+    evidence = None
+
+    def __init__(self, *args, **kwargs):
+        super(IssueTestResult, self).__init__(*args, **kwargs)
+        self.escalations = []
+
+    def stopTest(self, test):
+        """Records the escalation held by `test`, if any."""
+        super(IssueTestResult, self).stopTest(test)
+        escalation = getattr(test, "escalation", None)
+        if escalation is not None:
+            self.escalations.append(escalation)
 
     def addFailure(self, test, err):
         """Adds issues to data structures
@@ -36,8 +64,9 @@ class IssueTestResult(unittest.TextTestResult):
         :type test: :class:`syntribos.tests.base.BaseTestCase`
         :param tuple err: Tuple of format ``(type, value, traceback)``
         """
-        self.failures.append((test, test.failures))
-        self.stats["failures"] += len(test.failures)
+        self._add_failure(test, test.failures)
+        if self.journal:
+            self.journal.record(test, syntribos.journal.FAILURE, test.failures)
         if self.showAll:
             sys.stdout.write("FAIL\n")
         elif self.dots:
@@ -52,8 +81,10 @@ class IssueTestResult(unittest.TextTestResult):
         :param err:
         :type tuple: Tuple of format ``(type, value, traceback)``
         """
-        self.errors.append((test, self._exc_info_to_string(err, test)))
-        self.stats["errors"] += 1
+        self._add_error(test, self._exc_info_to_string(err, test))
+        if self.journal:
+            self.journal.record(test, syntribos.journal.ERROR,
+                                error=self.errors[-1][1])
         if self.showAll:
             sys.stdout.write("ERROR\n")
         elif self.dots:
@@ -67,22 +98,71 @@ class IssueTestResult(unittest.TextTestResult):
         :type test: :class:`syntribos.tests.base.BaseTestCase`
         """
         self.stats["successes"] += 1
+        if self.journal:
+            self.journal.record(test, syntribos.journal.SUCCESS)
         if self.showAll:
             sys.stdout.write("ok\n")
         elif self.dots:
             sys.stdout.write('.')
             sys.stdout.flush()
 
+    def add_record(self, test, outcome, issues=(), error=None,
+                   escalation=None):
+        """Adds the outcome of a test case that was not run by this result
+
+        Used for outcomes read back from a journal or sent by a worker node
+        (see :mod:`syntribos.distributed`). Nothing is written to the stream,
+        and :attr:`testsRun` is left to the caller.
+
+        :param test: The test case
+        :type test: :class:`syntribos.journal.TestRecord`
+        :param str outcome: :data:`~syntribos.journal.SUCCESS`,
+            :data:`~syntribos.journal.FAILURE` or
+            :data:`~syntribos.journal.ERROR`
+        :param list issues: Issues found by a failed test case
+        :param str error: Traceback of an errored test case
+        :param dict escalation: Escalation held by the test case, if any
+        """
+        if escalation is not None:
+            self.escalations.append(escalation)
+        if outcome == syntribos.journal.SUCCESS:
+            self.stats["successes"] += 1
+        elif outcome == syntribos.journal.FAILURE:
+            self._add_failure(test, list(issues))
+        else:
+            self._add_error(test, error)
+
+    def _add_failure(self, test, issues):
+        self.stats["failures"] += len(issues)
+        if self.evidence is not None:
+            for issue in issues:
+                self.evidence.retain(issue)
+        if self.aggregate is not None:
+            for issue in issues:
+                self.aggregate.add_issue(issue)
+            # Only keep what the summary needs in memory
+            test = syntribos.journal.TestRecord(test.id(), str(test))
+            issues = []
+        self.failures.append((test, issues))
+
+    def _add_error(self, test, error):
+        self.stats["errors"] += 1
+        if self.aggregate is not None:
+            self.aggregate.add_error(self.getDescription(test), error)
+            test = syntribos.journal.TestRecord(test.id(), str(test))
+        self.errors.append((test, error))
+
     def printErrors(self, output_format):
         """Print out each :class:`syntribos.issue.Issue` that was encountered
 
         :param str output_format: Either "json" or "xml"
         """
         formatter_types = {
-            "json": JSONFormatter(self)
+            "json": JSONFormatter(self),
+            "ndjson": NDJSONFormatter(self)
         }
         formatter = formatter_types[output_format]
-        if self.dots or self.showAll:
+        if (self.dots or self.showAll) and output_format != "ndjson":
             self.stream.writeln()
         formatter.report()
 
@@ -90,3 +170,51 @@ class IssueTestResult(unittest.TextTestResult):
         """Print errors when the test run is complete."""
         super(IssueTestResult, self).stopTestRun()
         self.printErrors()
+
+
+class BufferedTestResult(unittest.TestResult):
+
+    """Records the outcome of a test so it can be replayed later
+
+    Used by the runner when test cases are executed concurrently: each worker
+    runs its test against a private :class:`BufferedTestResult`, and the
+    recorded calls are replayed onto the shared
+    :class:`IssueTestResult` from a single thread, in the original order.
+    """
+
+    def __init__(self):
+        super(BufferedTestResult, self).__init__()
+        self.events = []
+
+    def startTest(self, test):
+        self.events.append(("startTest", (test, )))
+
+    def stopTest(self, test):
+        self.events.append(("stopTest", (test, )))
+
+    def addFailure(self, test, err):
+        self.events.append(("addFailure", (test, err)))
+
+    def addError(self, test, err):
+        self.events.append(("addError", (test, err)))
+
+    def addSuccess(self, test):
+        self.events.append(("addSuccess", (test, )))
+
+    def addSkip(self, test, reason):
+        self.events.append(("addSkip", (test, reason)))
+
+    def addExpectedFailure(self, test, err):
+        self.events.append(("addExpectedFailure", (test, err)))
+
+    def addUnexpectedSuccess(self, test):
+        self.events.append(("addUnexpectedSuccess", (test, )))
+
+    def replay(self, result):
+        """Replays every recorded call onto `result`
+
+        :param result: The result object to replay the events onto
+        :type result: :class:`IssueTestResult`
+        """
+        for name, args in self.events:
+            getattr(result, name)(*args)
@@ -11,25 +11,96 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import functools
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
 import os
-import pkgutil
+import socket
 import sys
+import threading
 import time
 import unittest
+from unittest.suite import _ErrorHolder
+from unittest.util import strclass
 
 from cafe.common.reporting.cclogging import init_root_log_handler
 from cafe.configurator.managers import TestEnvManager
 import cafe.drivers.base
 
 import syntribos.arguments
+from syntribos import capture
+from syntribos.clients.http.base_http_client import HTTPClient
+from syntribos.clients.http import green
+from syntribos.clients.http import parser
+from syntribos.clients.http import throttle
 import syntribos.config
+from syntribos import distributed
+from syntribos.evidence import EvidenceRetention
+from syntribos.formatters.aggregate import IssueAggregate
+from syntribos.journal import RunJournal
+from syntribos import log_queue
+from syntribos.result import BufferedTestResult
 from syntribos.result import IssueTestResult
-import syntribos.tests as tests
-import syntribos.tests.base
+from syntribos.tests import baseline
+from syntribos.tests import registry
 
 result = None
 
 
+class _ClassFixtures(object):
+
+    """Runs class-level fixtures of concurrently run tests
+
+    unittest sets a class up and tears it down whenever consecutive tests of
+    a suite change class, which does not hold when test cases of the same
+    class run concurrently. Instead, each class is set up the first time one
+    of its tests runs, and torn down once all tests have been run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._classes = []
+        self._set_up = {}
+
+    def set_up(self, test, result):
+        """Sets up the class of `test` unless it already was
+
+        :param test: The test about to be run
+        :param result: Result to report a setUpClass error to
+        :rtype: bool
+        :returns: Whether the class was set up successfully
+        """
+        test_class = type(test)
+        with self._lock:
+            if test_class not in self._set_up:
+                self._classes.append(test_class)
+                try:
+                    test_class.setUpClass()
+                    self._set_up[test_class] = True
+                except Exception:
+                    self._set_up[test_class] = False
+                    result.addError(_ErrorHolder("setUpClass ({0})".format(
+                        strclass(test_class))), sys.exc_info())
+            return self._set_up[test_class]
+
+    def tear_down(self, result):
+        """Tears down every class that was set up successfully
+
+        :param result: Result to report tearDownClass errors to
+        """
+        with self._lock:
+            for test_class in self._classes:
+                if not self._set_up[test_class]:
+                    continue
+                try:
+                    test_class.tearDownClass()
+                except Exception:
+                    result.addError(_ErrorHolder("tearDownClass ({0})".format(
+                        strclass(test_class))), sys.exc_info())
+            self._classes = []
+            self._set_up = {}
+
+
 class Runner(object):
 
     @classmethod
@@ -42,30 +113,27 @@ class Runner(object):
     def load_modules(cls, package):
         """Imports all tests (:mod:`syntribos.tests`)
 
+        Tests are imported as they are needed by :meth:`get_tests`, this is
+        only needed to register every test type at once.
+
         :param package: a package of tests for pkgutil to load
         """
-        if not os.environ.get("CAFE_CONFIG_FILE_PATH"):
-            os.environ["CAFE_CONFIG_FILE_PATH"] = "./"
-        for importer, modname, ispkg in pkgutil.walk_packages(
-            path=package.__path__,
-            prefix=package.__name__ + '.',
-                onerror=lambda x: None):
-            __import__(modname, fromlist=[])
+        registry.load_all(package)
 
     @classmethod
     def get_tests(cls, test_types=None):
         """Yields relevant tests based on test type (from ```syntribos.arguments```)
 
+        Test types are looked up in the index of test modules (see
+        :mod:`syntribos.tests.registry`), and only the modules of the test
+        types to be run are imported.
+
         :param list test_types: Test types to be run
 
         :rtype: tuple
         :returns: (test type (str), ```syntribos.tests.base.TestType```)
         """
-        cls.load_modules(tests)
-        test_types = test_types or [""]
-        for k, v in sorted(syntribos.tests.base.test_table.items()):
-            if any([True for t in test_types if t in k]):
-                yield k, v
+        return registry.get_tests(test_types)
 
     @staticmethod
     def print_symbol():
@@ -101,6 +169,8 @@ class Runner(object):
         if test_log:
             print("=" * 70)
             print("LOG PATH..........: {0}".format(test_log))
+            print("RUN ID............: {0}".format(
+                os.path.basename(test_log.rstrip(os.sep))))
             print("=" * 70)
 
     @classmethod
@@ -115,29 +185,54 @@ class Runner(object):
                 """
             args, unknown = syntribos.arguments.SyntribosCLI(
                 usage=usage).parse_known_args()
+            if args.transport == "gevent":
+                green.enable()
             test_env_manager = TestEnvManager(
                 "", args.config, test_repo_package_name="os")
             test_env_manager.finalize()
-            cls.set_env()
+            cls.set_env(args)
+            cls.configure_clients(args)
             init_root_log_handler()
+            log_queue.enable()
 
             cls.print_log()
 
+            verbosity = 2 if args.verbose else 1
             if not args.output_file:
+                if args.output_format == "ndjson":
+                    # Progress would be mixed up with the streamed issues
+                    verbosity = 0
                 result = IssueTestResult(
                     unittest.runner._WritelnDecorator(sys.stdout),
-                    True, 2 if args.verbose else 1)
+                    True, verbosity)
             else:
                 result = IssueTestResult(
                     unittest.runner._WritelnDecorator(
                         open(args.output_file, 'w')),
-                    True, 2 if args.verbose else 1)
+                    True, verbosity)
+            if not args.dry_run:
+                log_path = os.environ.get("CAFE_TEST_LOG_PATH", "")
+                result.aggregate = IssueAggregate(
+                    os.path.join(log_path, "issues.db"),
+                    result.stream if args.output_format == "ndjson" else None)
+                config = syntribos.config.MainConfig()
+                result.evidence = EvidenceRetention(
+                    config.evidence_full, config.evidence_truncate,
+                    os.path.join(log_path, "evidence"))
+                if args.capture and not args.coordinate:
+                    HTTPClient.capture = cls.open_capture(args)
             start_time = time.time()
-            for file_path, req_str in args.input:
-                for test_name, test_class in cls.get_tests(args.test_types):
-                    for test in test_class.get_test_cases(file_path, req_str):
-                        if test:
-                            cls.run_test(test, result, args.dry_run)
+            if args.coordinate:
+                cls.coordinate(args, result)
+            else:
+                inputs = args.input
+                if HTTPClient.capture is not None:
+                    inputs = HTTPClient.capture.record_templates(inputs)
+                tests = cls.get_test_cases(inputs, args.test_types)
+                if not args.dry_run:
+                    tests = cls.open_journal(args, result, tests)
+                cls.run_tests(tests, result, args.dry_run, args.workers)
+            HTTPClient.close_sessions()
             cls.print_result(result, start_time, args)
         except KeyboardInterrupt:
             cls.print_result(result, start_time, args)
@@ -146,6 +241,279 @@ class Runner(object):
                 "run",
                 "Keyboard Interrupt, exiting...")
             exit(0)
+        finally:
+            if result and result.journal:
+                result.journal.close()
+            if result and result.aggregate:
+                result.aggregate.close()
+            if HTTPClient.capture is not None:
+                HTTPClient.capture.close()
+            log_queue.disable()
+
+    @classmethod
+    def open_journal(cls, args, result, tests):
+        """Records the outcome of each test of this run in a journal
+
+        The journal is kept in the log directory of this run. When resuming
+        a run (``--resume``), its journal is used instead: the test cases it
+        records as passed or failed are added to `result` and skipped.
+
+        :param args: Parsed CLI arguments
+        :type args: ``argparse.Namespace``
+        :param result: The result object of this run
+        :type result: :class:`syntribos.result.IssueTestResult`
+        :param tests: Iterable of test cases to run
+
+        :rtype: generator
+        :returns: The test cases left to run
+        """
+        if args.resume:
+            path = RunJournal.get_path(args.resume)
+            if not os.path.isfile(path):
+                cafe.drivers.base.print_exception(
+                    "Runner", "open_journal",
+                    "No journal found for run {0} ({1})".format(
+                        args.resume, path))
+                exit(1)
+        else:
+            path = os.path.join(
+                os.environ.get("CAFE_TEST_LOG_PATH", ""), "journal.db")
+        result.journal = RunJournal(path)
+        finished = result.journal.finished()
+        if finished:
+            result.journal.replay(result)
+            print("Resuming run {0}: {1} test cases already run".format(
+                args.resume, len(finished)))
+        tests = (cls._as_test_case(test) for test in tests)
+        return (test for test in tests if test.id() not in finished)
+
+    @classmethod
+    def open_capture(cls, args):
+        """Opens the capture file the transactions of this run are added to
+
+        The capture file is kept in the log directory of this run, or in the
+        one of the run being resumed (``--resume``).
+
+        :param args: Parsed CLI arguments
+        :type args: ``argparse.Namespace``
+        :rtype: :class:`syntribos.capture.CaptureWriter`
+        """
+        if args.resume:
+            log_path = os.path.dirname(RunJournal.get_path(args.resume))
+        else:
+            log_path = os.environ.get("CAFE_TEST_LOG_PATH", "")
+        writer = capture.CaptureWriter(os.path.join(log_path, "capture.bin"))
+        writer.write_run(
+            test_types=args.test_types, scan_level=args.scan_level,
+            endpoint=os.environ.get("SYNTRIBOS_ENDPOINT"))
+        return writer
+
+    @classmethod
+    def replay(cls):
+        """Runs the tests of a captured run against its captured responses
+
+        Test cases are generated from the templates in the capture file, and
+        each request is answered with the response captured for it (see
+        :class:`syntribos.capture.CapturePlayer`), so detection settings
+        (e.g. thresholds in the config file) can be tuned without scanning
+        again.
+        """
+        args = syntribos.arguments.SyntribosReplayCLI(
+            usage="syntribos-replay <config> <capture_file>").parse_args()
+        test_env_manager = TestEnvManager(
+            "", args.config, test_repo_package_name="os")
+        test_env_manager.finalize()
+        init_root_log_handler()
+        player = capture.CapturePlayer(args.capture)
+        args.scan_level = player.settings.get("scan_level", "full")
+        cls.set_env(args)
+        os.environ["SYNTRIBOS_ENDPOINT"] = player.settings.get(
+            "endpoint") or os.environ["SYNTRIBOS_ENDPOINT"]
+        HTTPClient.replay = player
+
+        verbosity = 2 if args.verbose else 1
+        if args.output_file:
+            stream = open(args.output_file, "w")
+        else:
+            stream = sys.stdout
+            if args.output_format == "ndjson":
+                verbosity = 0
+        result = IssueTestResult(
+            unittest.runner._WritelnDecorator(stream), True, verbosity)
+        start_time = time.time()
+        try:
+            tests = cls.get_test_cases(
+                player.templates,
+                args.test_types or player.settings.get("test_types"))
+            cls.run_tests(tests, result, workers=args.workers)
+            cls.print_result(result, start_time, args)
+        except KeyboardInterrupt:
+            cafe.drivers.base.print_exception(
+                "Runner", "replay", "Keyboard Interrupt, exiting...")
+        finally:
+            player.close()
+
+    @classmethod
+    def coordinate(cls, args, result):
+        """Hands out the tests of this run to worker nodes
+
+        Each test type is run against each template by a worker, split into
+        ranges of ``shard_size`` test cases if the test type is shardable
+        (except in adaptive scans, whose test cases depend on the responses
+        to probes). Workers' results are merged into `result` in the order of
+        a single-host run. See :mod:`syntribos.distributed`.
+
+        :param args: Parsed CLI arguments
+        :type args: ``argparse.Namespace``
+        :param result: The result object of this run
+        :type result: :class:`syntribos.result.IssueTestResult`
+        """
+        config = syntribos.config.MainConfig()
+        if not config.cluster_key:
+            cafe.drivers.base.print_exception(
+                "Runner", "coordinate",
+                "cluster_key must be set in the [syntribos] section")
+            exit(1)
+        jobs = []
+        for file_path, req_str in args.input:
+            for test_name, test_class in cls.get_tests(args.test_types):
+                shard_size = None
+                if test_class.shardable and args.scan_level != "adaptive":
+                    shard_size = config.shard_size
+                jobs.append(distributed.Job(
+                    file_path, req_str, test_name, shard_size))
+        coordinator = distributed.Coordinator(
+            jobs, result, {"scan_level": args.scan_level},
+            config.lease_timeout)
+        host, port = coordinator.serve(
+            distributed.parse_address(args.coordinate, ""),
+            config.cluster_key)
+        print("=" * 70)
+        print("COORDINATOR.......: {0}:{1}".format(
+            host or socket.gethostname(), port))
+        print("=" * 70)
+        coordinator.wait()
+
+    @classmethod
+    def get_test_cases(cls, inputs, test_types=None):
+        """Yields every test case to be run, in report order
+
+        :param inputs: (file name, file contents) tuples from the CLI
+        :param list test_types: Test types to be run
+
+        :rtype: generator
+        :returns: Test cases generated for each template and test type
+        """
+        for file_path, req_str in inputs:
+            for test_name, test_class in cls.get_tests(test_types):
+                tests = test_class.get_test_cases(file_path, req_str)
+                # Requests sent while generating are captured under the
+                # template and test type (baselines under their own label)
+                label = "{0}:{1}".format(file_path, test_name)
+                while True:
+                    with capture.labelled(label):
+                        test = next(tests, StopIteration)
+                    if test is StopIteration:
+                        break
+                    if test:
+                        yield test
+            # Generated tests keep their own reference to the baseline
+            baseline.cache.invalidate(file_path)
+            parser.invalidate()
+
+    @classmethod
+    def run_tests(cls, tests, result, dry_run=False, workers=1):
+        """Run test cases, optionally spread over a pool of worker threads
+
+        With more than one worker, each test is run against its own
+        :class:`syntribos.result.BufferedTestResult`, and the buffered
+        outcomes are replayed onto `result` from this thread in the order the
+        tests were generated, so the report is identical to a serial run. At
+        most ``2 * workers`` tests are generated ahead of the one currently
+        being reported. If the gevent transport is enabled, workers are
+        greenlets instead of threads.
+
+        :param tests: Iterable of test cases to run
+        :param result: The result object to append to
+        :type result: :class:`syntribos.result.IssueTestResult`
+        :param bool dry_run: (OPTIONAL) Only print out test names
+        :param int workers: (OPTIONAL) Number of tests to run concurrently
+        """
+        if dry_run or workers <= 1:
+            for test in tests:
+                cls.run_test(test, result, dry_run)
+            return
+
+        fixtures = _ClassFixtures()
+        run = functools.partial(cls._run_buffered, fixtures=fixtures)
+        try:
+            if green.is_enabled():
+                for outcome in green.imap(run, tests, workers):
+                    outcome.replay(result)
+            else:
+                cls._run_pooled(run, tests, result, workers)
+        finally:
+            fixtures.tear_down(result)
+
+    @classmethod
+    def _run_pooled(cls, run, tests, result, workers):
+        """Run tests on a thread pool, replaying outcomes in order
+
+        :param run: Callable running one test, returning its buffered result
+        :param tests: Iterable of tests to run
+        :param result: The result object to replay outcomes onto
+        :param int workers: Number of threads in the pool
+        """
+        slots = threading.BoundedSemaphore(workers * 2)
+
+        def _feed():
+            for test in tests:
+                slots.acquire()
+                yield test
+
+        pool = ThreadPool(workers)
+        try:
+            outcomes = pool.imap(run, _feed())
+            while True:
+                try:
+                    # A timeout keeps the wait interruptible by Ctrl-C
+                    outcome = outcomes.next(timeout=1)
+                except TimeoutError:
+                    continue
+                except StopIteration:
+                    break
+                slots.release()
+                outcome.replay(result)
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    @classmethod
+    def _run_buffered(cls, test, fixtures):
+        """Run a single test against a private, buffered result
+
+        :param test: The test to run
+        :param fixtures: Class fixtures shared by the concurrent tests
+        :type fixtures: :class:`_ClassFixtures`
+        :rtype: :class:`syntribos.result.BufferedTestResult`
+        :returns: The recorded outcome of the test
+        """
+        test = cls._as_test_case(test)
+        buffered = BufferedTestResult()
+        with capture.labelled(test.id()):
+            if fixtures.set_up(test, buffered):
+                test.run(buffered)
+        return buffered
+
+    @staticmethod
+    def _as_test_case(test):
+        """Instantiates `test` if a TestCase class was generated instead."""
+        if isinstance(test, type):
+            return test("run_test")
+        return test
 
     @classmethod
     def run_test(cls, test, result, dry_run=False):
@@ -158,18 +526,83 @@ class Runner(object):
         """
         suite = unittest.TestSuite()
 
-        suite.addTest(test("run_test"))
+        test = cls._as_test_case(test)
+        suite.addTest(test)
         if dry_run:
             for test in suite:
                 print(test)
         else:
-            suite.run(result)
+            with capture.labelled(test.id()):
+                suite.run(result)
 
     @classmethod
-    def set_env(cls):
+    def run_worker(cls):
+        """Runs tests handed out by a coordinator until its run is over"""
+        args = syntribos.arguments.SyntribosWorkerCLI(
+            usage="syntribos-worker <config> <[host:]port>").parse_args()
+        if args.transport == "gevent":
+            green.enable()
+        test_env_manager = TestEnvManager(
+            "", args.config, test_repo_package_name="os")
+        test_env_manager.finalize()
+        init_root_log_handler()
+        log_queue.enable()
+        config = syntribos.config.MainConfig()
+        if not config.cluster_key:
+            cafe.drivers.base.print_exception(
+                "Runner", "run_worker",
+                "cluster_key must be set in the [syntribos] section")
+            exit(1)
+        worker = distributed.Worker(
+            distributed.parse_address(args.coordinator), config.cluster_key,
+            cls, args.workers)
+        args.scan_level = worker.connect()["scan_level"]
+        cls.set_env(args)
+        cls.configure_clients(args)
+        try:
+            units = worker.run()
+            print("Ran {0} work unit{1}".format(units, "s" * (units != 1)))
+        except KeyboardInterrupt:
+            cafe.drivers.base.print_exception(
+                "Runner", "run_worker", "Keyboard Interrupt, exiting...")
+        finally:
+            HTTPClient.close_sessions()
+            log_queue.disable()
+
+    @classmethod
+    def set_env(cls, args):
         """Set environment variables for this run."""
         config = syntribos.config.MainConfig()
         os.environ["SYNTRIBOS_ENDPOINT"] = config.endpoint
+        os.environ["SYNTRIBOS_SCAN_LEVEL"] = args.scan_level
+        os.environ["SYNTRIBOS_WORKERS"] = str(args.workers)
+        baseline.cache.ttl = config.baseline_ttl or None
+
+    @classmethod
+    def configure_clients(cls, args):
+        """Apply connection pool and throttling settings from the config file
+
+        The pool is never smaller than the number of workers, so concurrent
+        tests do not wait on each other for a connection.
+
+        :param args: Parsed CLI arguments
+        :type args: ``argparse.Namespace``
+        """
+        config = syntribos.config.MainConfig()
+        HTTPClient.configure(
+            pool_size=max(config.pool_size, args.workers),
+            keep_alive=config.keep_alive,
+            max_retries=config.max_retries,
+            retry_backoff=config.retry_backoff,
+            max_log_body=config.max_log_body,
+            response_head=config.response_head,
+            response_tail=config.response_tail,
+            response_read_limit=config.response_read_limit)
+        throttle.configure(
+            rate_limit=config.rate_limit,
+            rate_burst=config.rate_burst,
+            max_concurrency=config.max_concurrency,
+            latency_factor=config.latency_factor)
 
     @classmethod
     def print_result(cls, result, start_time, args):
@@ -204,5 +637,17 @@ def entry_point():
     Runner.run()
     return 0
 
+
+def worker_entry_point():
+    """Start a worker node, see :meth:`Runner.run_worker`."""
+    Runner.run_worker()
+    return 0
+
+
+def replay_entry_point():
+    """Replay a captured run, see :meth:`Runner.replay`."""
+    Runner.replay()
+    return 0
+
 if __name__ == '__main__':
     entry_point()
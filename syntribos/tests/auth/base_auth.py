@@ -17,6 +17,7 @@ from syntribos.clients.http import client
 from syntribos.issue import Issue
 import syntribos.tests.auth.datagen
 from syntribos.tests import base
+from syntribos.tests import baseline
 
 data_dir = os.environ.get("CAFE_DATA_DIR_PATH")
 
@@ -26,41 +27,36 @@ class BaseAuthTestCase(base.BaseTestCase):
     failure_keys = None
     success_keys = None
 
-    @classmethod
-    def data_driven_failure_cases(cls):
+    def data_driven_failure_cases(self):
         failure_assertions = []
-        if cls.failure_keys is None:
+        if self.failure_keys is None:
             return []
-        for line in cls.failure_keys:
-            failure_assertions.append((cls.assertNotIn,
-                                      line, cls.resp.content))
+        for line in self.failure_keys:
+            failure_assertions.append((self.assertNotIn,
+                                      line, self.resp.content))
         return failure_assertions
 
-    @classmethod
-    def data_driven_pass_cases(cls):
-        if cls.success_keys is None:
+    def data_driven_pass_cases(self):
+        if self.success_keys is None:
             return True
-        for s in cls.success_keys:
-            if s in cls.resp.content:
+        for s in self.success_keys:
+            if s in self.resp.content:
                 return True
         return False
 
-    @classmethod
-    def setUpClass(cls):
-        super(BaseAuthTestCase, cls).setUpClass()
-        cls.issues = []
-        cls.failures = []
-        cls.resp = cls.client.request(
-            method=cls.request.method, url=cls.request.url,
-            headers=cls.request.headers, params=cls.request.params,
-            data=cls.request.data)
-
-    @classmethod
-    def tearDownClass(cls):
-        super(BaseAuthTestCase, cls).tearDownClass()
-        for issue in cls.issues:
+    def setUp(self):
+        super(BaseAuthTestCase, self).setUp()
+        self.issues = []
+        self.resp = self.client.request(
+            method=self.request.method, url=self.request.url,
+            headers=self.request.headers, params=self.request.params,
+            data=self.request.data)
+
+    def tearDown(self):
+        super(BaseAuthTestCase, self).tearDown()
+        for issue in self.issues:
             if issue.failure:
-                cls.failures.append(issue.as_dict())
+                self.failures.append(issue.as_dict())
 
     def test_case(self):
         text = ("This request did not fail with 404 (User not found)"
@@ -91,8 +87,9 @@ class BaseAuthTestCase(base.BaseTestCase):
         request_obj = syntribos.tests.auth.datagen.AuthParser.create_request(
             file_content, os.environ.get("SYNTRIBOS_ENDPOINT"))
 
-        prepared_copy = request_obj.get_prepared_copy()
-        cls.init_response = cls.client.send_request(prepared_copy)
+        init_response, _ = baseline.cache.fetch(
+            baseline.cache.make_key(filename, file_content, "auth"),
+            lambda: cls.client.send_request(request_obj.get_prepared_copy()))
 
         prefix_name = "{filename}_{test_name}_{fuzz_file}_".format(
             filename=filename, test_name=cls.test_name, fuzz_file='auth')
@@ -117,6 +114,5 @@ class BaseAuthTestCase(base.BaseTestCase):
             yield (test_name, request)
 
         for name, req in test_gen(test_name, alt_user_token_request):
-            c = cls.extend_class(test_name,
-                                 {"request": alt_user_token_request})
-            yield c
+            yield cls.create_test_case(name, request=req,
+                                       init_response=init_response)
@@ -11,6 +11,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import itertools
+
 import six
 
 import string as t_string
@@ -18,6 +20,8 @@ import string as t_string
 import cafe.drivers.unittest.fixtures
 from six.moves.urllib.parse import urlparse
 
+from syntribos.tests import rules
+
 ALLOWED_CHARS = "().-_{0}{1}".format(t_string.ascii_letters, t_string.digits)
 
 """test_table is the master list of tests to be run by the runner"""
@@ -71,23 +75,91 @@ class BaseTestCase(cafe.drivers.unittest.fixtures.BaseTestFixture):
 
     """Base class for building new tests
 
+    A TestCase class is a reusable executor for one type of test: every test
+    case it generates is an instance of the class, holding the request and
+    payload it tests as instance attributes (see :meth:`create_test_case`).
+
     :attribute test_name: A name like ``XML_EXTERNAL_ENTITY_BODY``, containing
         the test type and the portion of the request template being tested
+    :attribute shardable: Whether ranges of the test cases can be run by
+        different worker nodes (see :mod:`syntribos.distributed`): generating
+        the test cases sends no request other than the baseline, and yields
+        the same test cases in the same order every time (see
+        :meth:`count_test_cases` and :meth:`get_test_case_range`)
+    :attribute detectors: The rules checked against the response of each
+        test case by :meth:`test_case` (see :mod:`syntribos.tests.rules`)
     """
 
     test_name = None
+    case_name = None
+    shardable = False
+    detectors = ()
 
     @classmethod
     def get_test_cases(cls, filename, file_content):
-        """Returns tests for given TestCase class (overwritten by children)."""
-        yield cls
+        """Yields test cases for given TestCase class (overwritten by children)
+
+        Test cases are generated lazily, so a test case can be run (and
+        garbage collected) before the next one is created.
+        """
+        yield cls.create_test_case(
+            "{0}_{1}".format(filename, cls.test_name))
+
+    @classmethod
+    def count_test_cases(cls, filename, file_content):
+        """Returns how many test cases :meth:`get_test_cases` yields
+
+        Shardable classes should count them without generating them.
+
+        :rtype: int
+        """
+        return sum(1 for _ in cls.get_test_cases(filename, file_content))
+
+    @classmethod
+    def get_test_case_range(cls, filename, file_content, start, stop):
+        """Yields the test cases of :meth:`get_test_cases` in a range
+
+        Shardable classes should skip the test cases before `start` without
+        generating them.
+
+        :param int start: Index of the first test case
+        :param int stop: Index after the last test case, or None for all
+        """
+        return itertools.islice(
+            cls.get_test_cases(filename, file_content), start, stop)
+
+    @classmethod
+    def create_test_case(cls, case_name, **kwargs):
+        """Creates a test case running this class' test
+
+        :param str case_name: Name identifying the test case in reports
+        :param kwargs: Attributes of the test case, e.g. the request to send
+        :rtype: :class:`BaseTestCase`
+        :returns: An instance of this class, set to run :meth:`run_test`
+        """
+        test = cls("run_test")
+        test.case_name = replace_invalid_characters(case_name)
+        for attr, value in kwargs.items():
+            setattr(test, attr, value)
+        return test
+
+    def id(self):
+        if self.case_name is None:
+            return super(BaseTestCase, self).id()
+        return "{0}.{1}".format(self.__class__.__module__, self.case_name)
+
+    def __str__(self):
+        if self.case_name is None:
+            return super(BaseTestCase, self).__str__()
+        return "{0} ({1})".format(self._testMethodName, self.id())
 
     @classmethod
     def extend_class(cls, new_name, kwargs):
         """Creates an extension for the class
 
-        Each TestCase class created is added to the `test_table`, which is then
-        read in by the test runner as the master list of tests to be run.
+        Prefer :meth:`create_test_case` to generate test cases; this creates
+        a new class and should only be used when test cases need different
+        class-level state.
 
         :param str new_name: Name of new class to be created
         :param dict kwargs: Keyword arguments to pass to the new class
@@ -102,6 +174,10 @@ class BaseTestCase(cafe.drivers.unittest.fixtures.BaseTestFixture):
         new_cls.__module__ = cls.__module__
         return new_cls
 
+    def setUp(self):
+        super(BaseTestCase, self).setUp()
+        self.failures = []
+
     def run_test(self):
         """This kicks off the test(s) for a given TestCase class
 
@@ -118,9 +194,25 @@ class BaseTestCase(cafe.drivers.unittest.fixtures.BaseTestFixture):
         """This method is overwritten by individual TestCase classes
 
         It represents the actual test that is called in :func:`run_test`,
-        and handles populating `self.failures`
+        and handles populating `self.failures`. By default, it checks the
+        class' :attr:`detectors`.
+        """
+        self.check_detectors()
+
+    def check_detectors(self, detectors=None):
+        """Registers the issues raised by detection rules
+
+        The rules are compiled once per class (see
+        :func:`syntribos.tests.rules.compile_rules`).
+
+        :param tuple detectors: The rules to check, the class'
+            :attr:`detectors` by default
         """
-        pass
+        if detectors is None:
+            detectors = self.detectors
+        compiled = rules.compile_rules(type(self), detectors)
+        for issue in compiled.evaluate(self):
+            self.register_issue(issue)
 
     def register_issue(self, issue):
         """Adds an issue to the test's list of issues
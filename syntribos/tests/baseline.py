@@ -0,0 +1,248 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import bisect
+import collections
+import hashlib
+import threading
+import time
+
+import six
+
+from syntribos import capture
+
+# Set on responses by the HTTP client (see HTTPClient.read_body), but not
+# kept when a response is pickled
+_BODY_ATTRS = ("body_length", "body_sha256", "body_truncated")
+
+
+class LatencyBaseline(object):
+
+    """Streaming estimate of the latency distribution of an endpoint
+
+    Percentiles are computed over a sliding window of the most recent
+    `window` samples, so the estimate follows the target when its latency
+    drifts under load. No response is anomalous until the window holds
+    `min_samples` samples (e.g. while a baseline sent once, as for POST
+    requests, is completed with the latency of the first test cases).
+    """
+
+    window = 100
+    min_samples = 5
+
+    def __init__(self, samples=(), window=None):
+        self.window = window or self.window
+        self._samples = collections.deque()
+        self._sorted = []
+        self._lock = threading.Lock()
+        for seconds in samples:
+            self.add(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, seconds):
+        """Adds a latency sample (in seconds) to the window."""
+        with self._lock:
+            if len(self._samples) >= self.window:
+                oldest = self._samples.popleft()
+                del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+            self._samples.append(seconds)
+            bisect.insort(self._sorted, seconds)
+
+    def samples(self):
+        """Returns the samples in the window, oldest first
+
+        :rtype: list
+        """
+        with self._lock:
+            return list(self._samples)
+
+    def percentile(self, percent):
+        """Returns the `percent` percentile of the window (nearest rank)
+
+        :param float percent: Percentile between 0 and 100
+        :rtype: float
+        """
+        with self._lock:
+            if not self._sorted:
+                return 0.0
+            rank = int(round(percent / 100.0 * (len(self._sorted) - 1)))
+            return self._sorted[rank]
+
+    def is_anomalous(self, seconds, factor):
+        """Whether a response took anomalously long for this endpoint
+
+        A response is anomalous when it took more than `factor` times the
+        median latency, and longer than 99% of the samples, once there are
+        enough samples to tell.
+
+        :param float seconds: Latency of the response
+        :param float factor: Multiple of the median considered too slow
+        :rtype: bool
+        """
+        if len(self) < self.min_samples:
+            return False
+        threshold = max(factor * self.percentile(50), self.percentile(99))
+        return seconds > threshold
+
+
+class BaselineCache(object):
+
+    """Caches the baseline response sent for each request template
+
+    Every test type compares its fuzzed responses against a baseline (the
+    unmodified request). Entries are keyed by template file name, a digest of
+    the template content and a `variant` naming the kind of baseline (e.g.
+    the request was altered before sending), so all test types in a run
+    share one baseline per template instead of each sending their own.
+
+    :ivar ttl: Seconds an entry stays valid, or None to never expire
+    """
+
+    def __init__(self, ttl=None, clock=time.time):
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(filename, file_content, variant=None):
+        """Builds the cache key for a template
+
+        :param str filename: Name of the template file
+        :param str file_content: Content of the template file
+        :param str variant: Kind of baseline sent for this template
+        :rtype: tuple
+        """
+        if isinstance(file_content, six.text_type):
+            file_content = file_content.encode("utf-8")
+        return (filename, hashlib.sha1(file_content).hexdigest(), variant)
+
+    def _get_entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl and self._clock() - entry[0] > self.ttl:
+                del self._entries[key]
+                return None
+            return entry
+
+    def get(self, key):
+        """Returns the cached baseline for `key`, or None if absent/expired."""
+        entry = self._get_entry(key)
+        return entry[1] if entry else None
+
+    def latency(self, key):
+        """Returns the :class:`LatencyBaseline` of `key`, or None if absent."""
+        entry = self._get_entry(key)
+        return entry[2] if entry else None
+
+    def set(self, key, response, latency=None):
+        """Caches `response` as the baseline for `key`
+
+        :param response: The baseline response
+        :param latency: Latency samples of the baseline request
+        :type latency: :class:`LatencyBaseline`
+        """
+        latency = latency or LatencyBaseline()
+        with self._lock:
+            self._entries[key] = (self._clock(), response, latency)
+
+    @staticmethod
+    def capture_label(key):
+        """Returns the label the baseline requests of `key` are captured under
+
+        Baselines are shared by the test types of a run, so their requests
+        are captured apart from the test type that first sent them, and are
+        replayed whatever the test types being replayed.
+
+        :param tuple key: Key built by :meth:`make_key`
+        :rtype: str
+        """
+        return "baseline:{0}:{1}".format(key[0], key[2])
+
+    def fetch(self, key, send, samples=1):
+        """Returns the cached baseline for `key`, sending it on a miss
+
+        :param tuple key: Key built by :meth:`make_key`
+        :param send: Callable that sends the baseline request and returns
+            the response
+        :param int samples: On a miss, send the baseline this many times to
+            sample the endpoint's latency
+        :returns: The baseline response and its :class:`LatencyBaseline`,
+            from the same entry (it may expire right after)
+        :rtype: tuple
+        """
+        entry = self._get_entry(key)
+        if entry is not None:
+            return entry[1], entry[2]
+        with capture.labelled(self.capture_label(key)):
+            responses = [send() for _ in range(max(samples, 1))]
+        latency = LatencyBaseline(
+            [r.elapsed.total_seconds() for r in responses])
+        self.set(key, responses[0], latency)
+        return responses[0], latency
+
+    def export(self, filename, file_content):
+        """Returns the cached baselines of a template, see :meth:`load`
+
+        :param str filename: Name of the template file
+        :param str file_content: Content of the template file
+        :rtype: list
+        :returns: (key, response, attributes of the response's body, latency
+            samples) tuples, which can be pickled and sent to another process
+        """
+        template = self.make_key(filename, file_content)[:2]
+        with self._lock:
+            keys = list(self._entries)
+        entries = []
+        for key in keys:
+            entry = self._get_entry(key)
+            if entry is not None and key[:2] == template:
+                body = dict((name, getattr(entry[1], name))
+                            for name in _BODY_ATTRS if hasattr(entry[1], name))
+                entries.append((key, entry[1], body, entry[2].samples()))
+        return entries
+
+    def load(self, entries):
+        """Caches baselines exported by another process
+
+        Baselines already cached by this process are kept.
+
+        :param list entries: Tuples returned by :meth:`export`
+        """
+        for key, response, body, samples in entries:
+            if self._get_entry(key) is None:
+                for name, value in body.items():
+                    setattr(response, name, value)
+                self.set(key, response, LatencyBaseline(samples))
+
+    def invalidate(self, filename=None):
+        """Drops cached baselines
+
+        :param str filename: Only drop the baselines of this template file;
+            drop every entry if None
+        """
+        with self._lock:
+            if filename is None:
+                self._entries.clear()
+                return
+            for key in list(self._entries):
+                if key[0] == filename:
+                    del self._entries[key]
+
+
+"""cache is the baseline cache shared by every test type in a run"""
+cache = BaselineCache()
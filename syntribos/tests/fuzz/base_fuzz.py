@@ -11,16 +11,29 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import collections
+import itertools
+from multiprocessing.pool import ThreadPool
 import os
-import re
 
 from six.moves.urllib.parse import urlparse
 
+from syntribos import capture
 from syntribos.clients.http import client
-from syntribos.issue import Issue
+from syntribos.clients.http import green
 from syntribos.tests import base
+from syntribos.tests import baseline
+from syntribos.tests import rules
 import syntribos.tests.fuzz.config
+from syntribos.tests.fuzz.corpus import ADAPTIVE
+from syntribos.tests.fuzz.corpus import FULL
+from syntribos.tests.fuzz.corpus import get_corpus
+from syntribos.tests.fuzz.corpus import iter_representatives
 import syntribos.tests.fuzz.datagen
+from syntribos.tests.fuzz.matcher import get_matcher
+
+"""Methods whose baseline may be re-sent to sample the endpoint's latency"""
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
 
 data_dir = os.environ.get("CAFE_DATA_DIR_PATH", "")
 
@@ -30,9 +43,31 @@ class BaseFuzzTestCase(base.BaseTestCase):
     client = client()
     failure_keys = None
     success_keys = None
-
-    @classmethod
-    def validate_length(cls):
+    resp = None
+    escalation = None
+    shardable = True
+    default_detectors = (
+        rules.Pattern(
+            "SSL_ERROR", "Medium", "High",
+            "Make sure that all the returned endpoint URIs use 'https://' "
+            "and not 'http://'",
+            pattern=r"\bhttp://{host}"),
+        rules.Status(
+            "500_errors", "Low", "High",
+            "This request returns an error with status code {0}, which "
+            "might indicate some server-side fault that could lead to "
+            "further vulnerabilities",
+            predicate=lambda status_code: status_code >= 500),
+        rules.LengthDiff(
+            "length_diff", "Low", "Low",
+            "The difference in length between the response to the baseline "
+            "request and the request returned when sending an attack string "
+            "exceeds {case.config.percent} percent, which could indicate a "
+            "vulnerability to injection attacks"),
+    )
+    detectors = default_detectors
+
+    def validate_length(self):
         """Validates length of response
 
         Compares the length of a fuzzed response with a response to the
@@ -41,12 +76,31 @@ class BaseFuzzTestCase(base.BaseTestCase):
 
         :returns: boolean - whether the response is longer than expected
         """
-        if getattr(cls, "init_response", False) is False:
+        if getattr(self, "init_response", False) is False:
             raise NotImplemented
-        init_req_len = len(cls.init_response.request.body or "")
-        init_resp_len = len(cls.init_response.content or "")
-        req_len = len(cls.resp.request.body or "")
-        resp_len = len(cls.resp.content or "")
+        expected, msg = self._check_length(self.init_response, self.resp)
+        self.fixture_log.debug(msg)
+        return expected
+
+    @staticmethod
+    def _body_length(resp):
+        """Returns the length of the body of `resp`, even if not all kept."""
+        length = getattr(resp, "body_length", None)
+        if length is None:
+            length = len(resp.content or "")
+        return length
+
+    @classmethod
+    def _check_length(cls, init_response, resp):
+        """Compares the length of `resp` with the baseline's
+
+        :returns: tuple - whether the response length is as expected, and a
+            description of the comparison
+        """
+        init_req_len = len(init_response.request.body or "")
+        init_resp_len = cls._body_length(init_response)
+        req_len = len(resp.request.body or "")
+        resp_len = cls._body_length(resp)
         request_diff = req_len - init_req_len
         response_diff = resp_len - init_resp_len
         percent_diff = abs(float(response_diff) / (init_resp_len + 1)) * 100
@@ -62,66 +116,93 @@ class BaseFuzzTestCase(base.BaseTestCase):
             "\tConfig percent: {7}\n").format(
             init_req_len, init_resp_len, req_len, resp_len, request_diff,
             response_diff, percent_diff, cls.config.percent)
-        cls.fixture_log.debug(msg)
         if request_diff == response_diff:
-            return True
+            return True, msg
         elif resp_len == init_resp_len:
-            return True
+            return True, msg
         elif cls.config.percent:
             if percent_diff <= cls.config.percent:
-                return True
-        return False
+                return True, msg
+        return False, msg
 
     @classmethod
-    def _get_strings(cls, file_name=None):
-        path = os.path.join(data_dir, file_name or cls.data_key)
-        with open(path, "rb") as fp:
-            return fp.read().splitlines()
+    def _get_strings(cls, file_name=None, scan_level=None):
+        """Returns the fuzz strings of a data file
+
+        :param str file_name: Name of the file in the data directory, the
+            class' `data_key` by default
+        :param str scan_level: Scan level (see
+            :data:`syntribos.tests.fuzz.corpus.SCAN_LEVELS`), the one set for
+            this run by default; adaptive scans load every string
+        :rtype: :class:`syntribos.tests.fuzz.corpus.Corpus`
+        """
+        return get_corpus(
+            os.path.join(data_dir, file_name or cls.data_key),
+            scan_level or os.environ.get("SYNTRIBOS_SCAN_LEVEL", FULL))
 
-    @classmethod
-    def data_driven_failure_cases(cls):
+    def data_driven_failure_cases(self):
         """Checks if response contains known bad strings
 
+        The response is scanned once for all failure keys, with a matcher
+        shared by every test case of the class (see
+        :func:`syntribos.tests.fuzz.matcher.get_matcher`). Only the part of
+        a large body kept by the client is scanned (see
+        :meth:`syntribos.clients.http.base_http_client.HTTPClient.read_body`).
+
         :returns: a list of strings that show up in the response that are also
-        defined in cls.failure_strings.
-        failed_strings = []
+        defined in self.failure_strings.
         """
-        failed_strings = []
-        if cls.failure_keys is None:
+        if self.failure_keys is None:
             return []
-        for line in cls.failure_keys:
-            if line in cls.resp.content:
-                failed_strings.append(line)
-        return failed_strings
+        return get_matcher(self.failure_keys).find(self.resp.content)
 
-    @classmethod
-    def data_driven_pass_cases(cls):
+    def data_driven_pass_cases(self):
         """Checks if response contains expected strings
 
         :returns: a list of assertions that fail if the response doesn't
-        contain a string defined in cls.success_keys as a string expected in
+        contain a string defined in self.success_keys as a string expected in
         the response.
         """
-        if cls.success_keys is None:
+        if self.success_keys is None:
             return True
-        for s in cls.success_keys:
-            if s in cls.resp.content:
-                return True
-        return False
-
-    @classmethod
-    def setUpClass(cls):
-        """being used as a setup test not."""
-        super(BaseFuzzTestCase, cls).setUpClass()
-        cls.failures = []
-        cls.resp = cls.client.request(
-            method=cls.request.method, url=cls.request.url,
-            headers=cls.request.headers, params=cls.request.params,
-            data=cls.request.data)
-
-    @classmethod
-    def tearDownClass(cls):
-        super(BaseFuzzTestCase, cls).tearDownClass()
+        return get_matcher(self.success_keys).search(self.resp.content)
+
+    def setUp(self):
+        """Sends the fuzzed request of this test case."""
+        super(BaseFuzzTestCase, self).setUp()
+        if self.resp is None:
+            self.resp = self.send_fuzz_request()
+
+    def send_fuzz_request(self):
+        """Sends the fuzzed request of this test case."""
+        return self.client.request(
+            method=self.request.method, url=self.request.url,
+            headers=self.request.headers, params=self.request.params,
+            data=self.request.data)
+
+    def is_slow_response(self):
+        """Checks if the response took anomalously long
+
+        The response time is compared to the latency baseline of the
+        endpoint (see :class:`syntribos.tests.baseline.LatencyBaseline`),
+        with ``time_difference_percent`` as the multiple of the median
+        latency considered too slow. A slow request is re-sent up to
+        ``timing_retries`` times, and only reported as slow if every re-send
+        is slow too. Responses that are not slow are added to the baseline.
+
+        :returns: boolean - whether the response is anomalously slow
+        """
+        factor = self.config.time_difference_percent / 100
+        elapsed = self.resp.elapsed.total_seconds()
+        if not self.latency.is_anomalous(elapsed, factor):
+            self.latency.add(elapsed)
+            return False
+        for _ in range(self.config.timing_retries):
+            resp = self.send_fuzz_request()
+            if not self.latency.is_anomalous(
+                    resp.elapsed.total_seconds(), factor):
+                return False
+        return True
 
     def test_default_issues(self):
         """Tests for some default issues
@@ -131,109 +212,217 @@ class BaseFuzzTestCase(base.BaseTestCase):
         separately from the test_case method so that they are not overwritten
         by test cases that inherit from BaseFuzzTestCase.
 
-        Any extension to this class should call
+        Any extension to this class should either list
+        :attr:`default_detectors` in its detectors, or call
         self.test_default_issues() in order to test for the Issues
         defined here
         """
 
-        target = self.init_request.url
-        domain = urlparse(target).hostname
-        regex = r"\bhttp://{0}".format(domain)
-        response_text = self.resp.text
-
-        if re.search(regex, response_text):
-            self.register_issue(
-                Issue(test="SSL_ERROR",
-                      severity="Medium",
-                      confidence="High",
-                      text=("Make sure that all the returned endpoint URIs"
-                            " use 'https://' and not 'http://'"
-                            )
-                      )
-            )
-
-        if self.resp.status_code >= 500:
-            self.register_issue(
-                Issue(test="500_errors",
-                      severity="Low",
-                      confidence="High",
-                      text=("This request returns an error with status code "
-                            "{0}, which might indicate some server-side fault "
-                            "that could lead to further vulnerabilities"
-                            ).format(self.resp.status_code)
-                      )
-            )
-
-        if (not self.validate_length() and
-                self.resp.status_code == self.init_response.status_code):
-            self.register_issue(
-                Issue(test="length_diff",
-                      severity="Low",
-                      confidence="Low",
-                      text=("The difference in length between the response to "
-                            "the baseline request and the request returned "
-                            "when sending an attack string exceeds {0} "
-                            "percent, which could indicate a vulnerability "
-                            "to injection attacks")
-                      .format(self.config.percent)
-                      )
-            )
-
-    def test_case(self):
-        """Performs the test
-
-        The test runner will call test_case on every TestCase class, and will
-        report any AssertionError raised by this method to the results.
-        """
-        self.test_default_issues()
+        self.check_detectors(self.default_detectors)
 
     @classmethod
     def get_test_cases(cls, filename, file_content):
-        """Generates new TestCases for each fuzz string
+        """Generates new test cases for each fuzz string
+
+        First, sends a baseline (non-fuzzed) request, storing it in the
+        test cases' init_response. The baseline is shared with every other
+        fuzz test type run against the same template, see
+        :data:`syntribos.tests.baseline.cache`.
+
+        For each string returned by cls._get_strings(), yield a test case
+        for the string, for each parameter fuzzed. Test cases are lightweight
+        instances of this class (see :meth:`base.create_test_case`), created
+        lazily as the runner consumes them. In adaptive scans, only the
+        parameters that react to a few probes are fuzzed with every string
+        (see :meth:`_get_adaptive_cases`).
+        """
+        if os.environ.get("SYNTRIBOS_SCAN_LEVEL") != ADAPTIVE:
+            for test in cls.get_test_case_range(
+                    filename, file_content, 0, None):
+                yield test
+            return
+        request_obj, init_response, latency = cls._get_baseline(
+            filename, file_content)
+        for test in cls._get_adaptive_cases(
+                request_obj, cls._get_prefix_name(filename), init_response,
+                latency):
+            yield test
+
+    @classmethod
+    def count_test_cases(cls, filename, file_content):
+        """Returns the number of fuzz strings times the fields fuzzed
+
+        No request is sent.
+        """
+        request_obj = syntribos.tests.fuzz.datagen.FuzzParser.create_request(
+            file_content, os.environ.get("SYNTRIBOS_ENDPOINT"))
+        return request_obj.count_fuzz_requests(
+            cls._get_strings(), cls.test_type)
+
+    @classmethod
+    def get_test_case_range(cls, filename, file_content, start, stop):
+        """Yields the test cases of a full scan from `start` to `stop`
+
+        The strings before the range are skipped without placing them in
+        the request (see :meth:`datagen.FuzzRequest.fuzz_request`).
+        """
+        request_obj, init_response, latency = cls._get_baseline(
+            filename, file_content)
+        fr = request_obj.fuzz_request(
+            cls._get_strings(), cls.test_type, cls._get_prefix_name(filename),
+            start, stop)
+        for fuzz_name, request, fuzz_string, param_path in fr:
+            yield cls.create_test_case(
+                fuzz_name, request=request, fuzz_string=fuzz_string,
+                param_path=param_path, init_response=init_response,
+                init_request=init_response.request, latency=latency)
 
-        First, sends a baseline (non-fuzzed) request, storing it in
-        cls.init_response.
+    @classmethod
+    def _get_baseline(cls, filename, file_content):
+        """Parses the template and fetches its baseline
 
-        For each string returned by cls._get_strings(), yield a TestCase class
-        for the string as an extension to the current TestCase class. Every
-        string used as a fuzz test payload entails the generation of a new
-        subclass for each parameter fuzzed. See :func:`base.extend_class`.
+        :returns: The request, the baseline response and its latency
+        :rtype: tuple
         """
-        # maybe move this block to base.py
         request_obj = syntribos.tests.fuzz.datagen.FuzzParser.create_request(
             file_content, os.environ.get("SYNTRIBOS_ENDPOINT"))
-        prepared_copy = request_obj.get_prepared_copy()
-        cls.init_response = cls.client.send_request(prepared_copy)
-        cls.init_request = cls.init_response.request
-        # end block
+        baseline_key = baseline.cache.make_key(filename, file_content, "fuzz")
+        init_response, latency = baseline.cache.fetch(
+            baseline_key,
+            lambda: cls.client.send_request(request_obj.get_prepared_copy()),
+            cls._baseline_samples(request_obj.method))
+        return request_obj, init_response, latency
 
-        prefix_name = "{filename}_{test_name}_{fuzz_file}_".format(
+    @classmethod
+    def _get_prefix_name(cls, filename):
+        return "{filename}_{test_name}_{fuzz_file}_".format(
             filename=filename, test_name=cls.test_name, fuzz_file=cls.data_key)
+
+    @classmethod
+    def _baseline_samples(cls, method):
+        """Returns how many times the baseline of a `method` request is sent
+
+        Only the baselines of safe methods are re-sent to sample the latency
+        of the endpoint, so that a template creating or deleting a resource
+        does so once.
+        """
+        if method.upper() in SAFE_METHODS:
+            return cls.config.baseline_samples
+        return 1
+
+    @classmethod
+    def _get_adaptive_cases(cls, request_obj, prefix_name, init_response,
+                            latency):
+        """Generates test cases, escalating on parameters that react
+
+        Every parameter is first fuzzed with a few probes (one string of each
+        of the first ``probes`` classes of equivalent strings), which are sent
+        right away, as many at a time as there are workers (see
+        :meth:`_send_probes`). Only the parameters for which a probe's
+        response differs from the baseline in status code, length or timing
+        are then fuzzed with the rest of the strings. The last probe of an
+        escalated parameter holds why it was escalated in its ``escalation``
+        attribute, which the results report (see
+        :class:`syntribos.result.IssueTestResult`).
+        """
+        strings = cls._get_strings()
+        probes = list(itertools.islice(
+            iter_representatives(strings), cls.config.probes))
+        case_attrs = dict(init_response=init_response,
+                          init_request=init_response.request, latency=latency)
+
         fr = request_obj.fuzz_request(
-            cls._get_strings(), cls.test_type, prefix_name)
+            probes, cls.test_type, "{0}probe_".format(prefix_name))
+        probe_cases = (cls.create_test_case(
+            fuzz_name, request=request, fuzz_string=fuzz_string,
+            param_path=param_path, **case_attrs)
+            for fuzz_name, request, fuzz_string, param_path in fr)
+        # Only what each parameter reacted to is kept, not the probes
+        reactions = collections.defaultdict(set)
+        sent = collections.Counter()
+        escalated = set()
+        factor = cls.config.time_difference_percent / 100
+        for test in cls._send_probes(probe_cases):
+            reasons = reactions[test.param_path]
+            if test.resp.status_code != init_response.status_code:
+                reasons.add("status code")
+            if not cls._check_length(init_response, test.resp)[0]:
+                reasons.add("length")
+            if latency.is_anomalous(test.resp.elapsed.total_seconds(), factor):
+                reasons.add("timing")
+            sent[test.param_path] += 1
+            if sent[test.param_path] == len(probes) and reasons:
+                escalated.add(test.param_path)
+                test.escalation = cls._get_escalation(test, sorted(reasons))
+            yield test
+
+        if not escalated:
+            return
+        probes = set(probes)
+        fr = request_obj.fuzz_request(strings, cls.test_type, prefix_name)
         for fuzz_name, request, fuzz_string, param_path in fr:
-            yield cls.extend_class(fuzz_name, fuzz_string, param_path,
-                                   {"request": request})
+            if param_path in escalated and fuzz_string not in probes:
+                yield cls.create_test_case(
+                    fuzz_name, request=request, fuzz_string=fuzz_string,
+                    param_path=param_path, **case_attrs)
 
     @classmethod
-    def extend_class(cls, new_name, fuzz_string, param_path, kwargs):
-        """Creates an extension for the class
-
-        Each TestCase class created is added to the `test_table`, which is then
-        read in by the test runner as the master list of tests to be run.
-
-        :param str new_name: Name of new class to be created
-        :param str fuzz_string: Fuzz string to insert
-        :param str param_path: String tracing location of the ImpactedParameter
-        :param dict kwargs: Keyword arguments to pass to the new class
-        :rtype: class
-        :returns: A TestCase class extending :class:`BaseTestCase`
+    def _send_probes(cls, tests):
+        """Sends the requests of probe test cases, yielding them in order
+
+        Probes are sent in batches of as many as there are workers in this
+        run, on the event loop if the gevent transport is enabled, and each
+        batch is released once yielded. Each probe is captured under the id
+        of its test case, as if it had been sent when run.
+
+        :param tests: Iterable of probe test cases
+        :rtype: generator
         """
+        size = int(os.environ.get("SYNTRIBOS_WORKERS", 1))
+
+        def send(test):
+            with capture.labelled(test.id()):
+                test.resp = test.send_fuzz_request()
+            return test
+
+        if size <= 1:
+            for test in tests:
+                yield send(test)
+            return
+        tests = iter(tests)
+        pool = None if green.is_enabled() else ThreadPool(size)
+        try:
+            while True:
+                batch = list(itertools.islice(tests, size))
+                if not batch:
+                    return
+                if pool is None:
+                    batch = list(green.imap(send, batch, size))
+                else:
+                    pool.map(send, batch)
+                for test in batch:
+                    yield test
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    @classmethod
+    def _get_escalation(cls, test, reasons):
+        """Describes why a parameter was fuzzed with every string
 
-        new_cls = super(BaseFuzzTestCase, cls).extend_class(new_name, kwargs)
-        new_cls.fuzz_string = fuzz_string
-        new_cls.param_path = param_path
-        return new_cls
+        :rtype: dict
+        """
+        url_components = urlparse(test.init_response.url)
+        return {
+            "target": url_components.netloc,
+            "path": url_components.path,
+            "test_type": cls.test_name,
+            "method": test.request.method,
+            "location": cls.test_type,
+            "content_type": test.init_request.headers.get("content-type"),
+            "name": test.param_path,
+            "reasons": reasons}
 
     def register_issue(self, issue):
         """Adds an issue to the test's list of issues
@@ -11,7 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from syntribos.issue import Issue
+from syntribos.tests import rules
 from syntribos.tests.fuzz import base_fuzz
 
 
@@ -35,34 +35,19 @@ class BufferOverflowBody(base_fuzz.BaseFuzzTestCase):
             "%%s" * 513,
         ]
 
-    def test_case(self):
-        self.test_default_issues()
-        failed_strings = self.data_driven_failure_cases()
-        if failed_strings:
-            self.register_issue(
-                Issue(test="bof_strings",
-                      severity="Medium",
-                      confidence="Low",
-                      text=("The string(s): \'{0}\', known to be commonly "
-                            "returned after a successful buffer overflow "
-                            "attack, have been found in the response. This "
-                            "could indicate a vulnerability to buffer "
-                            "overflow attacks.").format(failed_strings)
-                      )
-            )
-        time_diff = self.config.time_difference_percent / 100
-        if (self.resp.elapsed.total_seconds() >
-                time_diff * self.init_response.elapsed.total_seconds()):
-            self.register_issue(
-                Issue(test="bof_timing",
-                      severity="Medium",
-                      confidence="Medium",
-                      text=("The time it took to resolve a request with a "
-                            "long string was too long compared to the "
-                            "baseline request. This could indicate a "
-                            "vulnerability to buffer overflow attacks")
-                      )
-            )
+    detectors = base_fuzz.BaseFuzzTestCase.default_detectors + (
+        rules.Strings(
+            "bof_strings", "Medium", "Low",
+            "The string(s): \'{0}\', known to be commonly returned after a "
+            "successful buffer overflow attack, have been found in the "
+            "response. This could indicate a vulnerability to buffer "
+            "overflow attacks."),
+        rules.Slow(
+            "bof_timing", "Medium", "Medium",
+            "The time it took to resolve a request with a long string was "
+            "too long compared to the baseline request. This could indicate "
+            "a vulnerability to buffer overflow attacks"),
+    )
 
 
 class BufferOverflowParams(BufferOverflowBody):
@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from syntribos.issue import Issue
+from syntribos.tests import rules
 from syntribos.tests.fuzz import base_fuzz
 
 
@@ -26,33 +26,19 @@ class CommandInjectionBody(base_fuzz.BaseFuzzTestCase):
         'default=',
         '[boot loader]']
 
-    def test_case(self):
-        self.test_default_issues()
-        failed_strings = self.data_driven_failure_cases()
-        if failed_strings:
-            self.register_issue(
-                Issue(test="command_injection",
-                      severity="High",
-                      confidence="Medium",
-                      text=("A string known to be commonly returned after a "
-                            "successful command injection attack was "
-                            "included in the response. This could indicate "
-                            "a vulnerability to command injection "
-                            "attacks.").format(failed_strings)
-                      )
-            )
-        elif self.resp.elapsed.total_seconds() >= 10:
-            self.register_issue(
-                Issue(test="command_injection",
-                      severity="High",
-                      confidence="Medium",
-                      text=("The time elapsed between the sending of "
-                            "the request and the arrival of the res"
-                            "ponse exceeds the expected amount of time, "
-                            "suggesting a vulnerability to command "
-                            "injection attacks.").format(self.resp.elapsed)
-                      )
-            )
+    detectors = base_fuzz.BaseFuzzTestCase.default_detectors + (
+        rules.Strings(
+            "command_injection", "High", "Medium",
+            "A string known to be commonly returned after a successful "
+            "command injection attack was included in the response. This "
+            "could indicate a vulnerability to command injection attacks."),
+        rules.Elapsed(
+            "command_injection", "High", "Medium",
+            "The time elapsed between the sending of the request and the "
+            "arrival of the response exceeds the expected amount of time, "
+            "suggesting a vulnerability to command injection attacks.",
+            seconds=10, fallback=True),
+    )
 
 
 class CommandInjectionParams(CommandInjectionBody):
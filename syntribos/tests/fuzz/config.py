@@ -26,3 +26,18 @@ class BaseFuzzConfig(ConfigSectionInterface):
     @property
     def time_difference_percent(self):
         return float(self.get("time_difference_percent", 1000.0))
+
+    @property
+    def baseline_samples(self):
+        """Times a GET, HEAD or OPTIONS baseline is sent to sample latency."""
+        return int(self.get("baseline_samples", 5))
+
+    @property
+    def timing_retries(self):
+        """Times an anomalously slow request is re-sent before reporting."""
+        return int(self.get("timing_retries", 2))
+
+    @property
+    def probes(self):
+        """Fuzz strings sent to each parameter first, in adaptive scans."""
+        return int(self.get("probes", 10))
@@ -0,0 +1,225 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import array
+import mmap
+import re
+import threading
+
+import six
+from six.moves.urllib.parse import unquote
+
+"""Scan levels: send every payload, one payload per equivalence class, or
+every payload to the parameters that react to a few probes"""
+FULL = "full"
+REPRESENTATIVES = "representatives"
+ADAPTIVE = "adaptive"
+SCAN_LEVELS = (FULL, REPRESENTATIVES, ADAPTIVE)
+
+_corpora = {}
+_corpora_lock = threading.Lock()
+
+_line_break = re.compile(b"\r\n|\r|\n")
+
+# Overlong UTF-8 encodings of ".", "/" and "\"
+_overlong = {
+    "%c0%ae": ".", "%c0%2e": ".", "%e0%80%ae": ".", "%f0%80%80%ae": ".",
+    "%c0%af": "/", "%c0%2f": "/", "%c1%9c": "\\", "%c0%5c": "\\"}
+_overlong_re = re.compile("|".join(
+    re.escape(k) for k in sorted(_overlong, key=len, reverse=True)))
+_unicode_re = re.compile(r"%u00([0-7][0-9a-f])")
+_repeat_re = re.compile(r"(.{2,32})\1+", re.S)
+_run_re = re.compile(r"(.)\1{2,}", re.S)
+_word_re = re.compile(r"[a-z_][a-z0-9_\-]*")
+_number_re = re.compile(r"[0-9]+")
+_max_decode_rounds = 4
+
+
+class Corpus(object):
+
+    """The payload strings (one per line) of a data file
+
+    The file is copied once into anonymous shared memory and indexed: only
+    the start and end offset of each line are kept, in compact arrays, and a
+    string is only created when a line is accessed. The pages are shared with
+    the worker processes forked afterwards. The file itself is not mapped, so
+    it can be rewritten or truncated while the corpus is in use.
+
+    A corpus is a read-only sequence: it supports ``len()``, iteration,
+    indexing and slicing (which returns a corpus sharing the same mapping).
+    Lines are split as with :meth:`str.splitlines`.
+    """
+
+    def __init__(self, path=None, blob=b"", starts=None, ends=None):
+        """Indexes the data file at `path`
+
+        :param str path: Path of the data file
+        """
+        self.path = path
+        self._blob = blob
+        if path is not None:
+            with open(path, "rb") as fp:
+                content = fp.read()
+            if content:
+                self._blob = mmap.mmap(-1, len(content))
+                self._blob.write(content)
+            starts, ends = self._index(self._blob)
+        self._starts = starts if starts is not None else array.array("L")
+        self._ends = ends if ends is not None else array.array("L")
+
+    @staticmethod
+    def _index(blob):
+        starts = array.array("L")
+        ends = array.array("L")
+        pos = 0
+        for match in _line_break.finditer(blob):
+            starts.append(pos)
+            ends.append(match.start())
+            pos = match.end()
+        if pos < len(blob):
+            starts.append(pos)
+            ends.append(len(blob))
+        return starts, ends
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        blob = self._blob
+        for start, end in six.moves.zip(self._starts, self._ends):
+            yield blob[start:end]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Corpus(blob=self._blob, starts=self._starts[index],
+                          ends=self._ends[index])
+        return self._blob[self._starts[index]:self._ends[index]]
+
+    def representatives(self):
+        """Returns a corpus of one payload per equivalence class
+
+        Payloads are grouped by :func:`payload_class`, and the first payload
+        of each class is kept.
+
+        :rtype: :class:`Corpus`
+        """
+        indices = [i for i, _ in _first_of_each_class(self)]
+        return Corpus(
+            blob=self._blob,
+            starts=array.array("L", (self._starts[i] for i in indices)),
+            ends=array.array("L", (self._ends[i] for i in indices)))
+
+    def __repr__(self):
+        return "<Corpus {0!r} ({1} strings)>".format(self.path, len(self))
+
+
+def normalize_payload(payload):
+    """Returns the canonical form of a payload
+
+    Undoes the variations payload lists use to get past input filters:
+    (repeated) percent-encoding, overlong UTF-8 and ``%u00XX`` encodings,
+    case and backslashes. Repeated sequences are then collapsed, so for
+    instance traversals of any depth are equivalent.
+
+    :param str payload: The payload to normalize
+    :rtype: str
+    """
+    normalized = payload.lower()
+    for _ in range(_max_decode_rounds):
+        decoded = _overlong_re.sub(
+            lambda m: _overlong[m.group()], normalized)
+        decoded = _unicode_re.sub(
+            lambda m: chr(int(m.group(1), 16)), decoded)
+        decoded = unquote(decoded).lower()
+        if decoded == normalized:
+            break
+        normalized = decoded
+    return _collapse_repeats(normalized.replace("\\", "/"))
+
+
+def payload_class(payload):
+    """Returns the equivalence class of a payload
+
+    Payloads are equivalent when their normalized forms (see
+    :func:`normalize_payload`) have the same shape: the same punctuation and
+    structure, regardless of the words and numbers in them, or how many
+    times a sequence is repeated. They are likely to exercise the same code
+    path of the target.
+
+    :param str payload: The payload to classify
+    :rtype: str
+    """
+    shape = _word_re.sub("a", normalize_payload(payload))
+    return _collapse_repeats(_number_re.sub("0", shape))
+
+
+def iter_representatives(strings):
+    """Yields the first string of each equivalence class in `strings`
+
+    :param strings: Iterable of payloads
+    :rtype: generator
+    """
+    for _, payload in _first_of_each_class(strings):
+        yield payload
+
+
+def _first_of_each_class(strings):
+    seen = set()
+    for i, payload in enumerate(strings):
+        key = payload_class(payload)
+        if key not in seen:
+            seen.add(key)
+            yield i, payload
+
+
+def _collapse_repeats(string):
+    """Replaces consecutive repetitions of a sequence by a single one
+
+    Runs of a single character are only shortened to two characters, so
+    that for instance ".." and "." stay different.
+    """
+    collapsed = _run_re.sub(r"\1\1", string)
+    while True:
+        string, collapsed = collapsed, _repeat_re.sub(r"\1", collapsed)
+        if collapsed == string:
+            return collapsed
+
+
+def get_corpus(path, scan_level=FULL):
+    """Returns the process-wide :class:`Corpus` of the data file at `path`
+
+    Each file is only read and indexed once per process: later changes to
+    the file are ignored, so every test case of a run sends the same
+    payloads, and only one matcher is compiled for the corpus (see
+    :func:`syntribos.tests.fuzz.matcher.get_matcher`).
+
+    :param str path: Path of the data file
+    :param str scan_level: One of :data:`SCAN_LEVELS`; with
+        :data:`REPRESENTATIVES`, only one payload per equivalence class is
+        kept (see :meth:`Corpus.representatives`)
+    :rtype: :class:`Corpus`
+    """
+    if scan_level not in SCAN_LEVELS:
+        raise ValueError("Unknown scan level: {0}".format(scan_level))
+    if scan_level == ADAPTIVE:
+        # Test cases pick the payloads to send, out of the full corpus
+        scan_level = FULL
+    with _corpora_lock:
+        corpus = _corpora.get((path, scan_level))
+        if corpus is None:
+            if scan_level == FULL:
+                corpus = Corpus(path)
+            else:
+                corpus = Corpus(path).representatives()
+            _corpora[(path, scan_level)] = corpus
+    return corpus
@@ -11,9 +11,13 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import itertools
+import json
 import re
+import uuid
 from xml.etree import ElementTree
 
+from syntribos.clients.http.models import _iterators
 from syntribos.clients.http.models import RequestHelperMixin
 from syntribos.clients.http.models import RequestObject
 from syntribos.clients.http import parser
@@ -29,7 +33,7 @@ class FuzzMixin(object):
     formats) with each string provided.
     """
     @classmethod
-    def _fuzz_data(cls, strings, data, skip_var, name_prefix):
+    def _fuzz_data(cls, strings, data, skip_var, name_prefix, str_start=1):
         """Iterates through model fields and places fuzz string in each field
 
         For each attribute in the model object, call the _build_combinations
@@ -40,22 +44,30 @@ class FuzzMixin(object):
         :param data:
         :param skip_var:
         :param name_prefix:
+        :param int str_start: Number of the first string, in names
         """
         param_path = ""
-        for str_num, stri in enumerate(strings, 1):
-            if isinstance(data, dict):
-                model_iter = cls._build_combinations(stri, data, skip_var)
-            elif isinstance(data, ElementTree.Element):
-                model_iter = cls._build_xml_combinations(stri, data, skip_var)
-            elif isinstance(data, basestring):
-                model_iter = cls._build_str_combinations(stri, data)
-            else:
-                raise TypeError("Format not recognized!")
+        for str_num, stri in enumerate(strings, str_start):
+            model_iter = cls._build_models(stri, data, skip_var)
             for model_num, (model, param_path) in enumerate(model_iter, 1):
                 name = "{0}str{1}_model{2}".format(
                     name_prefix, str_num, model_num)
                 yield (name, model, stri, param_path)
 
+    @classmethod
+    def _build_models(cls, stri, data, skip_var):
+        """Yields `data` with `stri` in each field, and the field's path
+
+        The number of models does not depend on `stri`.
+        """
+        if isinstance(data, dict):
+            return cls._build_combinations(stri, data, skip_var)
+        elif isinstance(data, ElementTree.Element):
+            return cls._build_xml_combinations(stri, data, skip_var)
+        elif isinstance(data, basestring):
+            return cls._build_str_combinations(stri, data)
+        raise TypeError("Format not recognized!")
+
     @classmethod
     def _build_str_combinations(cls, fuzz_string, data):
         """Places `fuzz_string` in fuzz location for string data.
@@ -94,14 +106,15 @@ class FuzzMixin(object):
                            "{0}/{1}".format(key, param_path))
             elif isinstance(val, list):
                 for i, v in enumerate(val):
-                    list_ = [_ for _ in val]
                     if isinstance(v, dict):
                         for ret, param_path in cls._build_combinations(
                                 stri, v, skip_var):
-                            list_[i] = ret.copy()
-                            yield (cls._merge_dictionaries(dic, {key: ret}),
+                            list_ = list(val)
+                            list_[i] = ret
+                            yield (cls._merge_dictionaries(dic, {key: list_}),
                                    "{0}[{1}]/{2}".format(key, i, param_path))
                     else:
+                        list_ = list(val)
                         list_[i] = stri
                         yield (cls._merge_dictionaries(dic, {key: list_}),
                                "{0}[{1}]".format(key, i))
@@ -138,9 +151,7 @@ class FuzzMixin(object):
             for i, element in enumerate(list(ele)):
                 for ret, param_path in cls._build_xml_combinations(
                         stri, element, skip_var):
-                    list_ = list(ele)
-                    list_[i] = ret.copy()
-                    yield (cls._update_inner_element(ele, list_),
+                    yield (cls._update_inner_element(ele, i, ret),
                            "{0}/{1}".format(ele.tag, param_path))
 
     @staticmethod
@@ -172,19 +183,21 @@ class FuzzMixin(object):
         return ret
 
     @staticmethod
-    def _update_inner_element(ele, list_):
-        """Copies an XML element, populates sub-elements from `list_`
+    def _update_inner_element(ele, index, sub_ele):
+        """Copies an XML element, replaces one of its sub-elements
 
-        Returns a copy of the element with the subelements given via list_
+        Only `ele` itself is copied; its other sub-elements are shared with
+        the copy.
         :param ele: XML element to be copied, modified
         :type ele: :class:`xml.ElementTree.Element`
-        :param list list_: List of subelements to append to `ele`
-        :returns: XML element with new subelements from `list_`
+        :param int index: Index of the sub-element to replace
+        :param sub_ele: New sub-element
+        :type sub_ele: :class:`xml.ElementTree.Element`
+        :returns: XML element with sub-element `index` set to `sub_ele`
         :rtype: :class:`xml.ElementTree.Element`
         """
         ret = ele.copy()
-        for i, v in enumerate(list_):
-            ret[i] = v
+        ret[index] = sub_ele
         return ret
 
     @staticmethod
@@ -203,29 +216,174 @@ class FuzzMixin(object):
         return re.sub(r"{[\w]+:", "{", string)
 
 
+class BodyTemplate(object):
+
+    """A request body serialized once, with a slot for the fuzz string
+
+    The serialized body is split around the slot and around the placeholders
+    of any iterators it contains, so rendering it for a fuzz string only
+    joins strings, instead of rebuilding and serializing the body.
+
+    :ivar str param_path: Path of the fuzzed parameter within the body
+    """
+
+    def __init__(self, body, slot, param_path, escape, iterators=None):
+        """Compiles a serialized body
+
+        :param str body: Serialized body, with `slot` as the fuzz string
+        :param str slot: Unique string marking where the fuzz string goes
+        :param str param_path: Path of the fuzzed parameter
+        :param escape: Callable escaping a string for the slot's context
+        :param dict iterators: Iterators that may appear in the body, by
+            placeholder
+        """
+        if iterators is None:
+            iterators = _iterators
+        tokens = [slot] + [k for k in iterators if k in body]
+        self._parts = re.split(
+            "({0})".format("|".join(re.escape(t) for t in tokens)), body)
+        self._slot = slot
+        self._escape = escape
+        self._iterators = iterators
+        self.param_path = param_path
+
+    def render(self, fuzz_string):
+        """Returns the body with `fuzz_string` in its slot
+
+        Each iterator placeholder is replaced with the iterator's next value.
+
+        :param str fuzz_string: The string to place in the slot
+        :rtype: str
+        """
+        parts = list(self._parts)
+        for i in range(1, len(parts), 2):
+            if parts[i] == self._slot:
+                parts[i] = self._escape(fuzz_string)
+            else:
+                parts[i] = self._escape(self._iterators[parts[i]].next())
+        return "".join(parts)
+
+
 class FuzzRequest(RequestObject, FuzzMixin, RequestHelperMixin):
 
-    def fuzz_request(self, strings, fuzz_type, name_prefix):
+    def fuzz_request(self, strings, fuzz_type, name_prefix, start=0,
+                     stop=None):
         """Creates the fuzzed request object
 
         Gets the name and the fuzzed request model from _fuzz_data, and
-        creates a request object from the parameters of the model.
+        creates a request object from the parameters of the model. JSON and
+        XML bodies are rendered from :class:`BodyTemplate` objects instead.
 
-        :param strings:
+        Every string is placed in the same number of fields, so a range of
+        the requests is generated without generating the requests before it:
+        the strings before the range are skipped arithmetically.
+
+        :param strings: Sequence of fuzz strings (it is sliced)
         :param fuzz_type:
         :param name_prefix:
+        :param int start: Index of the first request to generate
+        :param int stop: Index after the last request to generate, or None
+            for all (see :meth:`count_fuzz_requests`)
         :returns: Generator of tuples:
             (name, request, fuzzstring, ImpactedParameter name)
         :rtype: `tuple`
         """
-        for name, data, stri, param_path in self._fuzz_data(
-            strings, getattr(self, fuzz_type), self.action_field,
-                name_prefix):
+        data = getattr(self, fuzz_type)
+        skipped = 0
+        if start:
+            skipped = start // (self._count_models(fuzz_type) or 1)
+            strings = strings[skipped:]
+        if self._has_body_templates(fuzz_type):
+            fuzz_iter = self._fuzz_body(
+                strings, data, name_prefix, skipped + 1)
+        else:
+            fuzz_iter = self._fuzz_data(
+                strings, data, self.action_field, name_prefix, skipped + 1)
+        if start or stop is not None:
+            offset = start and skipped * self._count_models(fuzz_type)
+            fuzz_iter = itertools.islice(
+                fuzz_iter, start - offset,
+                None if stop is None else max(stop - offset, 0))
+        for name, data, stri, param_path in fuzz_iter:
             request_copy = self.get_copy()
             setattr(request_copy, fuzz_type, data)
             request_copy.prepare_request(fuzz_type)
             yield name, request_copy, stri, param_path
 
+    def count_fuzz_requests(self, strings, fuzz_type):
+        """Returns how many requests :meth:`fuzz_request` generates
+
+        :rtype: int
+        """
+        return len(strings) * self._count_models(fuzz_type)
+
+    def _has_body_templates(self, fuzz_type):
+        return fuzz_type == "data" and isinstance(
+            self.data, (dict, ElementTree.Element))
+
+    def _count_models(self, fuzz_type):
+        """Returns in how many fields each fuzz string is placed"""
+        data = getattr(self, fuzz_type)
+        if self._has_body_templates(fuzz_type):
+            return len(self._get_body_templates(data))
+        return sum(1 for _ in self._build_models("", data, self.action_field))
+
+    def _get_body_templates(self, data):
+        if self.template is not None and data is self.template.data:
+            return self.template.derive(
+                "body_templates", lambda: self.compile_body_templates(data))
+        return self.compile_body_templates(data)
+
+    def _fuzz_body(self, strings, data, name_prefix, str_start=1):
+        """Places fuzz strings in each field of a JSON or XML body
+
+        Yields the same names and bodies as :meth:`_fuzz_data` followed by
+        :meth:`prepare_request`, but the body is only serialized once per
+        field (see :meth:`compile_body_templates`). The fields of a body
+        parsed from a compiled template are shared by every test type.
+        """
+        templates = self._get_body_templates(data)
+        for str_num, stri in enumerate(strings, str_start):
+            for model_num, template in enumerate(templates, 1):
+                name = "{0}str{1}_model{2}".format(
+                    name_prefix, str_num, model_num)
+                yield (name, template.render(stri), stri,
+                       template.param_path)
+
+    def compile_body_templates(self, data):
+        """Compiles a :class:`BodyTemplate` for each field of `data`
+
+        :param data: Parsed JSON or XML body
+        :type data: `dict` OR :class:`ElementTree.Element`
+        :rtype: list
+        """
+        slot = "SLOT{0}".format(uuid.uuid4().hex)
+        if isinstance(data, dict):
+            combinations = self._build_combinations(
+                slot, data, self.action_field)
+            escape = self._escape_json
+        else:
+            combinations = self._build_xml_combinations(
+                slot, data, self.action_field)
+            escape = self._escape_xml
+        templates = []
+        for model, param_path in combinations:
+            # Iterators are left in place, they are run on each render
+            model = self._run_iters(model, self.action_field, iterators={})
+            templates.append(BodyTemplate(
+                self._string_data(model), slot, param_path, escape))
+        return templates
+
+    @staticmethod
+    def _escape_json(string):
+        """Escapes `string` for use inside a JSON string."""
+        return json.dumps(string)[1:-1]
+
+    @staticmethod
+    def _escape_xml(string):
+        """Returns `string` as is, as XML bodies are sent unescaped."""
+        return string
+
     def prepare_request(self, fuzz_type=None):
         super(FuzzRequest, self).prepare_request()
         if fuzz_type != "url":
@@ -11,7 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from syntribos.issue import Issue
+from syntribos.tests import rules
 from syntribos.tests.fuzz import base_fuzz
 
 
@@ -20,20 +20,13 @@ class IntOverflowBody(base_fuzz.BaseFuzzTestCase):
     test_type = "data"
     data_key = "integer-overflow.txt"
 
-    def test_case(self):
-        time_diff = self.config.time_difference_percent / 100
-        if (self.resp.elapsed.total_seconds() >
-                time_diff * self.init_response.elapsed.total_seconds()):
-            self.register_issue(
-                Issue(test="int_timing",
-                      severity="Medium",
-                      confidence="Medium",
-                      text=("The time it took to resolve a request with an "
-                            "invalid integer was too long compared to the "
-                            "baseline request. This could indicate a "
-                            "vulnerability to buffer overflow attacks")
-                      )
-            )
+    detectors = (
+        rules.Slow(
+            "int_timing", "Medium", "Medium",
+            "The time it took to resolve a request with an invalid integer "
+            "was too long compared to the baseline request. This could "
+            "indicate a vulnerability to buffer overflow attacks"),
+    )
 
 
 class IntOverflowParams(IntOverflowBody):
@@ -0,0 +1,135 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import re
+import threading
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+class KeyMatcher(object):
+
+    """Finds which of a list of strings occur in a text, in one pass
+
+    The keys are compiled into a trie, and the trie into a single regular
+    expression (see :func:`_trie_pattern`), so the text is scanned once and
+    the longest key starting at each position is matched. Any key contained
+    in a matched key must occur in the text as well, so every key is found
+    even when keys overlap or contain one another.
+
+    :ivar list keys: The strings to look for
+    """
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self._unique = sorted(
+            set(k for k in self.keys if k), key=len, reverse=True)
+        self._pattern = None
+        if self._unique:
+            trie = {}
+            for key in self._unique:
+                node = trie
+                for char in key:
+                    node = node.setdefault(char, {})
+                node[""] = {}
+            self._pattern = re.compile(_trie_pattern(trie))
+        self._contained = {}
+
+    def _contained_in(self, key):
+        """Returns the keys that are substrings of `key` (itself included)."""
+        contained = self._contained.get(key)
+        if contained is None:
+            contained = self._contained[key] = [
+                k for k in self._unique if len(k) <= len(key) and k in key]
+        return contained
+
+    def find(self, text):
+        """Returns the keys that occur in `text`
+
+        :param str text: The text to search
+        :rtype: list
+        :returns: The keys found, in the order of :attr:`keys`
+        """
+        text = text or ""
+        found = set()
+        pos = 0
+        while self._pattern and len(found) < len(self._unique):
+            match = self._pattern.search(text, pos)
+            if match is None:
+                break
+            found.update(self._contained_in(match.group()))
+            pos = match.start() + 1
+        return [k for k in self.keys if not k or k in found]
+
+    def search(self, text):
+        """Returns whether any of the keys occur in `text`
+
+        :param str text: The text to search
+        :rtype: bool
+        """
+        if len(self._unique) < len(set(self.keys)):
+            # The empty string is one of the keys
+            return True
+        return bool(self._pattern and self._pattern.search(text or ""))
+
+
+def _trie_pattern(node):
+    """Builds a regular expression matching the keys stored in a trie
+
+    Each node maps a character to a child node, and the empty string marks
+    the end of a key. Alternatives branch on distinct characters, so the
+    regular expression engine only follows one branch at each position, and
+    optional continuations are greedy, so the longest key is matched.
+
+    :param dict node: The root of the trie
+    :rtype: str
+    """
+    prefix = []
+    while len(node) == 1 and "" not in node:
+        # Chains of single children become one literal
+        char, node = next(iter(node.items()))
+        prefix.append(re.escape(char))
+    branches = ["{0}{1}".format(re.escape(c), _trie_pattern(child))
+                for c, child in sorted(node.items()) if c]
+    if not branches:
+        pattern = ""
+    elif len(branches) == 1:
+        pattern = "(?:{0})".format(branches[0])
+    else:
+        pattern = "(?:{0})".format("|".join(branches))
+    if branches and "" in node:
+        pattern += "?"
+    return "".join(prefix) + pattern
+
+
+def get_matcher(keys):
+    """Returns the shared :class:`KeyMatcher` for `keys`
+
+    Matchers are compiled once per distinct list of keys and shared by every
+    test case checking for them.
+
+    :param keys: The strings to look for, as a sequence that is either
+        hashable (e.g. a tuple or :class:`syntribos.tests.fuzz.corpus.Corpus`)
+        or converted to a tuple
+    :rtype: :class:`KeyMatcher`
+    """
+    try:
+        hash(keys)
+    except TypeError:
+        keys = tuple(keys)
+    with _matchers_lock:
+        matcher = _matchers.get(keys)
+        if matcher is None:
+            matcher = _matchers[keys] = KeyMatcher(keys)
+    return matcher
@@ -11,7 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from syntribos.issue import Issue
+from syntribos.tests import rules
 from syntribos.tests.fuzz import base_fuzz
 
 
@@ -39,36 +39,19 @@ class SQLInjectionBody(base_fuzz.BaseFuzzTestCase):
         "syntax error"
     ]
 
-    def test_case(self):
-        self.test_default_issues()
-        failed_strings = self.data_driven_failure_cases()
-        if failed_strings:
-            self.register_issue(
-                Issue(test="sql_strings",
-                      severity="Medium",
-                      confidence="Low",
-                      text=("The string(s): \'{0}\', known to be commonly "
-                            "returned after a successful SQL injection attack"
-                            ", have been found in the response. This could "
-                            "indicate a vulnerability to SQL injection "
-                            "attacks."
-                            ).format(failed_strings)
-                      )
-            )
-
-        time_diff = self.config.time_difference_percent / 100
-        if (self.resp.elapsed.total_seconds() >
-                time_diff * self.init_response.elapsed.total_seconds()):
-            self.register_issue(
-                Issue(test="sql_timing",
-                      severity="Medium",
-                      confidence="Medium",
-                      text=(
-                          "A response to one of our payload requests has "
-                          "taken too long compared to the baseline request. "
-                          "This could indicate a vulnerability to time-based "
-                          "SQL injection attacks"))
-            )
+    detectors = base_fuzz.BaseFuzzTestCase.default_detectors + (
+        rules.Strings(
+            "sql_strings", "Medium", "Low",
+            "The string(s): \'{0}\', known to be commonly returned after a "
+            "successful SQL injection attack, have been found in the "
+            "response. This could indicate a vulnerability to SQL injection "
+            "attacks."),
+        rules.Slow(
+            "sql_timing", "Medium", "Medium",
+            "A response to one of our payload requests has taken too long "
+            "compared to the baseline request. This could indicate a "
+            "vulnerability to time-based SQL injection attacks"),
+    )
 
 
 class SQLInjectionParams(SQLInjectionBody):
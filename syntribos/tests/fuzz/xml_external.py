@@ -13,7 +13,8 @@
 # limitations under the License.
 import os
 
-from syntribos.issue import Issue
+from syntribos.tests import baseline
+from syntribos.tests import rules
 from syntribos.tests.fuzz import base_fuzz
 import syntribos.tests.fuzz.datagen
 
@@ -22,6 +23,9 @@ class XMLExternalEntityBody(base_fuzz.BaseFuzzTestCase):
     test_name = "XML_EXTERNAL_ENTITY_BODY"
     test_type = "data"
     dtds_data_key = "xml-external.txt"
+    # Whether there are test cases depends on the baselines, and they are
+    # generated per DTD rather than per fuzz string
+    shardable = False
     config = syntribos.tests.fuzz.config.BaseFuzzConfig()
     failure_keys = [
         'root:',
@@ -50,10 +54,13 @@ class XMLExternalEntityBody(base_fuzz.BaseFuzzTestCase):
         prepared_copy_xml = prepared_copy.get_prepared_copy()
         prepared_copy_xml.headers['content-type'] = "application/xml"
 
-        init_response = cls.client.send_request(prepared_copy)
-        init_response_xml = cls.client.send_request(prepared_copy_xml)
-
-        cls.init_response = init_response
+        baseline_key = baseline.cache.make_key(filename, file_content, "json")
+        init_response, latency = baseline.cache.fetch(
+            baseline_key, lambda: cls.client.send_request(prepared_copy),
+            cls._baseline_samples(prepared_copy.method))
+        init_response_xml, _ = baseline.cache.fetch(
+            baseline.cache.make_key(filename, file_content, "xml"),
+            lambda: cls.client.send_request(prepared_copy_xml))
 
         content_type = init_response.headers['content-type']
         content_type_xml_request = init_response_xml.headers['content-type']
@@ -76,35 +83,23 @@ class XMLExternalEntityBody(base_fuzz.BaseFuzzTestCase):
                 ["&xxe;"], cls.test_type, prefix_name)
             for fuzz_name, request, fuzz_string, param_path in fr:
                 request.data = "{0}\n{1}".format(dtd, request.data)
-                yield cls.extend_class(fuzz_name, fuzz_string, param_path,
-                                       {"request": request})
-
-    def test_case(self):
-        self.test_default_issues()
-        failed_strings = self.data_driven_failure_cases()
-        if failed_strings:
-            self.register_issue(
-                Issue(test="xml_strings",
-                      severity="Medium",
-                      confidence="Low",
-                      text=("The string(s): \'{0}\', known to be commonly "
-                            "returned after a successful XML external entity "
-                            "attack, have been found in the response. This "
-                            "could indicate a vulnerability to XML external "
-                            "entity attacks.").format(failed_strings)
-                      )
-            )
+                yield cls.create_test_case(
+                    fuzz_name, request=request, fuzz_string=fuzz_string,
+                    param_path=param_path, init_response=init_response,
+                    init_request=init_response.request, latency=latency)
 
-        time_diff = self.config.time_difference_percent / 100
+    detectors = base_fuzz.BaseFuzzTestCase.default_detectors + (
+        rules.Strings(
+            "xml_strings", "Medium", "Low",
+            "The string(s): \'{0}\', known to be commonly returned after a "
+            "successful XML external entity attack, have been found in the "
+            "response. This could indicate a vulnerability to XML external "
+            "entity attacks."),
         # Timing attacks for requesting invalid url in dtd
-        if (self.resp.elapsed.total_seconds() >
-                time_diff * self.init_response.elapsed.total_seconds()):
-            self.register_issue(
-                Issue(test="xml_timing",
-                      severity="Medium",
-                      confidence="Medium",
-                      text=("The time it took to resolve a request with an "
-                            "invalid URL in the DTD takes too long compared "
-                            "to the baseline request. This could reflect a "
-                            "vulnerability to an XML external entity attack."))
-            )
+        rules.Slow(
+            "xml_timing", "Medium", "Medium",
+            "The time it took to resolve a request with an invalid URL in "
+            "the DTD takes too long compared to the baseline request. This "
+            "could reflect a vulnerability to an XML external entity "
+            "attack."),
+    )
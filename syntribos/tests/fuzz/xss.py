@@ -11,8 +11,9 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from syntribos.issue import Issue
+from syntribos.tests import rules
 from syntribos.tests.fuzz import base_fuzz
+from syntribos.tests.fuzz import corpus
 
 
 class XSSBody(base_fuzz.BaseFuzzTestCase):
@@ -20,27 +21,18 @@ class XSSBody(base_fuzz.BaseFuzzTestCase):
     test_type = "data"
     data_key = "xss.txt"
 
-    def test_case(self):
-        self.test_default_issues()
-        self.failure_keys = self._get_strings()
-        failed_strings = self.data_driven_failure_cases()
-        if 'content-type' in self.init_request.headers:
-            content_type = self.init_request.headers['content-type']
-            if 'html' in content_type:
-                sev = "Medium"
-            else:
-                sev = "Low"
-        else:
-            sev = "Low"
-        if failed_strings:
-            self.register_issue(
-                Issue(test="xss_strings",
-                      severity=sev,
-                      confidence="Low",
-                      text=("The string(s): \'{0}\', known to be commonly "
-                            "returned after a successful XSS "
-                            "attack, have been found in the response. This "
-                            "could indicate a vulnerability to XSS "
-                            "attacks.").format(failed_strings)
-                      )
-            )
+    def _severity(self):
+        """Medium if the request sent HTML, Low otherwise."""
+        if 'html' in self.init_request.headers.get('content-type', ''):
+            return "Medium"
+        return "Low"
+
+    detectors = base_fuzz.BaseFuzzTestCase.default_detectors + (
+        # Look for every known payload, whichever were sent
+        rules.Strings(
+            "xss_strings", _severity, "Low",
+            "The string(s): \'{0}\', known to be commonly returned after a "
+            "successful XSS attack, have been found in the response. This "
+            "could indicate a vulnerability to XSS attacks.",
+            keys=lambda cls: cls._get_strings(scan_level=corpus.FULL)),
+    )
@@ -15,8 +15,9 @@ import os
 
 from syntribos.clients.http import client
 from syntribos.clients.http import parser
-from syntribos.issue import Issue
 from syntribos.tests import base
+from syntribos.tests import baseline
+from syntribos.tests import rules
 
 
 class CorsHeader(base.BaseTestCase):
@@ -26,7 +27,26 @@ class CorsHeader(base.BaseTestCase):
     test_name = "CORS_HEADER"
     test_type = "headers"
     client = client()
-    failures = []
+    detectors = (
+        rules.Header(
+            "CORS_HEADER", "Medium", "High",
+            "CORS header `Access-Control-Allow-Origin` set to a wild "
+            "character, this header should always be set to a white listed "
+            "set of URIs",
+            name="Access-Control-Allow-Origin", value="*"),
+        rules.Header(
+            "CORS_HEADER", "Low", "High",
+            "CORS header `Access-Control-Allow-Methods` set to a wild "
+            "character,it is a good practice to give a white list of "
+            "allowed methods.",
+            name="Access-Control-Allow-Methods", value="*"),
+        rules.Header(
+            "CORS_HEADER", "Low", "High",
+            "CORS header `Access-Control-Allow-Headers` set to a wild "
+            "character,it is a good practice to give a white list of "
+            "allowed headers",
+            name="Access-Control-Allow-Headers", value="*"),
+    )
 
     @classmethod
     def get_test_cases(cls, filename, file_content):
@@ -35,48 +55,9 @@ class CorsHeader(base.BaseTestCase):
             file_content, os.environ.get("SYNTRIBOS_ENDPOINT")
         )
         request_obj.headers['Origin'] = 'http://example.com'
-        cls.resp = cls.client.send_request(request_obj)
-        yield cls
-
-    def test_case(self):
-
-        if 'Access-Control-Allow-Origin' in self.resp.headers:
-            if self.resp.headers['Access-Control-Allow-Origin'] == "*":
-                self.register_issue(
-                    Issue(test="CORS_HEADER",
-                          severity="Medium",
-                          confidence="High",
-                          text=("CORS header `Access-Control-Allow-Origin` set"
-                                " to a wild character, this header should"
-                                " always be set to a white listed set of URIs"
-                                )
-                          )
-                )
-
-        if 'Access-Control-Allow-Methods' in self.resp.headers:
-            if self.resp.headers['Access-Control-Allow-Methods'] == "*":
-                self.register_issue(
-                    Issue(test="CORS_HEADER",
-                          severity="Low",
-                          confidence="High",
-                          text=("CORS header `Access-Control-Allow-Methods`"
-                                " set to a wild character,it is a good"
-                                " practice to give a white list of allowed"
-                                " methods."
-                                )
-                          )
-                )
-
-        if 'Access-Control-Allow-Headers' in self.resp.headers:
-            if self.resp.headers['Access-Control-Allow-Headers'] == "*":
-                self.register_issue(
-                    Issue(test="CORS_HEADER",
-                          severity="Low",
-                          confidence="High",
-                          text=("CORS header `Access-Control-Allow-Headers`"
-                                " set to a wild character,it is a good"
-                                " practice to give a white list of allowed"
-                                " headers"
-                                )
-                          )
-                )
+        resp, _ = baseline.cache.fetch(
+            baseline.cache.make_key(filename, file_content, "cors"),
+            lambda: cls.client.send_request(request_obj))
+        prefix_name = "{filename}_{test_name}".format(
+            filename=filename, test_name=cls.test_name)
+        yield cls.create_test_case(prefix_name, resp=resp)
@@ -0,0 +1,74 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Index of the test types (generated by syntribos.tests.registry)"""
+
+"""Module defining each test type, by test name"""
+TEST_MODULES = {
+    "AUTH_WITH_SOMEONE_ELSE_TOKEN":
+        "syntribos.tests.auth.user1_tries_user2s_token",
+    "BUFFER_OVERFLOW_BODY":
+        "syntribos.tests.fuzz.buffer_overflow",
+    "BUFFER_OVERFLOW_HEADERS":
+        "syntribos.tests.fuzz.buffer_overflow",
+    "BUFFER_OVERFLOW_PARAMS":
+        "syntribos.tests.fuzz.buffer_overflow",
+    "BUFFER_OVERFLOW_URL":
+        "syntribos.tests.fuzz.buffer_overflow",
+    "COMMAND_INJECTION_BODY":
+        "syntribos.tests.fuzz.command_injection",
+    "COMMAND_INJECTION_HEADERS":
+        "syntribos.tests.fuzz.command_injection",
+    "COMMAND_INJECTION_PARAMS":
+        "syntribos.tests.fuzz.command_injection",
+    "COMMAND_INJECTION_URL":
+        "syntribos.tests.fuzz.command_injection",
+    "CORS_HEADER":
+        "syntribos.tests.headers.cors",
+    "INT_OVERFLOW_BODY":
+        "syntribos.tests.fuzz.integer_overflow",
+    "INT_OVERFLOW_HEADERS":
+        "syntribos.tests.fuzz.integer_overflow",
+    "INT_OVERFLOW_PARAMS":
+        "syntribos.tests.fuzz.integer_overflow",
+    "INT_OVERFLOW_URL":
+        "syntribos.tests.fuzz.integer_overflow",
+    "LDAP_INJECTION_BODY":
+        "syntribos.tests.fuzz.ldap",
+    "LDAP_INJECTION_HEADERS":
+        "syntribos.tests.fuzz.ldap",
+    "LDAP_INJECTION_PARAMS":
+        "syntribos.tests.fuzz.ldap",
+    "LDAP_INJECTION_URL":
+        "syntribos.tests.fuzz.ldap",
+    "SQL_INJECTION_BODY":
+        "syntribos.tests.fuzz.sql",
+    "SQL_INJECTION_HEADERS":
+        "syntribos.tests.fuzz.sql",
+    "SQL_INJECTION_PARAMS":
+        "syntribos.tests.fuzz.sql",
+    "SQL_INJECTION_URL":
+        "syntribos.tests.fuzz.sql",
+    "STRING_VALIDATION_VULNERABILITY_BODY":
+        "syntribos.tests.fuzz.string_validation",
+    "STRING_VALIDATION_VULNERABILITY_HEADERS":
+        "syntribos.tests.fuzz.string_validation",
+    "STRING_VALIDATION_VULNERABILITY_PARAMS":
+        "syntribos.tests.fuzz.string_validation",
+    "STRING_VALIDATION_VULNERABILITY_URL":
+        "syntribos.tests.fuzz.string_validation",
+    "XML_EXTERNAL_ENTITY_BODY":
+        "syntribos.tests.fuzz.xml_external",
+    "XSS_BODY":
+        "syntribos.tests.fuzz.xss",
+}
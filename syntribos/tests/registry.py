@@ -0,0 +1,133 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Registry of the test types, and the modules defining them
+
+The test types are listed in :mod:`syntribos.tests.index`, so that only the
+modules of the test types being run are imported, the first time they are
+needed. The index is generated by importing every module of
+:mod:`syntribos.tests`, and must be regenerated when a test type is added,
+renamed or moved::
+
+    python -m syntribos.tests.registry > syntribos/tests/index.py
+"""
+import importlib
+import os
+import pkgutil
+import sys
+
+import syntribos.tests
+from syntribos.tests import base
+from syntribos.tests.index import TEST_MODULES
+
+_INDEX_HEADER = """\
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+\"\"\"Index of the test types (generated by syntribos.tests.registry)\"\"\"
+
+\"\"\"Module defining each test type, by test name\"\"\"
+TEST_MODULES = {
+"""
+
+
+def _import(module_name):
+    """Imports a test module, registering its test types."""
+    if not os.environ.get("CAFE_CONFIG_FILE_PATH"):
+        os.environ["CAFE_CONFIG_FILE_PATH"] = "./"
+    importlib.import_module(module_name)
+
+
+def test_names():
+    """Returns the names of every test type, indexed or already imported
+
+    :rtype: list
+    """
+    return sorted(set(TEST_MODULES) | set(base.test_table))
+
+
+def get_test_class(test_name):
+    """Returns the class of a test type, importing its module on first use
+
+    :param str test_name: Name of the test type, e.g. ``SQL_INJECTION_BODY``
+    :rtype: class
+    :raises: :exc:`KeyError` if there is no such test type
+    """
+    test_class = base.test_table.get(test_name)
+    if test_class is None:
+        _import(TEST_MODULES[test_name])
+        test_class = base.test_table[test_name]
+    return test_class
+
+
+def get_tests(test_types=None):
+    """Yields the test types whose name contains any of `test_types`
+
+    Only the modules of those test types are imported.
+
+    :param list test_types: Test types to be run, every test type by default
+    :rtype: generator
+    :returns: (test name, test class) tuples, sorted by test name
+    """
+    test_types = test_types or [""]
+    for test_name in test_names():
+        if any(t in test_name for t in test_types):
+            yield test_name, get_test_class(test_name)
+
+
+def load_all(package=syntribos.tests):
+    """Imports every module of `package`, registering all test types
+
+    :param package: Package of test modules
+    """
+    for importer, modname, ispkg in pkgutil.walk_packages(
+            path=package.__path__, prefix=package.__name__ + '.',
+            onerror=lambda x: None):
+        _import(modname)
+
+
+def build_index(package=syntribos.tests):
+    """Returns the module defining each test type of `package`
+
+    :param package: Package of test modules
+    :rtype: dict
+    """
+    load_all(package)
+    return dict((test_name, test_class.__module__)
+                for test_name, test_class in base.test_table.items()
+                if test_class.__module__.startswith(package.__name__ + '.'))
+
+
+def format_index(index):
+    """Returns the source of :mod:`syntribos.tests.index` for `index`
+
+    :param dict index: Module defining each test type, by test name
+    :rtype: str
+    """
+    lines = ['    "{0}":\n        "{1}",\n'.format(test_name, module_name)
+             for test_name, module_name in sorted(index.items())]
+    return _INDEX_HEADER + "".join(lines) + "}\n"
+
+
+if __name__ == "__main__":
+    sys.stdout.write(format_index(build_index()))
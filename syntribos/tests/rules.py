@@ -0,0 +1,325 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Declarative detection rules for test classes
+
+A test class lists its detectors as a tuple of rules in its ``detectors``
+attribute, e.g.::
+
+    detectors = base_fuzz.BaseFuzzTestCase.detectors + (
+        rules.Strings("sql_strings", "Medium", "Low",
+                      "The string(s): '{0}' ... have been found"),
+        rules.Slow("sql_timing", "Medium", "Medium", "..."))
+
+Each rule checks one thing about a response and raises an
+:class:`syntribos.issue.Issue` when it matches; the issue text is formatted
+with what the rule found (``{0}``) and the test case (``{case}``). The rules
+of a class are compiled once (see :func:`compile_rules`): the string sets of
+every :class:`Strings` rule are merged into one matcher, so the response body
+is scanned once whatever the number of string rules, and regular expressions
+are compiled once per target host.
+"""
+import re
+import threading
+
+from six.moves.urllib.parse import urlparse
+
+from syntribos.issue import Issue
+from syntribos.tests.fuzz.matcher import get_matcher
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+class Rule(object):
+
+    """Base class for detection rules
+
+    :param str test: Name of the issue raised (e.g. ``sql_strings``)
+    :param severity: Severity of the issue, or a callable returning it for a
+        test case
+    :param confidence: Confidence of the issue, or a callable returning it
+        for a test case
+    :param str text: Description of the issue, formatted with what the rule
+        found (``{0}``) and the test case (``{case}``)
+    :param bool fallback: Only check the rule if no earlier rule raised an
+        issue with the same name for the response
+    """
+
+    def __init__(self, test, severity, confidence, text, fallback=False):
+        self.test = test
+        self.severity = severity
+        self.confidence = confidence
+        self.text = text
+        self.fallback = fallback
+
+    def check(self, case, scan):
+        """Returns what the rule found in the response of `case`, if anything
+
+        :param case: The test case whose response is checked
+        :param scan: The :class:`_Scan` of the response
+        """
+        raise NotImplementedError
+
+    def issue(self, case, found):
+        """Builds the issue raised when the rule found `found`
+
+        :rtype: :class:`syntribos.issue.Issue`
+        """
+        severity = self.severity
+        if callable(severity):
+            severity = severity(case)
+        confidence = self.confidence
+        if callable(confidence):
+            confidence = confidence(case)
+        return Issue(test=self.test, severity=severity,
+                     confidence=confidence,
+                     text=self.text.format(found, case=case))
+
+
+class Strings(Rule):
+
+    """Matches when any of a set of strings is in the response body
+
+    :param keys: The strings, or a callable returning them for the test
+        class; the class' ``failure_keys`` by default
+    """
+
+    def __init__(self, test, severity, confidence, text, keys=None,
+                 fallback=False):
+        super(Strings, self).__init__(
+            test, severity, confidence, text, fallback)
+        self.keys = keys
+
+    def get_keys(self, cls):
+        """Returns the strings this rule looks for in responses to `cls`."""
+        if self.keys is None:
+            return cls.failure_keys or ()
+        if callable(self.keys):
+            return self.keys(cls)
+        return self.keys
+
+    def check(self, case, scan):
+        # Only the strings found are looked up, in the order of the rule
+        positions = scan.positions[self]
+        return sorted((k for k in scan.found if k in positions),
+                      key=positions.get)
+
+
+class Pattern(Rule):
+
+    """Matches when a regular expression is found in the response text
+
+    :param str pattern: The regular expression, formatted with the hostname
+        of the baseline request (``{host}``)
+    """
+
+    def __init__(self, test, severity, confidence, text, pattern,
+                 fallback=False):
+        super(Pattern, self).__init__(
+            test, severity, confidence, text, fallback)
+        self.pattern = pattern
+        self._regexes = {}
+
+    def regex(self, host):
+        """Returns the compiled regular expression for `host`."""
+        regex = self._regexes.get(host)
+        if regex is None:
+            regex = self._regexes[host] = re.compile(
+                self.pattern.format(host=host))
+        return regex
+
+    def check(self, case, scan):
+        match = self.regex(scan.host).search(scan.text)
+        return match and match.group()
+
+
+class Status(Rule):
+
+    """Matches when a predicate of the response status code holds
+
+    :param predicate: Callable taking the status code, e.g.
+        ``lambda code: code >= 500``
+    """
+
+    def __init__(self, test, severity, confidence, text, predicate,
+                 fallback=False):
+        super(Status, self).__init__(
+            test, severity, confidence, text, fallback)
+        self.predicate = predicate
+
+    def check(self, case, scan):
+        status_code = case.resp.status_code
+        return self.predicate(status_code) and status_code
+
+
+class Header(Rule):
+
+    """Matches when a response header is set to a given value
+
+    :param str name: Name of the header
+    :param str value: Value of the header that raises the issue
+    """
+
+    def __init__(self, test, severity, confidence, text, name, value,
+                 fallback=False):
+        super(Header, self).__init__(
+            test, severity, confidence, text, fallback)
+        self.name = name
+        self.value = value
+
+    def check(self, case, scan):
+        value = case.resp.headers.get(self.name)
+        return value == self.value and value
+
+
+class LengthDiff(Rule):
+
+    """Matches when the response length differs from the baseline's
+
+    Only responses with the same status code as the baseline raise an issue
+    (see ``validate_length`` of
+    :class:`syntribos.tests.fuzz.base_fuzz.BaseFuzzTestCase`).
+    """
+
+    def check(self, case, scan):
+        return (not case.validate_length() and
+                case.resp.status_code == case.init_response.status_code)
+
+
+class Slow(Rule):
+
+    """Matches when the response took anomalously long
+
+    See ``is_slow_response`` of
+    :class:`syntribos.tests.fuzz.base_fuzz.BaseFuzzTestCase`, which may
+    re-send the request, so this rule is best listed last.
+    """
+
+    def check(self, case, scan):
+        return case.is_slow_response()
+
+
+class Elapsed(Rule):
+
+    """Matches when the response took at least `seconds`
+
+    :param float seconds: Response time raising the issue
+    """
+
+    def __init__(self, test, severity, confidence, text, seconds,
+                 fallback=False):
+        super(Elapsed, self).__init__(
+            test, severity, confidence, text, fallback)
+        self.seconds = seconds
+
+    def check(self, case, scan):
+        elapsed = case.resp.elapsed
+        return elapsed.total_seconds() >= self.seconds and elapsed
+
+
+class _Scan(object):
+
+    """What the rules of a test case share about its response
+
+    The body is only scanned (and decoded) when a rule needs it, and only
+    once for all the rules.
+    """
+
+    def __init__(self, compiled, case):
+        self.case = case
+        self.positions = compiled.positions
+        self._matcher = compiled.matcher
+        self._found = None
+        self._text = None
+
+    @property
+    def found(self):
+        """The strings of every :class:`Strings` rule found in the body."""
+        if self._found is None:
+            self._found = set(self._matcher.find(self.case.resp.content))
+        return self._found
+
+    @property
+    def text(self):
+        """The decoded body."""
+        if self._text is None:
+            self._text = self.case.resp.text
+        return self._text
+
+    @property
+    def host(self):
+        """The hostname the baseline request was sent to."""
+        return urlparse(self.case.init_request.url).hostname
+
+
+class CompiledRules(object):
+
+    """The rules of a test class, with their string sets merged
+
+    :ivar tuple rules: The rules, in the order they are checked
+    :ivar dict positions: For each :class:`Strings` rule, the position of
+        each of its strings in the rule, by string
+    :ivar matcher: The :class:`syntribos.tests.fuzz.matcher.KeyMatcher` for
+        the strings of every rule
+    """
+
+    def __init__(self, cls, rules):
+        self.rules = tuple(rules)
+        self.positions = {}
+        merged = []
+        for rule in self.rules:
+            if isinstance(rule, Strings):
+                keys = rule.get_keys(cls)
+                positions = self.positions[rule] = {}
+                for position, key in enumerate(keys):
+                    positions.setdefault(key, position)
+                merged.extend(keys)
+        if len(self.positions) == 1:
+            # Shares the matcher of data_driven_failure_cases
+            self.matcher = get_matcher(keys)
+        else:
+            self.matcher = get_matcher(tuple(merged))
+
+    def evaluate(self, case):
+        """Checks the response of `case` against every rule
+
+        :returns: The issues raised, in the order of the rules
+        :rtype: list
+        """
+        scan = _Scan(self, case)
+        issues = []
+        raised = set()
+        for rule in self.rules:
+            if rule.fallback and rule.test in raised:
+                continue
+            found = rule.check(case, scan)
+            if found:
+                issues.append(rule.issue(case, found))
+                raised.add(rule.test)
+        return issues
+
+
+def compile_rules(cls, rules):
+    """Returns the shared :class:`CompiledRules` of `rules` for `cls`
+
+    :param cls: The test class the rules check responses for
+    :param tuple rules: The rules
+    :rtype: :class:`CompiledRules`
+    """
+    key = (cls, rules)
+    with _compiled_lock:
+        compiled = _compiled.get(key)
+        if compiled is None:
+            compiled = _compiled[key] = CompiledRules(cls, rules)
+    return compiled
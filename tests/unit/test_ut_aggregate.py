@@ -0,0 +1,81 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import shutil
+import tempfile
+
+import six
+import testtools
+
+from syntribos.formatters.aggregate import IssueAggregate
+from syntribos.issue import Issue
+
+
+class _Parameter(object):
+    method = "POST"
+    location = "data"
+    name = "x"
+
+    def __init__(self, payload):
+        self.trunc_fuzz_string = payload
+
+
+def _issue(payload=None, defect_type="SQL_ERRORS"):
+    issue = Issue(test=defect_type, severity="Medium", text="SQL error",
+                  confidence="High")
+    issue.target, issue.path, issue.test_type = "localhost", "/v2", "SQL"
+    issue.content_type = "json"
+    if payload is not None:
+        issue.impacted_parameter = _Parameter(payload)
+    return issue
+
+
+class IssueAggregateUnittest(testtools.TestCase):
+
+    def test_issues_are_nested_and_payloads_deduplicated(self):
+        stream = six.StringIO()
+        aggregate = IssueAggregate(stream=stream)
+        for payload in ("'", "\"", "'"):
+            aggregate.add_issue(_issue(payload))
+        aggregate.add_issue(_issue(defect_type="CORS"))
+        details = {"confidence": "High", "description": "SQL error",
+                   "severity": "Medium"}
+        self.assertEqual(
+            {"localhost/v2": {"SQL": {
+                "POST - data:json|x": {
+                    "SQL_ERRORS": dict(details, payloads=["'", "\""])},
+                "CORS": details}}},
+            aggregate.failures())
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(4, len(lines))
+        self.assertEqual("'", lines[2]["issue"]["payload"])
+
+    def test_merge(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        other = IssueAggregate(os.path.join(directory, "issues.db"))
+        other.add_issue(_issue("'"))
+        other.add_issue(_issue("--"))
+        other.add_error("test", "Traceback")
+        other.close()
+
+        aggregate = IssueAggregate()
+        aggregate.add_issue(_issue("'"))
+        aggregate.merge(os.path.join(directory, "issues.db"))
+        self.assertEqual(
+            ["'", "--"], aggregate.failures()["localhost/v2"]["SQL"][
+                "POST - data:json|x"]["SQL_ERRORS"]["payloads"])
+        self.assertEqual([{"test": "test", "error": "Traceback"}],
+                         aggregate.errors())
@@ -0,0 +1,77 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+import unittest
+
+import testtools
+
+from syntribos.runner import Runner
+from syntribos.tests import base
+
+
+def _make_test():
+    # Defined here so that the test runner does not collect it
+    class _Test(base.BaseTestCase):
+
+        def test_case(self):
+            if self.payload == "fail":
+                self.failures.append(self.payload)
+    return _Test
+
+
+class CreateTestCaseUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(CreateTestCaseUnittest, self).setUp()
+        self.test_class = _make_test()
+
+    def _set_env(self, name, value):
+        previous = os.environ.get(name)
+        os.environ[name] = value
+        if previous is None:
+            self.addCleanup(os.environ.pop, name)
+        else:
+            self.addCleanup(os.environ.__setitem__, name, previous)
+
+    def test_instances_of_the_test_type(self):
+        first = self.test_class.create_test_case("a_SQL_x", payload="ok")
+        second = self.test_class.create_test_case("a_SQL_y", payload="fail")
+        self.assertIs(self.test_class, type(first))
+        self.assertIs(self.test_class, type(second))
+        self.assertEqual("run_test", first._testMethodName)
+        self.assertEqual("ok", first.payload)
+        self.assertEqual("fail", second.payload)
+        self.assertFalse(hasattr(self.test_class, "payload"))
+
+    def test_case_name_in_id(self):
+        test = self.test_class.create_test_case("post.txt_SQL_'x")
+        self.assertEqual("post.txt_SQL__x", test.case_name)
+        self.assertEqual("{0}.post.txt_SQL__x".format(__name__), test.id())
+
+    def test_failures_reported_per_case(self):
+        # The fixtures of cafe log to the run's log directory
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, log_dir)
+        self._set_env("CAFE_TEST_LOG_PATH", log_dir)
+        self._set_env("CAFE_ROOT_LOG_PATH", log_dir)
+        result = unittest.TestResult()
+        Runner.run_tests([
+            self.test_class.create_test_case("ok", payload="ok"),
+            self.test_class.create_test_case("fail", payload="fail")],
+            result)
+        self.assertEqual(2, result.testsRun)
+        self.assertEqual([], result.errors)
+        self.assertEqual(1, len(result.failures))
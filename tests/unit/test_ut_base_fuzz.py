@@ -0,0 +1,139 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import datetime
+import os
+
+import testtools
+
+from syntribos.tests.baseline import LatencyBaseline
+
+
+class _Request(object):
+    method = "POST"
+    body = ""
+
+    def __init__(self, data=""):
+        self.body = data
+        self.headers = {"content-type": "application/json"}
+
+
+class _Response(object):
+    url = "http://localhost/v3/domains"
+
+    def __init__(self, status_code=200, request=None):
+        self.status_code = status_code
+        self.request = request or _Request()
+        self.content = self.request.body
+        self.elapsed = datetime.timedelta(seconds=0.1)
+
+
+class _FuzzRequest(object):
+    params = ["x", "y"]
+
+    def fuzz_request(self, strings, fuzz_type, name_prefix):
+        for string in strings:
+            for param in self.params:
+                yield ("{0}{1}_{2}".format(name_prefix, string, param),
+                       _Request(string), string, param)
+
+
+def _make_fuzz_test():
+    # Test types read their config on import, as the runner does
+    os.environ.setdefault("CAFE_CONFIG_FILE_PATH", "./")
+    from syntribos.tests.fuzz.base_fuzz import BaseFuzzTestCase
+
+    class _FuzzTest(BaseFuzzTestCase):
+        test_type = "data"
+
+        @classmethod
+        def _get_strings(cls, file_name=None, scan_level=None):
+            return ["a", "'", "b", "c"]
+
+        def send_fuzz_request(self):
+            # Only "x" reacts, to quotes
+            if self.param_path == "x" and "'" in self.fuzz_string:
+                return _Response(500, self.request)
+            return _Response(200, self.request)
+    return _FuzzTest
+
+
+class AdaptiveCasesUnittest(testtools.TestCase):
+
+    def _get_cases(self):
+        return list(_make_fuzz_test()._get_adaptive_cases(
+            _FuzzRequest(), "prefix_", _Response(),
+            LatencyBaseline([0.1] * 10)))
+
+    def test_only_reacting_parameters_are_escalated(self):
+        tests = self._get_cases()
+        self.assertEqual(
+            [("a", "x"), ("a", "y"), ("'", "x"), ("'", "y"), ("b", "x"),
+             ("c", "x")],
+            [(t.fuzz_string, t.param_path) for t in tests])
+        # Probes are sent during generation, the rest when the test runs
+        self.assertEqual([200, 200, 500, 200, None, None],
+                         [t.resp and t.resp.status_code for t in tests])
+        # The last probe of an escalated parameter holds the escalation
+        self.assertEqual([None, None, "x", None, None, None],
+                         [t.escalation and t.escalation["name"]
+                          for t in tests])
+        self.assertEqual(["status code"], tests[2].escalation["reasons"])
+
+    def test_probes_sent_concurrently(self):
+        self.patch(os, "environ", dict(os.environ, SYNTRIBOS_WORKERS="3"))
+        tests = self._get_cases()
+        self.assertEqual(
+            [("a", "x"), ("a", "y"), ("'", "x"), ("'", "y"), ("b", "x"),
+             ("c", "x")],
+            [(t.fuzz_string, t.param_path) for t in tests])
+        self.assertEqual([200, 200, 500, 200, None, None],
+                         [t.resp and t.resp.status_code for t in tests])
+        self.assertEqual(["status code"], tests[2].escalation["reasons"])
+
+
+class BaselineSamplesUnittest(testtools.TestCase):
+
+    def test_only_safe_methods_resampled(self):
+        test_class = _make_fuzz_test()
+        samples = test_class.config.baseline_samples
+        self.assertEqual(samples, test_class._baseline_samples("GET"))
+        self.assertEqual(samples, test_class._baseline_samples("head"))
+        for method in ("POST", "PUT", "PATCH", "DELETE"):
+            self.assertEqual(1, test_class._baseline_samples(method))
+
+
+class FailureKeysUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(FailureKeysUnittest, self).setUp()
+        # Test types read their config on import, as the runner does
+        os.environ.setdefault("CAFE_CONFIG_FILE_PATH", "./")
+        from syntribos.tests.fuzz.base_fuzz import BaseFuzzTestCase
+        self.test_class = BaseFuzzTestCase
+
+    def test_failure_keys_set_on_test_case(self):
+        """Keys set by test_case (as XSS does) are looked for"""
+        test = self.test_class.create_test_case(
+            "case", resp=_Response(
+                request=_Request(b"<script>alert(1)</script>")))
+        test.failure_keys = ["<script>", "mysql"]
+        self.assertEqual(["<script>"], test.data_driven_failure_cases())
+        self.assertIsNone(self.test_class.failure_keys)
+
+    def test_failure_keys_of_class(self):
+        test = self.test_class.create_test_case(
+            "case", resp=_Response(
+                request=_Request(b"You have an error in your SQL syntax")))
+        self.patch(self.test_class, "failure_keys", ["SQL syntax"])
+        self.assertEqual(["SQL syntax"], test.data_driven_failure_cases())
@@ -0,0 +1,131 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import datetime
+
+import testtools
+
+from syntribos.tests.baseline import BaselineCache
+from syntribos.tests.baseline import LatencyBaseline
+
+
+class _Response(object):
+    def __init__(self, name, seconds=0.1):
+        self.name = name
+        self.elapsed = datetime.timedelta(seconds=seconds)
+
+    def __eq__(self, other):
+        return self.name == other
+
+
+class BaselineCacheUnittest(testtools.TestCase):
+    def setUp(self):
+        super(BaselineCacheUnittest, self).setUp()
+        self.now = 0
+        self.sent = []
+        self.cache = BaselineCache(clock=lambda: self.now)
+
+    def _send(self):
+        self.sent.append(self.now)
+        return _Response("response{0}".format(len(self.sent)))
+
+    def test_fetch_sends_once_per_template(self):
+        key = self.cache.make_key("a.txt", "GET / HTTP/1.1", "fuzz")
+        self.assertEqual("response1", self.cache.fetch(key, self._send)[0])
+        self.assertEqual("response1", self.cache.fetch(key, self._send)[0])
+        changed = self.cache.make_key("a.txt", "GET /x HTTP/1.1", "fuzz")
+        self.assertEqual("response2", self.cache.fetch(changed, self._send)[0])
+        variant = self.cache.make_key("a.txt", "GET / HTTP/1.1", "auth")
+        self.assertEqual("response3", self.cache.fetch(variant, self._send)[0])
+
+    def test_ttl_expires_entries(self):
+        self.cache.ttl = 10
+        key = self.cache.make_key("a.txt", "GET / HTTP/1.1")
+        self.cache.fetch(key, self._send)
+        self.now = 5
+        self.assertEqual("response1", self.cache.fetch(key, self._send)[0])
+        self.now = 11
+        self.assertEqual("response2", self.cache.fetch(key, self._send)[0])
+
+    def test_invalidate(self):
+        key_a = self.cache.make_key("a.txt", "GET /a HTTP/1.1")
+        key_b = self.cache.make_key("b.txt", "GET /b HTTP/1.1")
+        self.cache.set(key_a, "a")
+        self.cache.set(key_b, "b")
+        self.cache.invalidate("a.txt")
+        self.assertIsNone(self.cache.get(key_a))
+        self.assertEqual("b", self.cache.get(key_b))
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.get(key_b))
+
+    def test_fetch_samples_latency(self):
+        key = self.cache.make_key("a.txt", "GET / HTTP/1.1")
+        response, latency = self.cache.fetch(key, self._send, 5)
+        self.assertEqual("response1", response)
+        self.assertEqual(5, len(self.sent))
+        self.assertEqual(5, len(latency))
+        self.assertIs(latency, self.cache.fetch(key, self._send)[1])
+
+    def test_fetch_expiring_entry_keeps_latency(self):
+        """The latency comes with the response, even if the entry expires"""
+        self.cache.ttl = 10
+        key = self.cache.make_key("a.txt", "GET / HTTP/1.1")
+        self.cache.fetch(key, self._send)
+        self.now = 10
+        response, latency = self.cache.fetch(key, self._send)
+        self.now = 21
+        self.assertIsNone(self.cache.latency(key))
+        self.assertEqual("response1", response)
+        self.assertIsNotNone(latency)
+
+    def test_export_and_load(self):
+        key = self.cache.make_key("a.txt", "GET / HTTP/1.1", "fuzz")
+        self.cache.fetch(key, self._send, 2)
+        self.cache.get(key).body_length = 10
+        self.cache.fetch(self.cache.make_key("b.txt", "GET / HTTP/1.1"),
+                         self._send)
+        entries = self.cache.export("a.txt", "GET / HTTP/1.1")
+        self.assertEqual([key], [entry[0] for entry in entries])
+
+        other = BaselineCache()
+        response = _Response("response1")
+        other.load([(key, response, {"body_length": 10}, [0.1, 0.2])])
+        self.assertIs(response, other.get(key))
+        self.assertEqual(10, response.body_length)
+        self.assertEqual([0.1, 0.2], other.latency(key).samples())
+        # Baselines already cached are kept
+        other.load([(key, _Response("response2"), {}, [])])
+        self.assertIs(response, other.get(key))
+
+
+class LatencyBaselineUnittest(testtools.TestCase):
+    def test_percentiles_over_window(self):
+        latency = LatencyBaseline(range(1, 11), window=5)
+        self.assertEqual(5, len(latency))
+        self.assertEqual(6, latency.percentile(0))
+        self.assertEqual(8, latency.percentile(50))
+        self.assertEqual(10, latency.percentile(100))
+
+    def test_is_anomalous(self):
+        latency = LatencyBaseline([0.1, 0.12, 0.09, 0.11, 0.5])
+        self.assertFalse(latency.is_anomalous(0.5, 2))
+        self.assertFalse(latency.is_anomalous(1.0, 10))
+        self.assertTrue(latency.is_anomalous(1.2, 10))
+        self.assertTrue(latency.is_anomalous(0.6, 2))
+
+    def test_not_anomalous_until_enough_samples(self):
+        latency = LatencyBaseline([0.01])
+        self.assertFalse(latency.is_anomalous(1.0, 10))
+        for _ in range(LatencyBaseline.min_samples - 1):
+            latency.add(0.01)
+        self.assertTrue(latency.is_anomalous(1.0, 10))
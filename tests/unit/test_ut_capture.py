@@ -0,0 +1,99 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import datetime
+import os
+import shutil
+import tempfile
+
+import requests
+import testtools
+
+from syntribos import capture
+from syntribos.tests import baseline
+
+
+def _response(body, seconds=0.1):
+    response = requests.Response()
+    response.status_code, response.reason = 500, "Internal Server Error"
+    response.headers["Content-Type"] = "text/plain"
+    response._content = body
+    response.elapsed = datetime.timedelta(seconds=seconds)
+    response.request = requests.Request(
+        "POST", "http://localhost/v2", headers={"X-Fuzz": "\xff'"},
+        data="{'").prepare()
+    response.url = response.request.url
+    return response
+
+
+class CaptureUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(CaptureUnittest, self).setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "capture.bin")
+
+    def test_replay_by_label(self):
+        writer = capture.CaptureWriter(self.path)
+        writer.write_run(test_types=["SQL"], scan_level="full",
+                         endpoint="http://localhost")
+        list(writer.record_templates([("post.txt", "POST /v2 HTTP/1.1")]))
+        with capture.labelled("baseline"):
+            writer.write_transaction(_response(b"ok"))
+        with capture.labelled("test"):
+            writer.write_transaction(_response(b"Traceback", 2.5))
+            writer.write_transaction(_response(b"Traceback again"))
+        writer.close()
+
+        player = capture.CapturePlayer(self.path)
+        self.addCleanup(player.close)
+        self.assertEqual(["SQL"], player.settings["test_types"])
+        self.assertEqual([("post.txt", "POST /v2 HTTP/1.1")],
+                         player.templates)
+        with capture.labelled("test"):
+            first = player.next_response()
+            second = player.next_response()
+            # Re-sent more times than captured
+            third = player.next_response()
+        self.assertEqual(b"Traceback", first.content)
+        self.assertEqual(2.5, first.elapsed.total_seconds())
+        self.assertEqual("text/plain", first.headers["content-type"])
+        self.assertEqual("\xff'", first.request.headers["X-Fuzz"])
+        self.assertEqual("{'", first.request.body)
+        self.assertEqual(b"Traceback again", second.content)
+        self.assertEqual(b"Traceback again", third.content)
+        self.assertRaises(capture.CaptureMiss, player.next_response)
+
+    def test_replay_subset_of_test_types(self):
+        key = baseline.BaselineCache.make_key("t1.txt", "POST /v2", "fuzz")
+        writer = capture.CaptureWriter(self.path)
+
+        def send():
+            response = _response(b"baseline")
+            writer.write_transaction(response)
+            return response
+
+        cache = baseline.BaselineCache()
+        # Only the first test type generated sends the baseline
+        for test_name in ("SQL_INJECTION_BODY", "XSS_BODY"):
+            with capture.labelled("t1.txt:" + test_name):
+                cache.fetch(key, send)
+        writer.close()
+
+        player = capture.CapturePlayer(self.path)
+        self.addCleanup(player.close)
+        with capture.labelled("t1.txt:XSS_BODY"):
+            response, _ = baseline.BaselineCache().fetch(
+                key, player.next_response)
+        self.assertEqual(b"baseline", response.content)
@@ -0,0 +1,48 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import subprocess
+import sys
+
+import testtools
+
+from syntribos.clients.http import green
+from syntribos import console
+
+# Run in a new interpreter, as this one already imported the runner
+_PATCHED_LOCKS = """
+from syntribos import console
+console._patch(["my.config", "--transport", "gevent"])
+import syntribos.runner
+from syntribos.clients.http.base_http_client import HTTPClient
+from syntribos.clients.http import throttle
+print(type(HTTPClient._sessions_lock).__module__)
+print(type(throttle._limiters_lock).__module__)
+"""
+
+
+class ConsoleUnittest(testtools.TestCase):
+
+    def test_get_transport(self):
+        self.assertEqual("threads", console._get_transport(["my.config"]))
+        self.assertEqual("gevent", console._get_transport(
+            ["my.config", "post.txt", "--transport", "gevent", "-w", "9"]))
+        self.assertEqual("gevent", console._get_transport(
+            ["my.config", "--transport=gevent"]))
+
+    @testtools.skipUnless(green.is_available(), "gevent is not installed")
+    def test_patched_before_runner_imported(self):
+        output = subprocess.check_output([sys.executable, "-c",
+                                          _PATCHED_LOCKS])
+        self.assertEqual(["gevent.thread", "gevent.thread"],
+                         output.decode("utf-8").split())
@@ -0,0 +1,90 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+
+import testtools
+
+from syntribos.tests.fuzz import corpus
+
+
+class CorpusUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(CorpusUnittest, self).setUp()
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def _write(self, content, name="data.txt"):
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as fp:
+            fp.write(content)
+        return path
+
+    def test_lines_match_splitlines(self):
+        for content in [b"", b"\n", b"a", b"a\nb\n", b"a\r\nb\rc\n\nd",
+                        b"\x00\xff\n<script>"]:
+            strings = corpus.Corpus(self._write(content))
+            self.assertEqual(content.splitlines(), list(strings))
+            self.assertEqual(len(content.splitlines()), len(strings))
+
+    def test_indexing_and_slicing(self):
+        strings = corpus.Corpus(self._write(b"a\nbb\nccc\ndddd\n"))
+        self.assertEqual(b"bb", strings[1])
+        self.assertEqual(b"dddd", strings[-1])
+        self.assertEqual([b"bb", b"ccc"], list(strings[1:3]))
+        self.assertEqual([b"a", b"ccc"], list(strings[::2]))
+        self.assertEqual(1, len(strings[1:3][1:]))
+
+    def test_get_corpus_is_shared(self):
+        path = self._write(b"a\nb\n")
+        strings = corpus.get_corpus(path)
+        self.assertIs(strings, corpus.get_corpus(path))
+        # Changes to the file are ignored, even truncating it in place
+        with open(path, "r+b") as fp:
+            fp.truncate(0)
+        self.assertIs(strings, corpus.get_corpus(path))
+        self.assertEqual([b"a", b"b"], list(strings))
+
+
+class PayloadClassUnittest(testtools.TestCase):
+
+    def test_normalize_payload_undoes_encodings_and_repeats(self):
+        for payload in ["/../{FILE}", "/../../../../{FILE}",
+                        "/..%2f..%2f{FILE}", "/%2e%2e/%2e%2e/{FILE}",
+                        "/..%%32%66{FILE}",
+                        "/%25c0%25ae%25c0%25ae%25c0%25af{FILE}",
+                        "/..\\..\\{FILE}", "/..%u002f{FILE}"]:
+            self.assertEqual("/../{file}", corpus.normalize_payload(payload))
+        self.assertEqual("/./{file}", corpus.normalize_payload("/./{FILE}"))
+
+    def test_payload_class(self):
+        self.assertEqual(corpus.payload_class("/a/b.php?x=XXpathXX"),
+                         corpus.payload_class("/c/d/e.php?y=XXpathXX"))
+        self.assertNotEqual(corpus.payload_class("/../{FILE}"),
+                            corpus.payload_class("/./{FILE}"))
+        self.assertNotEqual(corpus.payload_class("; ls"),
+                            corpus.payload_class("| ls"))
+
+    def test_representatives(self):
+        dir_ = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dir_)
+        path = os.path.join(dir_, "data.txt")
+        with open(path, "wb") as fp:
+            fp.write(b"/../{FILE}\n; ls\n/../../{FILE}\n; id\n| ls\n")
+        self.assertEqual(
+            [b"/../{FILE}", b"; ls", b"| ls"],
+            list(corpus.get_corpus(path, corpus.REPRESENTATIVES)))
+        self.assertEqual(5, len(corpus.get_corpus(path)))
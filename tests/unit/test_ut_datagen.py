@@ -17,7 +17,9 @@ import testtools
 
 from xml.etree import ElementTree
 
+from syntribos.tests.fuzz.datagen import BodyTemplate
 from syntribos.tests.fuzz.datagen import FuzzMixin
+from syntribos.tests.fuzz.datagen import FuzzRequest
 
 
 class FuzzMixinUnittest(testtools.TestCase):
@@ -59,3 +61,52 @@ class FuzzMixinUnittest(testtools.TestCase):
             name, model, stri, param_path = d
             assert "test" in model
             assert name == "unitteststr1_model{0}".format(i)
+
+
+class BodyTemplateUnittest(testtools.TestCase):
+
+    strings = ["test", "'\"<a href=\"&amp;\">\\", u"\u00e9\u4e2d"]
+
+    def _assert_same_bodies(self, data):
+        request = FuzzRequest("POST", "http://localhost/", "ACTION_FIELD:",
+                              {}, {}, data)
+        expected = [
+            (name, request._string_data(request._run_iters(
+                model, "ACTION_FIELD:")), stri, param_path)
+            for name, model, stri, param_path in request._fuzz_data(
+                self.strings, data, "ACTION_FIELD:", "unittest")]
+        self.assertEqual(expected, list(request._fuzz_body(
+            self.strings, data, "unittest")))
+
+    def test_json_bodies_match_serialized_models(self):
+        self._assert_same_bodies(
+            {"a": {"b": "c", "ACTION_FIELD:d": "e"}, "f": ["g", {"h": 1}]})
+
+    def test_xml_bodies_match_serialized_models(self):
+        self._assert_same_bodies(ElementTree.fromstring(
+            '<a x="1"><b>c &amp; d</b><e y="&lt;">f</e>'
+            '<g><h>i</h></g></a>'))
+
+    def test_ranges_match_full_generation(self):
+        strings = ["s{0}".format(i) for i in range(5)]
+        for data in ({"a": "1", "b": {"c": "2"}, "ACTION_FIELD:d": "e"},
+                     "/users/{userid:1}/{x}"):
+            request = FuzzRequest("POST", "http://localhost/",
+                                  "ACTION_FIELD:", {}, {}, data)
+            expected = [(name, stri, param_path)
+                        for name, _, stri, param_path in request.fuzz_request(
+                            strings, "data", "unittest")]
+            self.assertEqual(len(expected), request.count_fuzz_requests(
+                strings, "data"))
+            for start, stop in ((0, 3), (3, 7), (4, 6), (9, None), (12, 20)):
+                self.assertEqual(expected[start:stop], [
+                    (name, stri, param_path)
+                    for name, _, stri, param_path in request.fuzz_request(
+                        strings, "data", "unittest", start, stop)])
+
+    def test_iterators_are_run_on_each_render(self):
+        iterators = {"ITER_1": (str(i) for i in range(10))}
+        template = BodyTemplate('{"a": "SLOT", "b": "ITER_1"}', "SLOT", "a",
+                                FuzzRequest._escape_json, iterators)
+        self.assertEqual('{"a": "\\"", "b": "0"}', template.render('"'))
+        self.assertEqual('{"a": "x", "b": "1"}', template.render("x"))
@@ -0,0 +1,144 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import datetime
+import os
+import unittest
+
+import testtools
+
+from syntribos import distributed
+from syntribos import journal
+from syntribos.result import IssueTestResult
+from syntribos.tests import baseline
+from syntribos.tests import registry
+
+
+def _outcome(*test_ids):
+    return {"tests_run": len(test_ids), "escalations": [],
+            "records": [(i, i, journal.SUCCESS, [], None) for i in test_ids]}
+
+
+class CoordinatorUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(CoordinatorUnittest, self).setUp()
+        self.now = 0
+        self.result = IssueTestResult(
+            unittest.runner._WritelnDecorator(open(os.devnull, "w")), True, 0)
+        self.result.stats = {"errors": 0, "failures": 0, "successes": 0}
+        jobs = [distributed.Job("post.txt", "POST /", "SQL", shard_size=2),
+                distributed.Job("post.txt", "POST /", "CORS")]
+        self.coordinator = distributed.Coordinator(
+            jobs, self.result, {"scan_level": "full"}, lease_timeout=10,
+            clock=lambda: self.now)
+
+    def test_units_of_dead_worker_are_reassigned(self):
+        first = self.coordinator.lease("a")
+        self.assertEqual((0, 0), first.key)
+        self.assertTrue(first.count)
+        # The rest of a sharded job waits for its size
+        self.assertEqual((1, 0), self.coordinator.lease("b").key)
+        self.assertEqual(distributed.WAIT, self.coordinator.lease("b"))
+        self.coordinator.set_size("a", first.key, 3)
+        self.assertEqual((0, 2), self.coordinator.lease("b").key)
+
+        # "a" dies; its unit goes to "b" once its lease expires
+        self.now = 11
+        self.coordinator.heartbeat("b", (0, 2))
+        self.coordinator.heartbeat("b", (1, 0))
+        self.assertEqual(first, self.coordinator.lease("b"))
+        self.assertFalse(self.coordinator.heartbeat("a", first.key))
+
+        self.coordinator.complete("b", (1, 0), _outcome("cors"))
+        self.coordinator.complete("b", (0, 2), _outcome("sql3"))
+        self.assertEqual(0, self.result.testsRun)
+        self.coordinator.complete("b", (0, 0), _outcome("sql1", "sql2"))
+        # A late outcome of a reassigned unit is ignored
+        self.coordinator.complete("a", (0, 0), _outcome("sql1", "sql2"))
+        self.assertTrue(self.coordinator.is_done())
+        self.assertEqual(4, self.result.testsRun)
+        self.assertIsNone(self.coordinator.lease("b"))
+
+    def test_baselines_reach_later_units_of_the_template(self):
+        first = self.coordinator.lease("a")
+        self.assertEqual([], first.baselines)
+        entry = (("post.txt", "sha", "fuzz"), "response", {}, [0.1])
+        self.coordinator.set_size("a", first.key, 3, [entry])
+        self.assertEqual([entry], self.coordinator.lease("b").baselines)
+        self.assertEqual([entry], self.coordinator.lease("b").baselines)
+
+
+class _Response(object):
+    elapsed = datetime.timedelta(seconds=0.1)
+
+
+def _fake_test_class(sent):
+    class FakeTestCase(object):
+        @classmethod
+        def count_test_cases(cls, filename, file_content):
+            return 10
+
+        @classmethod
+        def get_test_case_range(cls, filename, file_content, start, stop):
+            baseline.cache.fetch(
+                baseline.cache.make_key(filename, file_content, "fuzz"),
+                lambda: sent.append(filename) or _Response())
+            for i in range(start, min(stop, 10)):
+                yield "test{0}".format(i)
+    return FakeTestCase
+
+
+class WorkerUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(WorkerUnittest, self).setUp()
+        self.sent = []
+        self.sizes = []
+        self.ran = []
+        self.patch(registry, "get_test_class",
+                   lambda name: _fake_test_class(self.sent))
+        self.addCleanup(baseline.cache.invalidate, "unit.txt")
+
+        def set_size(worker, key, size, baselines=()):
+            self.sizes.append((size, baselines))
+
+        def run_tests(tests, result, workers=1):
+            self.ran.extend(tests)
+
+        self.worker = distributed.Worker(("127.0.0.1", 0), "key", None)
+        self.worker.coordinator = type("Coordinator", (object,), {
+            "set_size": staticmethod(set_size)})()
+        self.worker.runner = type("Runner", (object,), {
+            "run_tests": staticmethod(run_tests)})()
+
+    def test_first_unit_counts_and_exports_baselines(self):
+        unit = distributed.WorkUnit(
+            (0, 0), "unit.txt", "POST /", "FAKE", 0, 4, True, [])
+        self.worker.run_unit(unit)
+        self.assertEqual(["test0", "test1", "test2", "test3"], self.ran)
+        self.assertEqual(["unit.txt"], self.sent)
+        size, baselines = self.sizes[0]
+        self.assertEqual(10, size)
+        self.assertEqual(1, len(baselines))
+        self.assertIsInstance(baselines[0][1], _Response)
+
+    def test_later_units_use_shipped_baselines(self):
+        key = baseline.cache.make_key("unit.txt", "POST /", "fuzz")
+        unit = distributed.WorkUnit(
+            (0, 8), "unit.txt", "POST /", "FAKE", 8, 12, False,
+            [(key, "response", {}, [0.1])])
+        self.worker.run_unit(unit)
+        self.assertEqual(["test8", "test9"], self.ran)
+        self.assertEqual([], self.sent)
+        self.assertEqual([], self.sizes)
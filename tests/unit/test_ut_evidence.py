@@ -0,0 +1,60 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import shutil
+import tempfile
+
+import requests
+import testtools
+
+from syntribos.evidence import EvidenceRetention
+from syntribos.issue import Issue
+
+
+def _issue(body):
+    request = requests.Request(
+        "POST", "http://localhost/v2", data="{'").prepare()
+    response = requests.Response()
+    response.status_code, response.url = 500, request.url
+    response._content = body
+    issue = Issue(test="500_errors", severity="Low", text="500 error",
+                  confidence="High", request=request, response=response)
+    issue.target, issue.path, issue.test_type = "localhost", "/v2", "SQL"
+    return issue
+
+
+class EvidenceRetentionUnittest(testtools.TestCase):
+
+    def test_full_evidence_then_truncated(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        retention = EvidenceRetention(full=1, truncate=4, directory=directory)
+        first, second = _issue(b"Traceback"), _issue(b"Traceback")
+        retention.retain(first)
+        retention.retain(second)
+
+        self.assertIsNone(first.response)
+        with open(first.evidence["file"]) as fp:
+            evidence = json.load(fp)
+        self.assertEqual("Traceback", evidence["response"]["text"])
+        self.assertEqual("{'", evidence["request"]["body"])
+        self.assertEqual([os.path.basename(first.evidence["file"])],
+                         os.listdir(directory))
+
+        self.assertIsNone(second.request)
+        response = second.evidence["response"]
+        self.assertEqual("Trac", response["text"])
+        self.assertEqual(9, response["text_length"])
+        self.assertEqual(64, len(response["text_sha256"]))
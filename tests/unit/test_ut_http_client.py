@@ -0,0 +1,132 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+import io
+import threading
+
+import requests
+from six.moves import BaseHTTPServer
+import testtools
+
+from syntribos.clients.http.base_http_client import HTTPClient
+
+
+class _Raw(io.BytesIO):
+
+    """Streamed body that records whether the connection was closed."""
+
+    closed_early = False
+
+    def stream(self, chunk_size, decode_content=None):
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def release_conn(self):
+        self.closed_early = True
+
+
+def _response(body):
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = _Raw(body)
+    return response
+
+
+class _CookieHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    """Sets a cookie, and answers with the cookies it was sent."""
+
+    def do_GET(self):
+        body = (self.headers.get("Cookie") or "").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Set-Cookie", "session=1; Path=/")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SessionPoolUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(SessionPoolUnittest, self).setUp()
+        self.patch(HTTPClient, "_sessions", {})
+        self.addCleanup(HTTPClient.close_sessions)
+
+    def test_session_per_scheme_and_host(self):
+        session = HTTPClient.get_session("http://localhost/v2/domains")
+        self.assertIs(session,
+                      HTTPClient.get_session("http://localhost/v3?a=b"))
+        self.assertIsNot(session,
+                         HTTPClient.get_session("https://localhost/v2"))
+        self.assertIsNot(session,
+                         HTTPClient.get_session("http://localhost:8080/v2"))
+        self.assertIsNot(session, HTTPClient.get_session("http://other/v2"))
+
+    def test_cookies_not_sent_back(self):
+        server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0), _CookieHandler)
+        self.addCleanup(server.server_close)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.shutdown)
+        url = "http://127.0.0.1:{0}/".format(server.server_address[1])
+
+        client = HTTPClient()
+        first = client.request("GET", url)
+        second = client.request("GET", url)
+        self.assertEqual("session=1; Path=/", first.headers["Set-Cookie"])
+        self.assertEqual(b"", second.content)
+        self.assertEqual(0, len(HTTPClient.get_session(url).cookies))
+
+
+class ReadBodyUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(ReadBodyUnittest, self).setUp()
+        self.patch(HTTPClient, "chunk_size", 3)
+        self.patch(HTTPClient, "response_head", 4)
+        self.patch(HTTPClient, "response_tail", 2)
+        self.patch(HTTPClient, "response_read_limit", 0)
+
+    def test_small_body_kept_whole(self):
+        response = _response(b"abcde")
+        HTTPClient.read_body(response)
+        self.assertEqual(b"abcde", response.content)
+        self.assertEqual(5, response.body_length)
+        self.assertFalse(response.body_truncated)
+
+    def test_head_and_tail_of_large_body_kept(self):
+        body = b"0123456789"
+        response = _response(body)
+        HTTPClient.read_body(response)
+        self.assertEqual(b"012389", response.content)
+        self.assertEqual(10, response.body_length)
+        self.assertEqual(hashlib.sha256(body).hexdigest(),
+                         response.body_sha256)
+        self.assertTrue(response.body_truncated)
+
+    def test_read_stops_at_limit(self):
+        self.patch(HTTPClient, "response_read_limit", 6)
+        response = _response(b"0123456789")
+        HTTPClient.read_body(response)
+        self.assertEqual(b"012345", response.content)
+        self.assertEqual(6, response.body_length)
+        self.assertTrue(response.body_truncated)
+        self.assertTrue(response.raw.closed_early)
@@ -0,0 +1,116 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import functools
+import os
+import shutil
+import stat
+import tempfile
+import threading
+
+import testtools
+
+from syntribos.extensions.identity import cache
+from syntribos.extensions.identity.cache import parse_expiry
+from syntribos.extensions.identity.cache import TokenCache
+
+
+class _Clock(object):
+    now = parse_expiry("2016-07-21T12:00:00Z")
+
+    def __call__(self):
+        return self.now
+
+
+class TokenCacheUnittest(testtools.TestCase):
+
+    def _authenticate(self):
+        self.calls += 1
+        return "token{0}".format(self.calls), "2016-07-21T13:00:00.000000Z"
+
+    def setUp(self):
+        super(TokenCacheUnittest, self).setUp()
+        self.calls = 0
+        self.clock = _Clock()
+        self.key = TokenCache.make_key("v3", "http://localhost:5000", "user",
+                                       "admin", "secret")
+
+    def test_parse_expiry(self):
+        self.assertEqual(3600, parse_expiry("2016-07-21T13:00:00Z") -
+                         self.clock.now)
+        self.assertEqual(parse_expiry("2016-07-21T13:00:00Z"),
+                         parse_expiry("2016-07-21T15:00:00.123+02:00"))
+        self.assertIsNone(parse_expiry("tomorrow"))
+
+    def test_token_reused_until_refresh_margin(self):
+        tokens = TokenCache(refresh_margin=300, clock=self.clock)
+        fetch = functools.partial(tokens.fetch, self.key, self._authenticate)
+        self.assertEqual("token1", fetch())
+        self.clock.now += 3000
+        self.assertEqual("token1", fetch())
+        self.clock.now += 301
+        self.assertEqual("token2", fetch())
+        self.assertEqual(2, self.calls)
+
+    def test_tokens_persisted(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "tokens.json")
+        TokenCache(path=path, clock=self.clock).fetch(
+            self.key, self._authenticate)
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(path).st_mode))
+
+        tokens = TokenCache(path=path, clock=self.clock)
+        self.assertEqual("token1", tokens.fetch(self.key, self._authenticate))
+        other_key = TokenCache.make_key("v3", "http://localhost:5000", "user",
+                                        "admin", "changed")
+        self.assertEqual("token2", tokens.fetch(other_key, self._authenticate))
+
+    def test_concurrent_saves(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "tokens.json")
+        tokens = TokenCache(path=path, clock=self.clock)
+        errors = []
+
+        def fetch(worker):
+            try:
+                for i in range(50):
+                    key = TokenCache.make_key("v3", "http://localhost:5000",
+                                              "user", "admin",
+                                              "{0}.{1}".format(worker, i))
+                    tokens.fetch(key, self._authenticate)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=fetch, args=(i,))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        self.assertEqual(["tokens.json"], os.listdir(directory))
+        tokens = TokenCache(path=path, clock=self.clock)
+        self.assertEqual(400, len(tokens._entries))
+
+    def test_failed_save_logged(self):
+        path = os.path.join(tempfile.mkdtemp(), "missing", "tokens.json")
+        self.addCleanup(shutil.rmtree, os.path.dirname(os.path.dirname(path)))
+        warnings = []
+        self.patch(cache.LOG, "warning",
+                   lambda *args: warnings.append(args))
+        tokens = TokenCache(path=path, clock=self.clock)
+        self.assertEqual("token1", tokens.fetch(self.key, self._authenticate))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(1, len(warnings))
@@ -0,0 +1,117 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+import unittest
+
+import testtools
+
+from syntribos.issue import Issue
+from syntribos import journal
+from syntribos.result import IssueTestResult
+
+
+class _Test(object):
+    failureException = AssertionError
+
+    def __init__(self, test_id):
+        self._id = test_id
+
+    def id(self):
+        return self._id
+
+    def __str__(self):
+        return "run_test ({0})".format(self._id)
+
+
+class _Parameter(object):
+    method = "POST"
+    location = "data"
+    name = "x"
+    trunc_fuzz_string = "'"
+
+    def as_dict(self):
+        return {"method": self.method, "location": self.location,
+                "name": self.name, "value": self.trunc_fuzz_string}
+
+
+class RunJournalUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(RunJournalUnittest, self).setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "journal.db")
+
+    def _result(self):
+        self.addCleanup(setattr, IssueTestResult, "stats",
+                        IssueTestResult.stats)
+        IssueTestResult.stats = {"errors": 0, "failures": 0, "successes": 0}
+        return IssueTestResult(
+            unittest.runner._WritelnDecorator(open(os.devnull, "w")), True, 0)
+
+    def test_replay_restores_finished_tests(self):
+        issue = Issue(test="SQL_ERRORS", severity="Medium", text="SQL error",
+                      confidence="High")
+        issue.target, issue.path, issue.test_type = "localhost", "/", "SQL"
+        issue.content_type = "json"
+        issue.impacted_parameter = _Parameter()
+
+        run = journal.RunJournal(self.path)
+        run.record(_Test("a"), journal.SUCCESS)
+        run.record(_Test("b"), journal.FAILURE, [issue])
+        run.record(_Test("c"), journal.ERROR, error="Traceback")
+        run.close()
+
+        resumed = journal.RunJournal(self.path)
+        self.addCleanup(resumed.close)
+        self.assertEqual(set(["a", "b"]), resumed.finished())
+        result = self._result()
+        self.assertEqual(2, resumed.replay(result))
+        self.assertEqual(2, result.testsRun)
+        self.assertEqual({"errors": 0, "failures": 1, "successes": 1},
+                         result.stats)
+        test, (replayed, ) = result.failures[0]
+        self.assertEqual("run_test (b)", str(test))
+        self.assertEqual(issue.as_dict(), replayed.as_dict())
+        self.assertEqual("json", replayed.content_type)
+
+    def test_result_records_to_journal(self):
+        result = self._result()
+        result.journal = journal.RunJournal(self.path)
+        self.addCleanup(result.journal.close)
+        result.addSuccess(_Test("a"))
+        result.addError(_Test("b"), (ValueError, ValueError("x"), None))
+        self.assertEqual(set(["a"]), result.journal.finished())
+
+    def test_escalations_recorded_and_replayed(self):
+        result = self._result()
+        result.journal = journal.RunJournal(self.path)
+        escalated = _Test("a")
+        escalated.escalation = {"name": "x", "reasons": ["status code"]}
+        for test in (escalated, _Test("b")):
+            result.startTest(test)
+            result.addSuccess(test)
+            result.stopTest(test)
+        result.journal.close()
+        self.assertEqual([escalated.escalation], result.escalations)
+        # Kept by each result, not shared
+        self.assertEqual([], self._result().escalations)
+
+        resumed = journal.RunJournal(self.path)
+        self.addCleanup(resumed.close)
+        result = self._result()
+        resumed.replay(result)
+        self.assertEqual([escalated.escalation], result.escalations)
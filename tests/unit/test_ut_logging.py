@@ -0,0 +1,111 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import gc
+import logging
+import weakref
+
+import requests
+import testtools
+
+from syntribos.clients.http.base_http_client import _log_transaction
+from syntribos.clients.http.base_http_client import HTTPClient
+from syntribos import log_queue
+
+
+class _Handler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+        self.messages = []
+
+    def emit(self, record):
+        self.records.append(record)
+        self.messages.append(record.getMessage())
+
+
+class _Content(object):
+
+    """Response body that records whether it was read."""
+
+    read = False
+
+    def __get__(self, response, cls):
+        _Content.read = True
+        return b"x" * 10
+
+
+class _Response(requests.Response):
+    content = _Content()
+
+
+def _send(*args, **kwargs):
+    response = _Response()
+    response.status_code = 200
+    response.request = requests.Request(
+        "POST", "http://localhost/v2?a=b", data="y" * 10).prepare()
+    return response
+
+
+class LogTransactionUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(LogTransactionUnittest, self).setUp()
+        self.log = logging.getLogger("tests.unit.test_ut_logging")
+        self.log.propagate = False
+        self.handler = _Handler()
+        self.log.addHandler(self.handler)
+        self.addCleanup(self.log.removeHandler, self.handler)
+        self.patch(HTTPClient, "max_log_body", 4)
+        _Content.read = False
+
+    def test_nothing_built_when_level_disabled(self):
+        self.log.setLevel(logging.INFO)
+        _log_transaction(self.log)(_send)()
+        self.assertEqual([], self.handler.messages)
+        self.assertFalse(_Content.read)
+
+    def test_bodies_capped(self):
+        self.log.setLevel(logging.DEBUG)
+        _log_transaction(self.log)(_send)()
+        request, response = self.handler.messages[1:]
+        self.assertIn("request params..: a=b\n", request)
+        self.assertIn("request body....: yyyy... (6 more characters)\n",
+                      request)
+        self.assertIn("response body....: xxxx... (6 more characters)\n",
+                      response)
+
+    def test_records_do_not_keep_response(self):
+        self.log.setLevel(logging.DEBUG)
+        response = weakref.ref(_log_transaction(self.log)(_send)())
+        gc.collect()
+        self.assertIsNone(response())
+        self.assertIn("response body....: xxxx... (6 more characters)\n",
+                      self.handler.records[2].getMessage())
+
+
+class LogQueueUnittest(testtools.TestCase):
+
+    def test_records_written_by_listener(self):
+        root = logging.getLogger()
+        handler = _Handler()
+        self.patch(root, "handlers", [handler])
+        log_queue.enable()
+        self.addCleanup(log_queue.disable)
+        self.assertIsInstance(root.handlers[0], log_queue.QueueHandler)
+
+        root.warning("queued %s", "message")
+        log_queue.disable()
+        self.assertEqual([handler], root.handlers)
+        self.assertEqual(["queued message"], handler.messages)
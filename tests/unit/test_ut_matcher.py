@@ -0,0 +1,41 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import testtools
+
+from syntribos.tests.fuzz import matcher
+
+
+class KeyMatcherUnittest(testtools.TestCase):
+
+    keys = ["SQL syntax", "SQL", "QL s", "<script>", "(", "syntax error",
+            "not found", "SQL"]
+
+    def test_find_matches_naive_scan(self):
+        key_matcher = matcher.KeyMatcher(self.keys)
+        for text in ["", "nothing here", "You have an error in your SQL "
+                     "syntax error near '(' <script>", "SQL syntax"]:
+            self.assertEqual([k for k in self.keys if k in text],
+                             key_matcher.find(text))
+
+    def test_search(self):
+        key_matcher = matcher.KeyMatcher(self.keys)
+        self.assertTrue(key_matcher.search("a (b)"))
+        self.assertFalse(key_matcher.search("SQ L"))
+        self.assertFalse(key_matcher.search(None))
+        self.assertTrue(matcher.KeyMatcher(["x", ""]).search("y"))
+        self.assertFalse(matcher.KeyMatcher([]).search("y"))
+
+    def test_get_matcher_is_shared(self):
+        self.assertIs(matcher.get_matcher(self.keys),
+                      matcher.get_matcher(list(self.keys)))
@@ -0,0 +1,67 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import itertools
+from xml.etree import ElementTree
+
+import testtools
+
+from syntribos.clients.http import models
+
+
+class RequestObjectUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(RequestObjectUnittest, self).setUp()
+        models._iterators["ITER_1"] = (str(i) for i in itertools.count(1))
+        self.addCleanup(models._iterators.pop, "ITER_1")
+
+    def _request(self, data):
+        class _Request(models.RequestObject, models.RequestHelperMixin):
+            pass
+        return _Request("POST", "http://localhost/", "ACTION_FIELD:",
+                        {"X-Id": "ITER_1"}, {}, data)
+
+    def test_prepared_copy_does_not_modify_original(self):
+        data = {"a": {"b": "ITER_1"}, "c": ["ITER_1", {"d": "e"}]}
+        request = self._request(data)
+        prepared = request.get_prepared_copy()
+        self.assertEqual({"a": {"b": "ITER_1"}, "c": ["ITER_1", {"d": "e"}]},
+                         data)
+        self.assertEqual({"X-Id": "ITER_1"}, request.headers)
+        self.assertIsInstance(prepared.data, basestring)
+        self.assertNotIn("ITER_1", prepared.headers["X-Id"])
+        self.assertNotIn("ITER_1", prepared.data)
+
+    def test_run_iters_shares_unchanged_children(self):
+        data = {"a": {"b": "ITER_1"}, "c": {"d": ["e"]}}
+        ret = models.RequestHelperMixin._run_iters(data, "ACTION_FIELD:")
+        self.assertIsNot(data, ret)
+        self.assertIsNot(data["a"], ret["a"])
+        self.assertIs(data["c"], ret["c"])
+        self.assertEqual("1", ret["a"]["b"])
+        self.assertIs(data["c"], models.RequestHelperMixin._run_iters(
+            data["c"], "ACTION_FIELD:"))
+
+    def test_run_iters_xml_copies_changed_path(self):
+        root = ElementTree.fromstring(
+            "<a><b>ITER_1</b><c><d>e</d></c></a>")
+        ret = models.RequestHelperMixin._run_iters(root, "ACTION_FIELD:")
+        self.assertEqual("ITER_1", root.find("b").text)
+        self.assertEqual("1", ret.find("b").text)
+        self.assertIs(root.find("c"), ret.find("c"))
+
+    def test_copy_headers_are_independent(self):
+        request = self._request({})
+        request.get_copy().headers["X-Id"] = "changed"
+        self.assertEqual({"X-Id": "ITER_1"}, request.headers)
@@ -0,0 +1,79 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import testtools
+
+from syntribos.clients.http.models import _iterators
+from syntribos.clients.http import parser
+from syntribos.tests.fuzz.datagen import FuzzParser
+
+calls = []
+
+
+def get_value(value):
+    calls.append(value)
+    return value
+
+
+TEMPLATE = """POST /v2/servers HTTP/1.1
+X-Auth-Token: CALL_EXTERNAL|{0}:get_value:["abc"]|
+
+{{"name": "{{server}}", "flavor": 1}}""".format(__name__)
+
+
+class RequestCreatorUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(RequestCreatorUnittest, self).setUp()
+        del calls[:]
+        parser.invalidate()
+        self.addCleanup(parser.invalidate)
+
+    def test_template_compiled_once(self):
+        request = parser.create_request(TEMPLATE, "http://localhost")
+        request.headers["Origin"] = "http://example.com"
+        fuzz_request = FuzzParser.create_request(TEMPLATE, "http://localhost")
+
+        self.assertEqual(["abc"], calls)
+        self.assertIs(request.template, fuzz_request.template)
+        self.assertEqual({"X-Auth-Token": "abc"}, fuzz_request.headers)
+        self.assertEqual("http://localhost/v2/servers", fuzz_request.url)
+        self.assertEqual(
+            ((__name__, "get_value", '["abc"]'), ),
+            request.template.external_calls)
+
+    def test_body_fields_shared_by_test_types(self):
+        first = FuzzParser.create_request(TEMPLATE, "http://localhost")
+        second = FuzzParser.create_request(TEMPLATE, "http://localhost")
+        bodies = [list(r.fuzz_request(["'"], "data", "test_"))
+                  for r in (first, second)]
+        self.assertEqual(
+            [(name, req.data, path) for name, req, _, path in bodies[0]],
+            [(name, req.data, path) for name, req, _, path in bodies[1]])
+        self.assertIs(first.template.derive("body_templates", None),
+                      second.template.derive("body_templates", None))
+
+    def test_external_calls_expanded_once(self):
+        def repeat(value):
+            while True:
+                yield value
+
+        self.patch(parser, "_functions", {(__name__, "repeat"): repeat})
+        string = "".join(
+            "CALL_EXTERNAL|{0}:{1}:[\"a\\\\b\"]|,".format(__name__, f)
+            for f in ("get_value", "repeat", "get_value", "repeat"))
+        parts = parser.call_external_functions(string).split(",")
+        self.assertEqual(["a\\b"], calls)
+        self.assertEqual(parts[0], parts[2])
+        self.assertNotEqual(parts[1], parts[3])
+        self.assertEqual("a\\b", _iterators[parts[1]].next())
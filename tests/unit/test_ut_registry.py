@@ -0,0 +1,40 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import testtools
+
+from syntribos.tests import index
+from syntribos.tests import registry
+
+
+class RegistryUnittest(testtools.TestCase):
+
+    def test_index_up_to_date(self):
+        """The index lists every test type (see syntribos.tests.registry)"""
+        self.assertEqual(index.TEST_MODULES, registry.build_index())
+
+    def test_index_generated(self):
+        with open(index.__file__.replace(".pyc", ".py")) as fp:
+            self.assertEqual(
+                registry.format_index(index.TEST_MODULES), fp.read())
+
+    def test_get_tests_by_type(self):
+        tests = list(registry.get_tests(["SQL", "CORS"]))
+        self.assertEqual(
+            ["CORS_HEADER", "SQL_INJECTION_BODY", "SQL_INJECTION_HEADERS",
+             "SQL_INJECTION_PARAMS", "SQL_INJECTION_URL"],
+            [test_name for test_name, test_class in tests])
+        for test_name, test_class in tests:
+            self.assertEqual(test_name, test_class.test_name)
+            self.assertEqual(index.TEST_MODULES[test_name],
+                             test_class.__module__)
@@ -0,0 +1,121 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import datetime
+
+import requests
+import testtools
+
+from syntribos.tests import rules
+
+
+class _Case(object):
+    failure_keys = ["SQL syntax", "mysql"]
+
+    def __init__(self, body, status_code=200, seconds=0.1):
+        self.resp = requests.Response()
+        self.resp._content = body
+        self.resp.status_code = status_code
+        self.resp.elapsed = datetime.timedelta(seconds=seconds)
+        self.init_request = requests.Request(
+            "GET", "http://example.com/v2").prepare()
+
+
+class _Content(object):
+
+    """Response body that counts how many times it was read."""
+
+    reads = 0
+
+    def __get__(self, response, cls):
+        _Content.reads += 1
+        return b"mysql said: Traceback"
+
+
+class _Response(requests.Response):
+    content = _Content()
+
+
+class _Keys(list):
+
+    """Strings that count how many times they were iterated over."""
+
+    iterations = 0
+
+    def __iter__(self):
+        _Keys.iterations += 1
+        return super(_Keys, self).__iter__()
+
+
+class RulesUnittest(testtools.TestCase):
+
+    def test_strings_of_every_rule_found_in_one_scan(self):
+        detectors = (
+            rules.Strings("sql_strings", "Medium", "Low", "{0}"),
+            rules.Strings("tracebacks", "Low", "Low", "{0}",
+                          keys=("Traceback", "Exception")))
+        case = _Case(None)
+        case.resp.__class__ = _Response
+        _Content.reads = 0
+        issues = rules.compile_rules(_Case, detectors).evaluate(case)
+        self.assertEqual(["sql_strings", "tracebacks"],
+                         [issue.defect_type for issue in issues])
+        self.assertEqual("['mysql']", issues[0].text)
+        self.assertEqual("['Traceback']", issues[1].text)
+        self.assertEqual(1, _Content.reads)
+
+    def test_strings_found_in_rule_order(self):
+        keys = _Keys("<key{0}>".format(i) for i in range(1000))
+        detectors = (rules.Strings("xss_strings", "Medium", "Low", "{0}",
+                                   keys=keys),)
+        compiled = rules.compile_rules(_Case, detectors)
+        _Keys.iterations = 0
+        issues = compiled.evaluate(_Case(b"<key999> <key10> <key10>"))
+        self.assertEqual("['<key10>', '<key999>']", issues[0].text)
+        # Only the strings found are looked up
+        self.assertEqual(0, _Keys.iterations)
+
+    def test_compiled_once_per_class(self):
+        detectors = (rules.Strings("sql_strings", "Medium", "Low", "{0}"),)
+        self.assertIs(rules.compile_rules(_Case, detectors),
+                      rules.compile_rules(_Case, detectors))
+
+    def test_pattern_status_and_callable_severity(self):
+        detectors = (
+            rules.Pattern("SSL_ERROR", "Medium", "High", "{0}",
+                          pattern=r"\bhttp://{host}"),
+            rules.Status("500_errors", lambda case: "Low", "High",
+                         "status {0}",
+                         predicate=lambda status_code: status_code >= 500))
+        compiled = rules.compile_rules(_Case, detectors)
+        issues = compiled.evaluate(
+            _Case(b"see http://example.com/v2", status_code=503))
+        self.assertEqual(["http://example.com", "status 503"],
+                         [issue.text for issue in issues])
+        self.assertEqual("Low", issues[1].severity)
+        self.assertEqual([], compiled.evaluate(
+            _Case(b"see https://example.com/v2")))
+
+    def test_fallback_only_checked_without_earlier_issue(self):
+        detectors = (
+            rules.Strings("command_injection", "High", "Medium", "strings",
+                          keys=("uid=",)),
+            rules.Elapsed("command_injection", "High", "Medium", "timing",
+                          seconds=10, fallback=True))
+        compiled = rules.compile_rules(_Case, detectors)
+        self.assertEqual(["strings"], [issue.text for issue in
+                                       compiled.evaluate(
+                                           _Case(b"uid=0", seconds=12))])
+        self.assertEqual(["timing"], [issue.text for issue in
+                                      compiled.evaluate(
+                                          _Case(b"", seconds=12))])
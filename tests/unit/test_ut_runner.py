@@ -0,0 +1,123 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import random
+import threading
+import time
+import unittest
+
+import testtools
+
+from syntribos.clients.http import green
+from syntribos.runner import Runner
+
+
+def _make_test(num, sleep=time.sleep):
+    class _Test(unittest.TestCase):
+        def run_test(self):
+            sleep(random.random() / 100)
+            self.assertTrue(num % 3)
+    _Test.__name__ = "test{0}".format(num)
+    return _Test
+
+
+class _RecordingResult(unittest.TestResult):
+    def __init__(self):
+        super(_RecordingResult, self).__init__()
+        self.order = []
+
+    def startTest(self, test):
+        super(_RecordingResult, self).startTest(test)
+        self.order.append(type(test).__name__)
+
+
+class _FixtureTest(unittest.TestCase):
+
+    """Counts its class fixtures, and checks each test runs in between."""
+
+    lock = threading.Lock()
+    calls = []
+
+    @classmethod
+    def setUpClass(cls):
+        with cls.lock:
+            cls.calls.append("setUpClass")
+
+    @classmethod
+    def tearDownClass(cls):
+        with cls.lock:
+            cls.calls.append("tearDownClass")
+
+    def run_test(self):
+        time.sleep(random.random() / 100)
+        with self.lock:
+            self.calls.append("test")
+
+
+class _BrokenFixtureTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        raise ValueError("no target")
+
+    def run_test(self):
+        raise AssertionError("run without its class set up")
+
+
+class RunnerUnittest(testtools.TestCase):
+    def test_run_tests_workers_matches_serial(self):
+        serial = _RecordingResult()
+        parallel = _RecordingResult()
+        Runner.run_tests((_make_test(i) for i in range(30)), serial)
+        Runner.run_tests((_make_test(i) for i in range(30)), parallel,
+                         workers=8)
+        self.assertEqual(serial.order, parallel.order)
+        self.assertEqual(30, parallel.testsRun)
+        self.assertEqual(len(serial.failures), len(parallel.failures))
+        self.assertEqual(10, len(parallel.failures))
+
+    @testtools.skipUnless(green.is_available(), "gevent is not installed")
+    def test_run_tests_green_pool_matches_threads(self):
+        import gevent
+        threaded = _RecordingResult()
+        greened = _RecordingResult()
+        Runner.run_tests((_make_test(i) for i in range(30)), threaded,
+                         workers=8)
+        # Without patching the standard library: the tests yield to each
+        # other through gevent.sleep
+        self.patch(green, "_enabled", True)
+        Runner.run_tests((_make_test(i, gevent.sleep) for i in range(30)),
+                         greened, workers=8)
+        self.assertEqual(threaded.order, greened.order)
+        self.assertEqual(30, greened.testsRun)
+        self.assertEqual(
+            [type(test).__name__ for test, _ in threaded.failures],
+            [type(test).__name__ for test, _ in greened.failures])
+
+    def test_class_fixtures_run_once_under_workers(self):
+        self.patch(_FixtureTest, "calls", [])
+        result = _RecordingResult()
+        Runner.run_tests((_FixtureTest("run_test") for i in range(20)),
+                         result, workers=8)
+        self.assertEqual(
+            ["setUpClass"] + ["test"] * 20 + ["tearDownClass"],
+            _FixtureTest.calls)
+        self.assertTrue(result.wasSuccessful())
+
+    def test_class_fixture_error_reported_once(self):
+        result = _RecordingResult()
+        Runner.run_tests((_BrokenFixtureTest("run_test") for i in range(5)),
+                         result, workers=4)
+        self.assertEqual(1, len(result.errors))
+        self.assertIn("setUpClass", result.errors[0][0].description)
+        self.assertEqual([], result.failures)
@@ -0,0 +1,71 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import testtools
+
+from syntribos.clients.http import throttle
+
+
+class _Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ThrottleUnittest(testtools.TestCase):
+    def test_token_bucket_spaces_requests(self):
+        clock = _Clock()
+        bucket = throttle.TokenBucket(10, 2, clock=clock)
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0, bucket.reserve())
+        self.assertAlmostEqual(0.1, bucket.reserve())
+        self.assertAlmostEqual(0.2, bucket.reserve())
+        clock.now = 1.0
+        self.assertEqual(0, bucket.reserve())
+
+    def test_limiter_backs_off_on_429_and_recovers(self):
+        clock = _Clock()
+        limiter = throttle.AdaptiveLimiter(
+            rate_limit=100, max_concurrency=8, clock=clock)
+        limiter.acquire()
+        limiter.release(429, 0.1)
+        self.assertEqual(4, limiter.limit)
+        self.assertEqual(50, limiter.bucket.rate)
+        # Further errors within the cooldown do not compound
+        limiter.acquire()
+        limiter.release(503, 0.1)
+        self.assertEqual(4, limiter.limit)
+        for _ in range(100):
+            limiter.acquire()
+            limiter.release(200, 0.1)
+        self.assertEqual(8, limiter.limit)
+        self.assertEqual(100, limiter.bucket.rate)
+
+    def test_limiter_backs_off_on_rising_latency(self):
+        limiter = throttle.AdaptiveLimiter(max_concurrency=8,
+                                           clock=_Clock())
+        for elapsed in [0.1] * 20 + [1.0] * 5:
+            limiter.acquire()
+            limiter.release(200, elapsed)
+        self.assertEqual(4, limiter.limit)
+
+    def test_get_limiter_disabled_by_default(self):
+        throttle.configure()
+        self.assertIsNone(throttle.get_limiter("http://localhost/"))
+        throttle.configure(max_concurrency=2)
+        self.addCleanup(throttle.configure)
+        limiter = throttle.get_limiter("http://localhost/a")
+        self.assertIs(limiter, throttle.get_limiter("http://localhost/b"))
+        self.assertIsNot(limiter, throttle.get_limiter("http://other/"))